@@ -18,3 +18,7 @@ admin.site.register(models.ReportReason)
 admin.site.register(models.PostReport)
 admin.site.register(models.VerifyEmailToken)
 admin.site.register(models.ResetPasswordToken)
+admin.site.register(models.FeedEntry)
+admin.site.register(models.PostLikeCounterShard)
+admin.site.register(models.StorageDeletion)
+admin.site.register(models.EmailOutbox)
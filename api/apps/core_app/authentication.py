@@ -0,0 +1,179 @@
+"""
+Stateless JWT authentication.
+
+Access tokens carry the flags of their user and the ids of the user's profiles
+as claims, so authenticating a request and checking its auth-profile-id header
+doesn't need a query. The User on the request is built from the claims with
+every other field deferred, its other fields are read from the database the
+first time one of them is used.
+
+Tokens are revoked by incrementing User.token_version, which is done when the
+password changes and when the user is deactivated. The current version is kept
+in the cache for the lifetime of an access token: it is cached when a token is
+issued, published when it changes and read from the database again when it has
+expired from the cache, so access tokens with an older version are always
+rejected. Refreshing always checks the version in the database.
+Tokens without a version claim, issued before claims were added, are
+authenticated with a query like before. Deleting a profile doesn't revoke
+tokens, the profile ids in them are checked instead, see apps.core_app.profiles.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# User fields copied into the claims of a token
+CLAIM_FIELDS = ["is_active", "is_staff", "is_email_verified", "token_version"]
+PROFILE_IDS_CLAIM = "profile_ids"
+
+
+def token_version_cache_key(user_id):
+    return f"user-token-version:{user_id}"
+
+
+def current_token_version(user):
+    """Return the token version of user, or -1 if no token of user is valid."""
+    # token versions are never negative, so every token is rejected
+    return user.token_version if user.is_active else -1
+
+
+def cache_token_version(user_id, token_version):
+    """
+    Cache the token version of a user read from the database, unless a newer
+    version was published since it was read.
+    """
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.add(token_version_cache_key(user_id), token_version, timeout=lifetime)
+
+
+def publish_token_version(user_id, token_version):
+    """
+    Publish the token version of a user once the transaction commits, so
+    access tokens with an older version are rejected.
+    """
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    transaction.on_commit(
+        lambda: cache.set(
+            token_version_cache_key(user_id), token_version, timeout=lifetime
+        )
+    )
+
+
+def set_user_claims(token, user):
+    """Set the claims of user on token, reading them from the database."""
+    token[api_settings.USER_ID_CLAIM] = user.id
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[PROFILE_IDS_CLAIM] = list(user.profiles.values_list("id", flat=True))
+    cache_token_version(user.id, current_token_version(user))
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying the claims of its user."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_user_claims(token, user)
+        return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh the access token with claims read again from the database, so
+    refreshing picks up changes to the user and rejects revoked tokens.
+    """
+
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        User = get_user_model()
+        try:
+            user = User.objects.get(id=refresh[api_settings.USER_ID_CLAIM])
+        except (KeyError, User.DoesNotExist):
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if refresh.get("token_version", user.token_version) != user.token_version:
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+
+        set_user_claims(refresh, user)
+        return {"access": str(refresh.access_token)}
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """Authenticate requests with the claims of the access token, without a query."""
+
+    def get_user(self, validated_token):
+        if "token_version" not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if not validated_token["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        User = get_user_model()
+        current_version = cache.get(token_version_cache_key(user_id))
+        if current_version is None:
+            user = (
+                User.objects.filter(id=user_id)
+                .only("is_active", "token_version")
+                .first()
+            )
+            current_version = -1 if user is None else current_token_version(user)
+            cache_token_version(user_id, current_version)
+        if current_version != validated_token["token_version"]:
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+
+        claims = {field: validated_token[field] for field in CLAIM_FIELDS}
+        claims["id"] = user_id
+        # from_db expects the values in the order of the model's fields
+        fields = [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname in claims
+        ]
+        return User.from_db(User.objects.db, fields, [claims[f] for f in fields])
+
+
+def token_profile_ids(request):
+    """Return the profile ids in the claims of the request's token, if any."""
+    token = getattr(request, "auth", None)
+    if token is None or not hasattr(token, "get"):
+        return None
+    return token.get(PROFILE_IDS_CLAIM)
+
+
+def load_user(user):
+    """
+    Return user with all of its fields loaded. Views that read fields that
+    aren't claims, or need the current value of a claim, use this instead of
+    loading each deferred field with its own query.
+    """
+    if not user.get_deferred_fields():
+        return user
+    return type(user).objects.get(pk=user.pk)
@@ -0,0 +1,296 @@
+"""
+Two tier cache of data read on most requests.
+
+Values are kept in the shared cache (Redis when REDIS_URL is set, see CACHES)
+and in a small LRU in each process, so a value read again within
+TIERED_CACHE_LOCAL_SECONDS doesn't leave the process. Values are cached under
+a namespace, and invalidating the namespace stops serving every value cached
+under it once the current transaction commits.
+
+A namespace has a version token kept in the shared cache, like the versions of
+apps.core_app.post_cards, and values are stored under keys holding the token.
+Invalidating a namespace replaces its token and, with a Redis backend,
+publishes the namespace on TIERED_CACHE_CHANNEL so every process drops the
+token it kept locally. Without Redis, or while a process is disconnected from
+the channel, a process reads the old token for up to
+TIERED_CACHE_LOCAL_SECONDS.
+
+A value is fresh for the timeout it was cached with and is then served stale
+for TIERED_CACHE_STALE_SECONDS more while one process recomputes it. Only the
+process holding the namespace key's lock recomputes a value, the others serve
+the stale value, or wait for the new value when there is none.
+"""
+
+import functools
+import hashlib
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# namespaces of the reference data cached by the API
+PET_TYPES = "pet_types"
+REPORT_REASONS = "report_reasons"
+# seconds between checks for the value computed by the process holding the lock
+LOCK_POLL_SECONDS = 0.05
+# seconds before a process disconnected from the channel subscribes again
+SUBSCRIBE_RETRY_SECONDS = 5
+
+
+def version_key(namespace):
+    return f"tiered-cache-version:{namespace}"
+
+
+def value_key(namespace, version, key):
+    return f"tiered-cache:{namespace}:{version}:{key}"
+
+
+def lock_key(full_key):
+    return f"{full_key}:lock"
+
+
+def arguments_key(args, kwargs):
+    """Return a key for the arguments of a cached function."""
+    arguments = repr((args, sorted(kwargs.items())))
+    return hashlib.md5(arguments.encode()).hexdigest()
+
+
+class LocalCache:
+    """Least recently used entries kept in the process, each with an expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class TieredCache:
+    """A LocalCache in front of one of the CACHES."""
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+        self.local = LocalCache(settings.TIERED_CACHE_LOCAL_MAX_ENTRIES)
+        self.lock = threading.Lock()
+        self.subscriber = None
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def uses_redis(self):
+        return isinstance(self.shared, RedisCache)
+
+    def reset(self):
+        self.local = LocalCache(settings.TIERED_CACHE_LOCAL_MAX_ENTRIES)
+
+    def get_or_set(self, namespace, key, compute, timeout=None):
+        """
+        Return the value cached under key in namespace, computing and caching it
+        with compute when it is missing. The value is fresh for timeout seconds,
+        TIERED_CACHE_SECONDS by default.
+        """
+        if not settings.TIERED_CACHE_ENABLED:
+            return compute()
+        self.ensure_subscribed()
+        if timeout is None:
+            timeout = settings.TIERED_CACHE_SECONDS
+        full_key = value_key(namespace, self.get_version(namespace), key)
+
+        entry = self.get_entry(full_key)
+        if entry is not None:
+            value, fresh_until = entry
+            if time.time() < fresh_until:
+                return value
+            # only one process recomputes a stale value, the others serve it
+            if not self.shared.add(
+                lock_key(full_key), 1, timeout=settings.TIERED_CACHE_LOCK_SECONDS
+            ):
+                return value
+            return self.refresh(full_key, compute, timeout)
+
+        if self.shared.add(
+            lock_key(full_key), 1, timeout=settings.TIERED_CACHE_LOCK_SECONDS
+        ):
+            return self.refresh(full_key, compute, timeout)
+        # another process is computing the value
+        deadline = time.monotonic() + settings.TIERED_CACHE_LOCK_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            entry = self.get_entry(full_key)
+            if entry is not None:
+                return entry[0]
+        # the process holding the lock failed or is too slow
+        return self.refresh(full_key, compute, timeout)
+
+    def get_entry(self, full_key):
+        """Return the (value, fresh until) entry of a key, or None."""
+        data = self.local.get(full_key)
+        if data is not None:
+            entry = pickle.loads(data)
+            if time.time() < entry[1]:
+                return entry
+        entry = self.shared.get(full_key)
+        if entry is not None:
+            self.set_local(full_key, pickle.dumps(entry))
+        return entry
+
+    def refresh(self, full_key, compute, timeout):
+        """Compute a value and cache it in both tiers."""
+        try:
+            value = compute()
+            entry = (value, time.time() + timeout)
+            self.shared.set(
+                full_key, entry, timeout=timeout + settings.TIERED_CACHE_STALE_SECONDS
+            )
+            # values are pickled in the process too, so callers can't change them
+            self.set_local(full_key, pickle.dumps(entry))
+            return value
+        finally:
+            self.shared.delete(lock_key(full_key))
+
+    def set_local(self, key, value):
+        self.local.set(key, value, settings.TIERED_CACHE_LOCAL_SECONDS)
+
+    def get_version(self, namespace):
+        """Return the version token of a namespace, creating a missing one."""
+        key = version_key(namespace)
+        version = self.local.get(key)
+        if version is None:
+            version = self.shared.get(key)
+            if version is None:
+                # another process may create the token first, so it is read back
+                self.shared.add(key, uuid.uuid4().hex, timeout=None)
+                version = self.shared.get(key)
+            self.set_local(key, version)
+        return version
+
+    def invalidate(self, namespace):
+        """Stop serving the values of a namespace once the transaction commits."""
+        transaction.on_commit(lambda: self.replace_version(namespace))
+
+    def replace_version(self, namespace):
+        self.shared.set(version_key(namespace), uuid.uuid4().hex, timeout=None)
+        self.local.delete(version_key(namespace))
+        if not self.uses_redis():
+            return
+        try:
+            self.shared._cache.get_client(write=True).publish(
+                settings.TIERED_CACHE_CHANNEL, namespace
+            )
+        except Exception:
+            # the other processes read the new token once theirs expires
+            logger.exception(f"Failed to publish the invalidation of {namespace}.")
+
+    def handle_message(self, namespace):
+        """Drop the local version token of a namespace invalidated elsewhere."""
+        if isinstance(namespace, bytes):
+            namespace = namespace.decode()
+        self.local.delete(version_key(namespace))
+
+    def ensure_subscribed(self):
+        """Start listening for invalidations when the shared cache is Redis."""
+        if self.subscriber is not None or not self.uses_redis():
+            return
+        with self.lock:
+            if self.subscriber is None:
+                self.subscriber = threading.Thread(target=self.listen, daemon=True)
+                self.subscriber.start()
+
+    def listen(self):
+        while True:
+            try:
+                client = self.shared._cache.get_client(write=False)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(settings.TIERED_CACHE_CHANNEL)
+                # invalidations published while disconnected were missed
+                self.local.clear()
+                for message in pubsub.listen():
+                    self.handle_message(message["data"])
+            except Exception:
+                logger.exception("Lost the cache invalidation channel, retrying.")
+                time.sleep(SUBSCRIBE_RETRY_SECONDS)
+
+
+tiered_cache = TieredCache()
+
+
+def cached_queryset(namespace, timeout=None):
+    """
+    Cache the rows of the queryset returned by the decorated function under
+    namespace, keyed by the function's arguments. Arguments must have a repr
+    that identifies them, like ids and strings.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return tiered_cache.get_or_set(
+                namespace,
+                f"{func.__qualname__}:{arguments_key(args, kwargs)}",
+                lambda: list(func(*args, **kwargs)),
+                timeout,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def cached_serializer(namespace, timeout=None):
+    """
+    Cache the data of the serializer returned by the decorated function under
+    namespace, keyed by the function's arguments like cached_queryset.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return tiered_cache.get_or_set(
+                namespace,
+                f"{func.__qualname__}:{arguments_key(args, kwargs)}",
+                lambda: func(*args, **kwargs).data,
+                timeout,
+            )
+
+        return wrapper
+
+    return decorator
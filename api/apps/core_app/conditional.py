@@ -0,0 +1,170 @@
+"""
+Validators for conditional GET requests.
+
+Mobile clients poll profile and post details and the reference data lists. Each
+of these views computes an ETag before building its body, from the columns and
+version tokens its body is built from. The row's columns and the requesting
+profile's flags are read in at most one query, and the tokens come from the
+cache. A request whose If-None-Match matches gets 304 Not Modified without the
+body being serialized.
+
+The ETag is computed before the body, so a change committed in between gives
+the body a newer state than its ETag and the next request gets a 200.
+
+Related rows are covered by the version tokens of apps.core_app.post_cards for
+posts and profiles, and of apps.core_app.caching for reference data. Signed
+image URLs expire, so with a signing storage the ETag also changes every
+SIGNED_URL_BUCKET_SECONDS, or SIGNED_URL_CACHE_MARGIN without buckets, and a
+client never keeps a body whose URLs expired.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Exists, OuterRef
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import quote_etag
+
+from . import post_cards
+from .caching import tiered_cache
+from .counters import count_subquery, get_post_likes_count
+from .models import Follow, Post, Profile
+
+
+def make_etag(*parts):
+    """Return a quoted ETag for the values a body is built from."""
+    return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+
+def signed_url_epoch():
+    """Return the number of the period the signed image URLs are reused for."""
+    if not getattr(default_storage, "querystring_auth", False):
+        return 0
+    period = settings.SIGNED_URL_BUCKET_SECONDS or settings.SIGNED_URL_CACHE_MARGIN
+    return int(time.time()) // max(period, 1)
+
+
+def profile_etag(profile_id, requesting_profile_id=None):
+    """
+    Return the ETag of the details of a Profile as seen by the requesting
+    profile, or None when the Profile doesn't exist.
+    """
+    profiles = Profile.objects.filter(pk=profile_id)
+    fields = [
+        "updated_at",
+        "posts_count",
+        "followers_count",
+        "following_count",
+        "pet_type__name",
+    ]
+    if requesting_profile_id:
+        profiles = profiles.annotate(
+            viewer_following=Exists(
+                Follow.objects.filter(
+                    followed=OuterRef("pk"), followed_by=requesting_profile_id
+                )
+            )
+        )
+        fields.append("viewer_following")
+    if str(profile_id) != str(requesting_profile_id):
+        # other profiles don't count posts reported as inappropriate
+        profiles = profiles.annotate(
+            visible_posts_count=count_subquery(
+                Post.objects.filter(profile=OuterRef("pk"), is_inappropriate=False)
+            )
+        )
+        fields.append("visible_posts_count")
+    row = profiles.values_list(*fields).first()
+    if row is None:
+        return None
+
+    version_key = post_cards.profile_version_key(profile_id)
+    versions = post_cards.get_versions([version_key])
+    return make_etag(
+        "profile", profile_id, row, versions[version_key], signed_url_epoch()
+    )
+
+
+def post_etag(post_id, profile_id):
+    """
+    Return the ETag of the details of a Post as seen by a profile, or None when
+    the Post doesn't exist.
+    """
+    post = (
+        Post.objects.with_details(profile_id)
+        .select_related(None)
+        .prefetch_related(None)
+        .only(
+            "profile_id",
+            "updated_at",
+            "likes_count",
+            "like_counter_sharded",
+            "comments_count",
+            "has_open_reports",
+        )
+        .filter(pk=post_id)
+        .first()
+    )
+    if post is None:
+        return None
+
+    version_keys = [
+        post_cards.post_version_key(post.id),
+        post_cards.profile_version_key(post.profile_id),
+    ]
+    versions = post_cards.get_versions(version_keys)
+    return make_etag(
+        "post",
+        post.id,
+        post.updated_at,
+        get_post_likes_count(post),
+        post.comments_count,
+        post.has_open_reports,
+        post.viewer_liked,
+        post.viewer_saved,
+        post.viewer_reported,
+        [versions[key] for key in version_keys],
+        signed_url_epoch(),
+    )
+
+
+def reference_etag(namespace):
+    """Return the ETag of reference data cached under a tiered cache namespace."""
+    return make_etag(namespace, tiered_cache.get_version(namespace))
+
+
+def conditional_response(request, etag, get_response, max_age=None):
+    """
+    Return 304 Not Modified when the request's If-None-Match matches etag,
+    otherwise the response returned by get_response. A None etag, for a row that
+    doesn't exist, leaves the response to get_response.
+    """
+    response = None
+    if etag is not None:
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = get_response()
+    return add_validator(response, etag, max_age)
+
+
+def add_validator(response, etag, max_age=None):
+    """
+    Set the ETag and caching headers of a response. Bodies that depend on the
+    requesting profile are private and revalidated on every use, reference
+    data can be cached by anyone for max_age seconds.
+    """
+    if etag is None or response.status_code not in (200, 304):
+        return response
+    response["ETag"] = etag
+    if max_age is None:
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ["Authorization", "Auth-Profile-Id"])
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
@@ -0,0 +1,232 @@
+"""
+Denormalized engagement counters.
+
+Posts, Comments and Profiles store their like, comment, reply, follower, following
+and post counts in columns so they don't have to be counted on every read. The
+columns are kept up to date by signal receivers with atomic F() updates that run in
+the same transaction as the row being created or deleted, so a rollback undoes both.
+
+A Post that gets liked faster than LIKE_COUNTER_SHARD_THRESHOLD times a minute is
+switched to a sharded like counter. Its likes_count column keeps the
+likes counted before the switch and every later like or unlike is added to one of
+LIKE_COUNTER_SHARDS PostLikeCounterShard rows picked at random, so concurrent
+likes of a viral post no longer queue on the lock of a single row. The like count
+of a sharded post is likes_count plus the sum of its shards, cached for
+LIKE_COUNTER_CACHE_SECONDS.
+
+Rows deleted together with the row holding their counter, like the Likes and
+Comments of a deleted Post, don't update the counter, so deleting a popular Post
+doesn't run an UPDATE per child. mark_deleted records the Profiles, Posts and
+Comments a delete() call removes and is_deleted_with tells the receivers of
+their children.
+
+COUNTERS describes how each column is computed. It is used by the
+reconcile_counters management command to fix any drift.
+"""
+
+import random
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, Func, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import (
+    Comment,
+    CommentLike,
+    Follow,
+    Like,
+    Post,
+    PostLikeCounterShard,
+    Profile,
+)
+
+_local = threading.local()
+
+
+def mark_deleted(origin, instance):
+    """Record that instance is deleted by the delete() call on origin."""
+    if origin is None:
+        return
+    deleted = getattr(_local, "deleted", None)
+    if deleted is None or deleted[0]() is not origin:
+        # a new delete() call, the rows of the previous one are forgotten
+        deleted = _local.deleted = (weakref.ref(origin), set())
+    deleted[1].add((type(instance), instance.pk))
+
+
+def is_deleted_with(origin, model, pk):
+    """Return whether the row of model with pk is deleted by the delete() on origin."""
+    deleted = getattr(_local, "deleted", None)
+    return (
+        origin is not None
+        and deleted is not None
+        and deleted[0]() is origin
+        and (model, pk) in deleted[1]
+    )
+
+
+def increment(model, pk, field, amount=1):
+    """Atomically add amount to a counter column of a single row."""
+    if pk is None:
+        return
+    model.objects.filter(pk=pk).update(**{field: F(field) + amount})
+
+
+def decrement(model, pk, field, amount=1):
+    """Atomically subtract amount from a counter column of a single row."""
+    increment(model, pk, field, -amount)
+
+
+def add_post_likes(post_id, amount):
+    """
+    Add amount to the like count of a Post, using a random shard if the Post has a
+    sharded like counter.
+    """
+    updated = Post.objects.filter(pk=post_id, like_counter_sharded=False).update(
+        likes_count=F("likes_count") + amount
+    )
+    if updated:
+        # only likes count toward sharding, unlikes never make a post hot
+        if amount > 0:
+            record_like_write(post_id)
+        return
+
+    PostLikeCounterShard.objects.filter(
+        post=post_id, shard=random.randrange(settings.LIKE_COUNTER_SHARDS)
+    ).update(count=F("count") + amount)
+
+
+def record_like_write(post_id):
+    """
+    Count a like of an unsharded Post in the cache and shard its like counter once
+    it is liked more than LIKE_COUNTER_SHARD_THRESHOLD times in a minute.
+    """
+    key = f"post-like-writes:{post_id}:{int(time.time() // 60)}"
+    cache.add(key, 0, timeout=120)
+    try:
+        writes = cache.incr(key)
+    except ValueError:
+        # the key expired between add and incr
+        return
+    if writes == settings.LIKE_COUNTER_SHARD_THRESHOLD:
+        # run after commit so the promotion doesn't extend the lock on the Post
+        transaction.on_commit(lambda: shard_post_like_counter(post_id))
+
+
+def shard_post_like_counter(post_id):
+    """Switch a Post to a sharded like counter, unless it's sharded or deleted."""
+    with transaction.atomic():
+        # the Post may have been deleted or sharded since the promotion was
+        # scheduled, the lock keeps it until the shards are created
+        unsharded = Post.objects.select_for_update().filter(
+            pk=post_id, like_counter_sharded=False
+        )
+        if not unsharded.values_list("pk", flat=True):
+            return
+        PostLikeCounterShard.objects.bulk_create(
+            [
+                PostLikeCounterShard(post_id=post_id, shard=shard)
+                for shard in range(settings.LIKE_COUNTER_SHARDS)
+            ],
+            ignore_conflicts=True,
+        )
+        # shards are created in the same transaction so they exist for every
+        # writer that sees the flag
+        Post.objects.filter(pk=post_id).update(like_counter_sharded=True)
+
+
+def get_post_likes_count(post):
+    """Return the like count of a Post, adding the cached sum of its shards."""
+    if not post.like_counter_sharded:
+        return post.likes_count
+
+    key = f"post-like-shards:{post.pk}"
+    shards_count = cache.get(key)
+    if shards_count is None:
+        shards_count = PostLikeCounterShard.objects.filter(post=post.pk).aggregate(
+            count=Coalesce(Sum("count"), 0)
+        )["count"]
+        cache.set(key, shards_count, timeout=settings.LIKE_COUNTER_CACHE_SECONDS)
+    return post.likes_count + shards_count
+
+
+def count_subquery(queryset):
+    """Wrap a queryset filtered on OuterRef in a scalar COUNT subquery."""
+    counts = queryset.order_by().values(count=Func("pk", function="COUNT"))
+    return Coalesce(Subquery(counts, output_field=models.IntegerField()), 0)
+
+
+def like_shards_subquery():
+    """Scalar subquery summing the like counter shards of the outer Post."""
+    shards = (
+        PostLikeCounterShard.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values(total=Func("count", function="SUM"))
+    )
+    return Coalesce(Subquery(shards, output_field=models.IntegerField()), 0)
+
+
+# model -> counter column -> expression computing its value for the outer row
+COUNTERS = {
+    Post: {
+        # the shards of a sharded post hold the rest of its likes
+        "likes_count": lambda: (
+            count_subquery(Like.objects.filter(post=OuterRef("pk")))
+            - like_shards_subquery()
+        ),
+        "comments_count": lambda: count_subquery(
+            Comment.objects.filter(post=OuterRef("pk"))
+        ),
+    },
+    Comment: {
+        "likes_count": lambda: count_subquery(
+            CommentLike.objects.filter(comment=OuterRef("pk"))
+        ),
+        "replies_count": lambda: count_subquery(
+            Comment.objects.filter(parent_comment=OuterRef("pk"))
+        ),
+    },
+    Profile: {
+        "followers_count": lambda: count_subquery(
+            Follow.objects.filter(followed=OuterRef("pk"))
+        ),
+        "following_count": lambda: count_subquery(
+            Follow.objects.filter(followed_by=OuterRef("pk"))
+        ),
+        "posts_count": lambda: count_subquery(
+            Post.objects.filter(profile=OuterRef("pk"))
+        ),
+    },
+}
+
+
+def reconcile(model, start_pk, end_pk):
+    """
+    Recompute the counters of the rows of model with start_pk <= pk < end_pk.
+    Only rows where a counter has drifted are written. Returns the number of rows
+    that were fixed.
+    """
+    counters = COUNTERS[model]
+    actual = {
+        f"actual_{field}": expression() for field, expression in counters.items()
+    }
+    drifted = Q()
+    for field in counters:
+        drifted |= ~Q(**{field: F(f"actual_{field}")})
+
+    drifted_pks = list(
+        model.objects.filter(pk__gte=start_pk, pk__lt=end_pk)
+        .annotate(**actual)
+        .filter(drifted)
+        .values_list("pk", flat=True)
+    )
+    if drifted_pks:
+        model.objects.filter(pk__in=drifted_pks).update(
+            **{field: expression() for field, expression in counters.items()}
+        )
+    return len(drifted_pks)
@@ -0,0 +1,176 @@
+"""
+Deletion of stored image files.
+
+The files of deleted image rows are queued with delete_files_on_commit and only
+deleted once the transaction commits, so a rollback keeps them. Everything one
+transaction queues is deleted together, in batches of up to DELETE_BATCH_SIZE:
+a single DeleteObjects request per batch on S3, one delete per file on other
+storages. A batch is tried STORAGE_DELETE_ATTEMPTS times. Files that still
+can't be deleted are recorded as StorageDeletion rows, which the
+retry_storage_deletions command (also run periodically by process_images)
+tries again.
+"""
+
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+from .models import StorageDeletion
+
+logger = logging.getLogger(__name__)
+
+# the most keys a single S3 DeleteObjects request accepts
+DELETE_BATCH_SIZE = 1000
+
+
+# The PendingDeletions of the open transactions and savepoints of each thread,
+# by database alias and savepoint ids. Only the on_commit callbacks of Django
+# hold them, so the batches of rolled back transactions and savepoints, which
+# Django drops, drop out of the registry with them.
+_local = threading.local()
+
+
+def pending_deletions():
+    """Return the registry of the PendingDeletions of this thread."""
+    registry = getattr(_local, "registry", None)
+    if registry is None:
+        registry = _local.registry = weakref.WeakValueDictionary()
+    return registry
+
+
+class PendingDeletions:
+    """Files queued by one transaction, deleted when it commits."""
+
+    def __init__(self, key):
+        self.key = key
+        self.names = defaultdict(set)
+
+    def __call__(self):
+        registry = pending_deletions()
+        if registry.get(self.key) is self:
+            del registry[self.key]
+        names, self.names = self.names, defaultdict(set)
+        for storage, storage_names in names.items():
+            delete_stored_files(storage, storage_names)
+
+
+def delete_files_on_commit(storage, names, using=None):
+    """Delete files from storage once the current transaction commits."""
+    names = {name for name in names if name}
+    if not names:
+        return
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        delete_stored_files(storage, names)
+        return
+
+    # reuse the pending deletions queued in this transaction and savepoint
+    key = (connection.alias, tuple(connection.savepoint_ids))
+    registry = pending_deletions()
+    batch = registry.get(key)
+    if batch is None:
+        batch = registry[key] = PendingDeletions(key)
+        transaction.on_commit(batch, using=using)
+    batch.names[storage].update(names)
+
+
+def delete_batch(storage, names):
+    """
+    Delete up to DELETE_BATCH_SIZE files from storage. Returns the names that
+    couldn't be deleted and the last error.
+    """
+    if isinstance(storage, S3Storage):
+        # one request for the whole batch
+        keys = {storage._normalize_name(clean_name(name)): name for name in names}
+        try:
+            response = storage.bucket.meta.client.delete_objects(
+                Bucket=storage.bucket_name,
+                Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True},
+            )
+        except Exception as e:
+            return list(names), str(e)
+        errors = response.get("Errors", [])
+        failed = [keys.get(error["Key"], error["Key"]) for error in errors]
+        return failed, errors[-1].get("Message", "") if errors else ""
+
+    failed = []
+    last_error = ""
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as e:
+            failed.append(name)
+            last_error = str(e)
+    return failed, last_error
+
+
+def delete_stored_files(storage, names):
+    """
+    Delete files from storage in batches, retrying failed batches and recording
+    the files that can't be deleted as StorageDeletions.
+    """
+    names = sorted(set(names))
+    for start in range(0, len(names), DELETE_BATCH_SIZE):
+        failed = names[start : start + DELETE_BATCH_SIZE]
+        for attempt in range(settings.STORAGE_DELETE_ATTEMPTS):
+            if attempt:
+                time.sleep(0.1 * 2**attempt)
+            failed, last_error = delete_batch(storage, failed)
+            if not failed:
+                break
+        if failed:
+            logger.error(f"Could not delete {len(failed)} files: {last_error}")
+            record_failed_deletions(failed, last_error)
+
+
+def record_failed_deletions(names, error):
+    existing = set(
+        StorageDeletion.objects.filter(name__in=names).values_list("name", flat=True)
+    )
+    StorageDeletion.objects.filter(name__in=existing).update(
+        attempts=F("attempts") + 1, last_error=error
+    )
+    StorageDeletion.objects.bulk_create(
+        [
+            StorageDeletion(name=name, last_error=error)
+            for name in names
+            if name not in existing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def retry_storage_deletions(batch_size=DELETE_BATCH_SIZE):
+    """
+    Try to delete the files of the recorded StorageDeletions again. Returns the
+    number of files deleted.
+    """
+    deleted = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            StorageDeletion.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "name")[:batch_size]
+        )
+        if not batch:
+            return deleted
+        last_pk = batch[-1][0]
+
+        names = [name for _, name in batch]
+        failed, last_error = delete_batch(default_storage, names)
+        done = set(names) - set(failed)
+        StorageDeletion.objects.filter(name__in=done).delete()
+        StorageDeletion.objects.filter(name__in=failed).update(
+            attempts=F("attempts") + 1, last_error=last_error
+        )
+        deleted += len(done)
@@ -0,0 +1,139 @@
+"""
+Transactional email outbox.
+
+Requests don't talk to the mail server. queue_email writes an EmailOutbox row in
+the request's transaction, so the email is only sent if the transaction commits
+and an SMTP round trip never holds the transaction open. The send_email_outbox
+command claims the pending rows in batches and sends each batch over a single
+connection. Emails that fail are retried after EMAIL_OUTBOX_RETRY_DELAY seconds,
+doubling with each attempt, and marked FAILED after EMAIL_OUTBOX_MAX_ATTEMPTS.
+
+With EMAIL_OUTBOX_BACKEND set to "immediate" the emails are sent by the request
+process once the transaction commits instead, for setups without a
+send_email_outbox worker such as local development with the console backend.
+The request process claims the email like the command does, so an email is
+never sent twice when a worker runs too, and the worker retries it if it fails.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox, EmailStatus
+
+logger = logging.getLogger(__name__)
+
+# the longest an email waits between attempts
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def queue_email(subject, body, to):
+    """Queue an email to be sent once the current transaction commits."""
+    email = EmailOutbox.objects.create(
+        subject=subject,
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL or "",
+        to=list(to),
+    )
+    if settings.EMAIL_OUTBOX_BACKEND == "immediate":
+        pk = email.pk
+        transaction.on_commit(lambda: send_emails(claim_emails(1, pks=[pk])))
+    # otherwise the PENDING row is picked up by the send_email_outbox command
+    return email
+
+
+def claim_emails(limit, pks=None):
+    """
+    Claim up to limit pending emails that are due, out of the emails with the
+    given ids if any, and return their ids. A claim moves next_attempt_at
+    EMAIL_OUTBOX_CLAIM_TIMEOUT seconds ahead with a conditional update, so
+    several senders never claim the same email and the email is retried if its
+    sender dies.
+    """
+    now = timezone.now()
+    claimed_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT)
+    candidates = EmailOutbox.objects.filter(
+        status=EmailStatus.PENDING, next_attempt_at__lte=now
+    )
+    if pks is not None:
+        candidates = candidates.filter(pk__in=pks)
+    candidates = candidates.order_by("next_attempt_at").values_list(
+        "pk", "next_attempt_at"
+    )
+    claimed = []
+    for pk, next_attempt_at in candidates[:limit]:
+        updated = EmailOutbox.objects.filter(
+            pk=pk, status=EmailStatus.PENDING, next_attempt_at=next_attempt_at
+        ).update(next_attempt_at=claimed_until)
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def retry_delay(attempts):
+    """Return how long to wait before the next attempt after attempts failures."""
+    delay = timedelta(seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+    return min(delay, MAX_RETRY_DELAY)
+
+
+def record_failure(email, error):
+    """Schedule the next attempt of an email that failed, or give up on it."""
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = EmailStatus.FAILED
+        logger.error(f"Giving up on email {email.pk} to {email.to}: {error}")
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.warning(f"Error sending email {email.pk} to {email.to}: {error}")
+    email.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def send_emails(pks):
+    """
+    Send the pending outbox emails with the given ids over a single connection
+    to the mail server and return the number sent.
+    """
+    emails = list(
+        EmailOutbox.objects.filter(pk__in=pks, status=EmailStatus.PENDING).order_by(
+            "pk"
+        )
+    )
+    if not emails:
+        return 0
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            record_failure(email, e)
+        return 0
+
+    sent = 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                email.from_email or None,
+                email.to,
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as e:
+                record_failure(email, e)
+                continue
+            email.attempts += 1
+            email.status = EmailStatus.SENT
+            email.sent_at = timezone.now()
+            email.save(update_fields=["attempts", "status", "sent_at"])
+            sent += 1
+    finally:
+        connection.close()
+    return sent
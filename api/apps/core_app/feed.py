@@ -0,0 +1,109 @@
+"""
+Fan-out-on-write home feeds.
+
+Each Profile's home feed is materialized as FeedEntry rows. A new post is copied
+into the feed of every follower of its author, and following a profile copies that
+profile's posts into the follower's feed. Profiles with more than
+FEED_FAN_OUT_MAX_FOLLOWERS followers are switched to fan out on read: their posts
+are not copied and are pulled into feeds by Post.objects.feed_sources_of() instead,
+so a single post never triggers millions of inserts.
+"""
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import FeedEntry, Follow, Post, Profile
+
+BATCH_SIZE = 1000
+
+
+def fan_out_post(post):
+    """Add a new Post to the feed of each follower of its author."""
+    if Profile.objects.filter(id=post.profile_id, fan_out_on_read=True).exists():
+        return
+
+    max_followers = settings.FEED_FAN_OUT_MAX_FOLLOWERS
+    # fetch one more than the limit to find out if the author is over it
+    follower_ids = list(
+        Follow.objects.filter(followed=post.profile_id).values_list(
+            "followed_by", flat=True
+        )[: max_followers + 1]
+    )
+
+    if len(follower_ids) > max_followers:
+        Profile.objects.filter(id=post.profile_id).update(fan_out_on_read=True)
+        return
+
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(profile_id=follower_id, post=post, created_at=post.created_at)
+            for follower_id in follower_ids
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def add_followed_posts(follow):
+    """Add the posts of a newly followed Profile to the follower's feed."""
+    if Profile.objects.filter(id=follow.followed_id, fan_out_on_read=True).exists():
+        return
+
+    posts = Post.objects.filter(profile=follow.followed_id).values_list(
+        "id", "created_at"
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                profile_id=follow.followed_by_id, post_id=post_id, created_at=created_at
+            )
+            for post_id, created_at in posts.iterator(chunk_size=BATCH_SIZE)
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove_followed_posts(follow):
+    """Remove the posts of an unfollowed Profile from the follower's feed."""
+    FeedEntry.objects.filter(
+        profile=follow.followed_by_id, post__profile=follow.followed_id
+    ).delete()
+
+
+def update_fan_out_modes():
+    """
+    Switch profiles between fan out on write and fan out on read based on their
+    current follower count. Returns the ids of the profiles that fan out on read.
+    """
+    max_followers = settings.FEED_FAN_OUT_MAX_FOLLOWERS
+    pulled_profile_ids = list(
+        Follow.objects.values("followed")
+        .annotate(followers=Count("id"))
+        .filter(followers__gt=max_followers)
+        .values_list("followed", flat=True)
+    )
+    Profile.objects.filter(fan_out_on_read=True).exclude(
+        id__in=pulled_profile_ids
+    ).update(fan_out_on_read=False)
+    Profile.objects.filter(id__in=pulled_profile_ids).update(fan_out_on_read=True)
+    return pulled_profile_ids
+
+
+def rebuild_feed(profile_id):
+    """
+    Replace the feed entries of a Profile with the posts of the profiles it
+    follows.
+    """
+    FeedEntry.objects.filter(profile=profile_id).delete()
+
+    posts = Post.objects.filter(
+        profile__following__followed_by=profile_id,
+        profile__fan_out_on_read=False,
+    ).values_list("id", "created_at")
+    entries = [
+        FeedEntry(profile_id=profile_id, post_id=post_id, created_at=created_at)
+        for post_id, created_at in posts.iterator(chunk_size=BATCH_SIZE)
+    ]
+    FeedEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+    return len(entries)
@@ -0,0 +1,51 @@
+"""
+Entry points of the image processing worker processes.
+
+Worker processes are started with the spawn method, so this module must not
+import any models at import time: Django is set up by init_worker first.
+"""
+
+import multiprocessing
+import resource
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+
+# workers are replaced regularly so memory fragmentation doesn't build up
+MAX_TASKS_PER_WORKER = 100
+
+
+def create_pool(workers, memory_limit_mb):
+    """Start a pool of image worker processes."""
+    # workers open their own database connections
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(memory_limit_mb,),
+        max_tasks_per_child=MAX_TASKS_PER_WORKER,
+    )
+
+
+def init_worker(memory_limit_mb):
+    """Limit the memory of the worker process and set up Django."""
+    if memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    django.setup()
+
+
+def run_task(model_label, pk):
+    """Process one uploaded image."""
+    from .images import process_image
+
+    return process_image(model_label, pk)
+
+
+def run_backfill_task(model_label, pk):
+    """Create the missing variants of one processed image."""
+    from .images import create_missing_variants
+
+    return create_missing_variants(model_label, pk)
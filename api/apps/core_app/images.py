@@ -0,0 +1,268 @@
+"""
+Background processing of uploaded images.
+
+Uploads to ProcessedImage models are stored as sent with a PROCESSING status so
+the request doesn't have to decode, crop, resize and encode them. The rows
+waiting to be processed are the queue: the process_images management command
+claims them and hands them to a pool of worker processes, each limited in
+memory, which crop the upload, create a WebP variant for each of the model's
+variant_sizes and swap them in. The largest variant is stored in the image field
+and the storage names of all of them in the variants field.
+
+Post images can also be uploaded one by one while the post is being written, as
+PostImageStaged rows keyed by a post_uuid the client generates. Creating the post
+then only turns the staged rows into PostImages that reference the same files.
+Staged images that are never posted are deleted by sweep_staged_images.
+
+With IMAGE_PROCESSING_BACKEND set to "immediate" uploads are processed in the
+request process once the upload is committed instead, for setups without a
+process_images worker.
+"""
+
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .deletions import delete_stored_files
+from .models import ImageStatus, PostImage, PostImageStaged, ProfileImage
+from .post_cards import invalidate_image_cards
+from .utils import create_square_variants
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_IMAGE_MODELS = [PostImage, ProfileImage, PostImageStaged]
+
+
+def enqueue_image(image):
+    """Queue a newly uploaded image for processing."""
+    if settings.IMAGE_PROCESSING_BACKEND == "immediate":
+        label, pk = image._meta.label, image.pk
+        transaction.on_commit(lambda: process_image(label, pk))
+    # otherwise the PROCESSING row is picked up by the process_images command
+
+
+def claim_images(model, limit):
+    """
+    Claim up to limit images of model that are waiting to be processed, or whose
+    worker didn't finish in time, and return their ids. Claims are made with a
+    conditional update so several process_images commands never claim the
+    same image.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.IMAGE_PROCESSING_TIMEOUT)
+    waiting = model.objects.filter(status=ImageStatus.PROCESSING).filter(
+        Q(processing_started_at__isnull=True) | Q(processing_started_at__lt=stale)
+    )
+
+    # images that crashed their worker too many times are given up on
+    waiting.filter(
+        processing_attempts__gte=settings.IMAGE_PROCESSING_MAX_ATTEMPTS
+    ).update(status=ImageStatus.FAILED)
+
+    candidates = waiting.order_by("pk").values_list("pk", "processing_started_at")
+    claimed = []
+    for pk, started_at in candidates[:limit]:
+        updated = model.objects.filter(
+            pk=pk, processing_started_at=started_at
+        ).update(
+            processing_started_at=now,
+            processing_attempts=F("processing_attempts") + 1,
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def store_variants(image, source, sizes):
+    """
+    Create the square variants of the given sizes from source, save them next to
+    the image and return their storage names keyed by size.
+    """
+    storage = image.image.storage
+    names = {}
+    for size, variant in create_square_variants(source, sizes).items():
+        filename = image.image.field.generate_filename(
+            image, os.path.basename(variant.name)
+        )
+        names[str(size)] = storage.save(filename, variant)
+    return names
+
+
+def process_image(model_label, pk):
+    """
+    Create the variants of an uploaded image and swap them in.
+    Returns the new status of the image.
+    """
+    model = apps.get_model(model_label)
+    image = model.objects.filter(pk=pk, status=ImageStatus.PROCESSING).first()
+    if image is None:
+        return None
+
+    storage = image.image.storage
+    upload_name = image.image.name
+    try:
+        with image.image.open("rb") as upload:
+            variants = store_variants(image, upload, model.variant_sizes)
+    except Exception:
+        logger.exception(f"Error processing {model_label} {pk}.")
+        model.objects.filter(pk=pk, image=upload_name).update(
+            status=ImageStatus.FAILED
+        )
+        invalidate_image_cards(image)
+        return ImageStatus.FAILED
+
+    main_name = variants[str(max(model.variant_sizes))]
+    # only swap the files in if the image wasn't replaced while it was processed
+    swapped = model.objects.filter(pk=pk, image=upload_name).update(
+        image=main_name, variants=variants, status=ImageStatus.READY
+    )
+    if not swapped:
+        delete_stored_files(storage, variants.values())
+        return None
+    invalidate_image_cards(image)
+
+    # remove the upload and the variants of the image this one replaced
+    replaced = {upload_name, *image.variants.values()} - set(variants.values())
+    delete_stored_files(storage, replaced)
+    return ImageStatus.READY
+
+
+def missing_variant_sizes(model, variants):
+    """Return the variant sizes of model that are missing from variants."""
+    return [size for size in model.variant_sizes if str(size) not in variants]
+
+
+def create_missing_variants(model_label, pk):
+    """
+    Create the variants missing from a processed image, for images processed
+    before variants existed. Returns the number of variants added.
+    """
+    model = apps.get_model(model_label)
+    image = model.objects.filter(pk=pk, status=ImageStatus.READY).first()
+    if image is None:
+        return 0
+    sizes = missing_variant_sizes(model, image.variants)
+    if not sizes:
+        return 0
+
+    image_name = image.image.name
+    largest = max(model.variant_sizes)
+    # the image field already holds the largest variant
+    created = {str(largest): image_name} if largest in sizes else {}
+    smaller_sizes = [size for size in sizes if size != largest]
+    if smaller_sizes:
+        with image.image.open("rb") as source:
+            created.update(store_variants(image, source, smaller_sizes))
+
+    updated = model.objects.filter(pk=pk, image=image_name).update(
+        variants={**image.variants, **created}
+    )
+    if not updated:
+        # the image was replaced while the variants were created
+        delete_stored_files(
+            image.image.storage, set(created.values()) - {image_name}
+        )
+        return 0
+    invalidate_image_cards(image)
+    return len(created)
+
+
+def publish_staged_images(post, post_uuid):
+    """
+    Turn the images the author of post staged under post_uuid into images of post
+    and return them. The PostImages reference the staged files and keep their
+    processing state, so nothing is copied. Must run inside a transaction.
+    """
+    staged_images = list(
+        PostImageStaged.objects.select_for_update()
+        .filter(profile=post.profile_id, post_uuid=post_uuid)
+        .order_by("pk")
+    )
+    post_images = []
+    for staged in staged_images:
+        if staged.status == ImageStatus.FAILED:
+            continue
+        # images still processing are claimed again as PostImages, the staged
+        # worker's swap then finds its row gone and cleans up after itself
+        post_images.append(
+            PostImage.objects.create(
+                post=post,
+                image=staged.image.name,
+                status=staged.status,
+                variants=staged.variants,
+            )
+        )
+
+    published = PostImageStaged.objects.filter(
+        pk__in=[staged.pk for staged in staged_images]
+    )
+    # the files now belong to the PostImages, only those of failed images are
+    # deleted with the staged rows
+    published.exclude(status=ImageStatus.FAILED).update(image="", variants={})
+    published.delete()
+    return post_images
+
+
+def sweep_staged_images(max_age, batch_size):
+    """
+    Delete the staged images uploaded more than max_age ago that were never
+    posted, and their files, batch_size at a time. Returns the number deleted.
+    """
+    cutoff = timezone.now() - max_age
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            # images being posted right now are locked and skipped
+            batch = list(
+                PostImageStaged.objects.select_for_update(skip_locked=True)
+                .filter(uploaded_at__lt=cutoff)
+                .order_by("pk")[:batch_size]
+            )
+            batch_pks = [image.pk for image in batch]
+            # their files are deleted when the transaction commits
+            PostImageStaged.objects.filter(pk__in=batch_pks).delete()
+        if not batch:
+            return deleted
+        deleted += len(batch)
+
+
+def upload_post_images(profile, uploads):
+    """
+    Save the images uploaded with a new Post to storage on a pool of
+    IMAGE_UPLOAD_THREADS threads, before the Post's transaction starts. The
+    files are saved under a staging key of profile. Returns the storage name of
+    each upload and the seconds it took, in upload order. If any upload fails
+    the saved files are deleted and the error is raised.
+    """
+    staged = PostImageStaged(profile=profile, post_uuid=uuid.uuid4().hex)
+    field = PostImageStaged._meta.get_field("image")
+
+    def save(index, upload):
+        start = time.perf_counter()
+        # prefixed so uploads with the same file name don't overwrite each other
+        filename = field.generate_filename(staged, f"{index}_{upload.name}")
+        name = field.storage.save(filename, upload)
+        return name, time.perf_counter() - start
+
+    threads = max(min(settings.IMAGE_UPLOAD_THREADS, len(uploads)), 1)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(save, index, upload) for index, upload in enumerate(uploads)
+        ]
+        wait(futures)
+
+    failed = [future for future in futures if future.exception() is not None]
+    if failed:
+        saved = [future.result()[0] for future in futures if future not in failed]
+        delete_stored_files(field.storage, saved)
+        raise failed[0].exception()
+    return [future.result() for future in futures]
@@ -0,0 +1,158 @@
+"""
+Django command to measure listing the followers of a much followed profile.
+"""
+
+import os
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from apps.core_app.models import Follow, PetType, Profile, ProfileImage
+from apps.posts_app.pagination import FollowListPagination
+from apps.posts_app.serializers import FollowProfileSerializer
+
+USERNAME_PREFIX = "follow_benchmark_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a profile with many followers and measure the time and queries "
+        "of reading a page of its followers: every follower loaded in Python, a "
+        "database page with lazy loads, a database page joined with the image, "
+        "pet type and follow flag, and a page of ids whose rows are then joined. "
+        "Everything it creates is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--followers",
+            type=int,
+            default=100_000,
+            help="Number of followers of the listed profile.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of times each page is read, the median is reported.",
+        )
+
+    def handle(self, *args, **options):
+        environment = os.environ.get("DJANGO_ENV")
+        if environment != "test" and environment != "dev":
+            self.stdout.write(
+                self.style.ERROR(
+                    "This command can only be run in a test or local dev environment!"
+                )
+            )
+            return
+
+        with transaction.atomic():
+            followed, viewer = self.create_followers(options["followers"])
+            page_size = FollowListPagination.page_size
+            followers = Profile.objects.filter(followers__followed=followed)
+            usernames = followers.order_by("username").values_list(
+                "username", flat=True
+            )
+            # keyset pagination reads a deep page the same way as the first
+            middle = usernames[options["followers"] // 2]
+
+            def materialized():
+                # every Follow row and its follower, then the page in Python
+                follows = Follow.objects.filter(followed=followed).select_related(
+                    "followed_by"
+                )
+                profiles = sorted(
+                    (follow.followed_by for follow in follows),
+                    key=lambda profile: profile.username,
+                )
+                return profiles[:page_size]
+
+            def lazy_page():
+                return followers.order_by("username")[:page_size]
+
+            def joined_page():
+                return followers.with_details(viewer.id).order_by("username")[
+                    :page_size
+                ]
+
+            def hydrated_page(queryset=followers):
+                # how the follow list views read a page
+                page_ids = list(
+                    queryset.order_by("username").values_list("id", flat=True)[
+                        :page_size
+                    ]
+                )
+                profiles = Profile.objects.with_details(viewer.id).in_bulk(page_ids)
+                return [profiles[pk] for pk in page_ids]
+
+            def deep_hydrated_page():
+                return hydrated_page(followers.filter(username__gt=middle))
+
+            for label, read_page in (
+                ("every follower in Python", materialized),
+                ("page with lazy loads", lazy_page),
+                ("page joined in one query", joined_page),
+                ("page of ids, then its rows joined", hydrated_page),
+                ("deep page of ids, then its rows joined", deep_hydrated_page),
+            ):
+                milliseconds, query_count = self.measure(
+                    read_page, viewer.id, options["repeat"]
+                )
+                self.stdout.write(
+                    f"{label}: {milliseconds:.1f} ms, {query_count} queries"
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
+
+    def create_followers(self, count):
+        """Create a profile followed by count profiles with images and pet types."""
+        User = get_user_model()
+        pet_type = PetType.objects.create(name=f"{USERNAME_PREFIX}pet_type")
+        users = User.objects.bulk_create(
+            [
+                User(email=f"{USERNAME_PREFIX}{index}@example.com")
+                for index in range(count + 2)
+            ],
+            batch_size=5000,
+        )
+        profiles = Profile.objects.bulk_create(
+            [
+                Profile(
+                    username=f"{USERNAME_PREFIX}{index}",
+                    user=user,
+                    pet_type=pet_type,
+                )
+                for index, user in enumerate(users)
+            ],
+            batch_size=5000,
+        )
+        followed, viewer, followers = profiles[0], profiles[1], profiles[2:]
+        ProfileImage.objects.bulk_create(
+            [
+                ProfileImage(profile=profile, image=f"{profile.username}.png")
+                for profile in followers
+            ],
+            batch_size=5000,
+        )
+        follows = [Follow(followed=followed, followed_by=p) for p in followers]
+        # the viewer follows every tenth follower
+        follows += [Follow(followed=p, followed_by=viewer) for p in followers[::10]]
+        Follow.objects.bulk_create(follows, batch_size=5000)
+        return followed, viewer
+
+    def measure(self, read_page, viewer_id, repeat):
+        """Return the median ms to read and serialize a page, and its queries."""
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                FollowProfileSerializer(
+                    read_page(), many=True, context={"profile_id": viewer_id}
+                ).data
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000, len(queries)
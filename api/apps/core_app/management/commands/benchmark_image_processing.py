@@ -0,0 +1,160 @@
+"""
+Django command to compare the speed and memory use of the image pipelines.
+"""
+
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from io import BytesIO
+from PIL import ExifTags, Image, ImageOps
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from apps.core_app.utils import (
+    WEBP_PRESETS,
+    create_square_variants,
+    crop_square_and_resize,
+)
+
+VARIANT_SIZES = (160, 320, 640, 1080)
+
+
+def legacy_crop_square_and_resize(image, image_size=1080):
+    """The pipeline before decoding at reduced size, kept as the baseline."""
+    img = Image.open(image)
+    img = ImageOps.exif_transpose(img)
+    width, height = img.size
+    if height > width:
+        left, right = 0, width
+        top = (height - width) / 2
+        bottom = top + width
+    else:
+        top, bottom = 0, height
+        left = (width - height) / 2
+        right = left + height
+    img = img.crop((left, top, right, bottom))
+    if img.width > image_size:
+        img = img.resize((image_size, image_size))
+    output = BytesIO()
+    img.save(output, "webp", optimize=True, quality=70)
+    return File(output, name=image.name.split(".")[0] + ".webp")
+
+
+PIPELINES = {
+    "legacy 1080": lambda image, preset: legacy_crop_square_and_resize(image),
+    "new 1080": lambda image, preset: crop_square_and_resize(image, 1080, preset),
+    "new all variants": lambda image, preset: create_square_variants(
+        image, VARIANT_SIZES, preset
+    ),
+}
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of this process in MB."""
+    # ru_maxrss carries over the parent's peak through the fork spawn starts
+    # with, VmHWM starts again at exec
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_pipeline(pipeline, paths, preset):
+    """
+    Run a pipeline over every image in a fresh process and return the ms per
+    image and the peak RSS of the process in MB.
+    """
+    run = PIPELINES[pipeline]
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, "rb") as image:
+            run(image, preset)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / len(paths), peak_rss_mb()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure ms per image and peak RSS of the old and new image pipelines on "
+        "synthetic large JPEGs and PNGs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=5,
+            help="Number of images of each format.",
+        )
+        parser.add_argument(
+            "--width",
+            type=int,
+            default=4032,
+            help="Width of the images, 4032 is a 12MP phone photo.",
+        )
+        parser.add_argument(
+            "--height",
+            type=int,
+            default=3024,
+            help="Height of the images.",
+        )
+        parser.add_argument(
+            "--preset",
+            choices=WEBP_PRESETS,
+            default="balanced",
+            help="WebP preset used by the new pipeline.",
+        )
+
+    def handle(self, *args, **options):
+        environment = os.environ.get("DJANGO_ENV")
+        if environment != "test" and environment != "dev":
+            self.stdout.write(
+                self.style.ERROR(
+                    "This command can only be run in a test or local dev environment!"
+                )
+            )
+            return
+
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = self.create_corpus(directory, options)
+            for image_format, paths in corpus.items():
+                for pipeline in PIPELINES:
+                    # every run gets its own process so peak RSS isn't shared
+                    with multiprocessing.get_context("spawn").Pool(1) as pool:
+                        ms_per_image, peak_rss = pool.apply(
+                            run_pipeline, (pipeline, paths, options["preset"])
+                        )
+                    self.stdout.write(
+                        f"{image_format} {pipeline}: {ms_per_image:.0f} ms/image, "
+                        f"peak RSS {peak_rss:.0f} MB"
+                    )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
+
+    def create_corpus(self, directory, options):
+        """Write count noisy JPEGs and PNGs, half the JPEGs rotated with EXIF."""
+        size = (options["width"], options["height"])
+        corpus = {"JPEG": [], "PNG": []}
+        for index in range(options["count"]):
+            # gradients with noise, so the images don't compress to nothing
+            noise = Image.effect_noise(size, 40 + index)
+            gradient = Image.linear_gradient("L").resize(size)
+            img = Image.merge("RGB", (noise, gradient, gradient.rotate(90)))
+
+            exif = Image.Exif()
+            if index % 2:
+                exif[ExifTags.Base.Orientation] = 6
+            path = os.path.join(directory, f"image_{index}.jpg")
+            img.save(path, "JPEG", quality=90, exif=exif)
+            corpus["JPEG"].append(path)
+
+            path = os.path.join(directory, f"image_{index}.png")
+            img.save(path, "PNG")
+            corpus["PNG"].append(path)
+        return corpus
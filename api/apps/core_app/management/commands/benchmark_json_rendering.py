@@ -0,0 +1,199 @@
+"""
+Django command to measure rendering and parsing a feed page as JSON.
+"""
+
+import os
+import statistics
+import time
+import tracemalloc
+from io import BytesIO
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from apps.core_app.models import (
+    Post,
+    PostImage,
+    PostReport,
+    Profile,
+    ProfileImage,
+    ReportReason,
+)
+from apps.core_app.parsers import ORJSONParser
+from apps.core_app.renderers import ORJSONRenderer
+from apps.posts_app.serializers import PostDetailedSerializer
+
+USERNAME_PREFIX = "json_benchmark_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize a feed page of posts with images, authors and reports, then "
+        "measure the time and peak memory allocated to render it with DRF's "
+        "JSONRenderer and the orjson renderer, and to parse it back with their "
+        "parsers. Everything it creates is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--posts",
+            type=int,
+            default=24,
+            help="Number of posts on the page, 24 is an explore page.",
+        )
+        parser.add_argument(
+            "--images-per-post",
+            type=int,
+            default=3,
+            help="Number of images of each post.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=200,
+            help="Number of times the page is rendered, the median is reported.",
+        )
+
+    def handle(self, *args, **options):
+        environment = os.environ.get("DJANGO_ENV")
+        if environment != "test" and environment != "dev":
+            self.stdout.write(
+                self.style.ERROR(
+                    "This command can only be run in a test or local dev environment!"
+                )
+            )
+            return
+
+        with transaction.atomic():
+            page = self.create_page(options["posts"], options["images_per_post"])
+            transaction.set_rollback(True)
+
+        rendered = {}
+        for label, renderer in (
+            ("JSONRenderer", JSONRenderer()),
+            ("ORJSONRenderer", ORJSONRenderer()),
+        ):
+            rendered[label] = renderer.render(page)
+            milliseconds = self.measure(
+                lambda: renderer.render(page), options["repeat"]
+            )
+            peak = self.peak_allocation(lambda: renderer.render(page))
+            self.stdout.write(
+                f"render with {label}: {milliseconds:.3f} ms/page, "
+                f"{peak / 1024:.1f} KiB peak allocation"
+            )
+
+        body = rendered["JSONRenderer"]
+        self.stdout.write(
+            f"{len(body) / 1024:.1f} KiB page, the renderers' output is "
+            f"{'the same' if len(set(rendered.values())) == 1 else 'different'}"
+        )
+
+        for label, parser in (
+            ("JSONParser", JSONParser()),
+            ("ORJSONParser", ORJSONParser()),
+        ):
+            milliseconds = self.measure(
+                lambda: parser.parse(BytesIO(body)), options["repeat"]
+            )
+            peak = self.peak_allocation(lambda: parser.parse(BytesIO(body)))
+            self.stdout.write(
+                f"parse with {label}: {milliseconds:.3f} ms/page, "
+                f"{peak / 1024:.1f} KiB peak allocation"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
+
+    def create_page(self, post_count, images_per_post):
+        """Create posts like a feed page's and return the page's data."""
+        User = get_user_model()
+        users = User.objects.bulk_create(
+            [
+                User(email=f"{USERNAME_PREFIX}{index}@example.com")
+                for index in range(post_count + 1)
+            ]
+        )
+        profiles = Profile.objects.bulk_create(
+            [
+                Profile(
+                    username=f"{USERNAME_PREFIX}{index}",
+                    name=f"Benchmark Pet {index}",
+                    user=user,
+                )
+                for index, user in enumerate(users)
+            ]
+        )
+        viewer, authors = profiles[0], profiles[1:]
+        ProfileImage.objects.bulk_create(
+            [
+                ProfileImage(
+                    profile=profile,
+                    image=f"images/benchmark/{profile.username}.webp",
+                    variants=self.variants(profile.username, (160, 320)),
+                )
+                for profile in authors
+            ]
+        )
+        posts = Post.objects.bulk_create(
+            [
+                Post(
+                    caption=f"A sunny walk in the park with my best friend #{index}",
+                    profile=profile,
+                    likes_count=index * 7,
+                    comments_count=index,
+                )
+                for index, profile in enumerate(authors)
+            ]
+        )
+        PostImage.objects.bulk_create(
+            [
+                PostImage(
+                    post=post,
+                    image=f"images/benchmark/{post.id}/{index}.webp",
+                    variants=self.variants(f"{post.id}/{index}", (160, 320, 640)),
+                )
+                for post in posts
+                for index in range(images_per_post)
+            ]
+        )
+        # every sixth post has an open report
+        reason = ReportReason.objects.create(name=f"{USERNAME_PREFIX}reason")
+        reported = posts[::6]
+        PostReport.objects.bulk_create(
+            [
+                PostReport(post=post, reporter=viewer, reason=reason)
+                for post in reported
+            ]
+        )
+        Post.objects.filter(pk__in=[post.pk for post in reported]).update(
+            has_open_reports=True
+        )
+
+        page = Post.objects.with_details(viewer.id).order_by("-created_at", "-id")
+        return {
+            "next": "http://localhost:8000/api/posts/explore/?cursor=cD0yMDI0",
+            "previous": None,
+            "results": PostDetailedSerializer(page, many=True).data,
+        }
+
+    def variants(self, name, sizes):
+        return {str(size): f"images/benchmark/{name}_{size}.webp" for size in sizes}
+
+    def measure(self, func, repeat):
+        """Return the median ms of calling func."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def peak_allocation(self, func):
+        """Return the most bytes allocated at once while calling func."""
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,132 @@
+"""
+Django command to measure like throughput on a single hot post.
+"""
+
+import os
+import threading
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from apps.core_app.counters import get_post_likes_count, shard_post_like_counter
+from apps.core_app.models import Like, Post, Profile
+
+USERNAME_PREFIX = "like_benchmark_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure how many likes and unlikes a second a single post handles with "
+        "and without a sharded like counter. Needs a local Postgres database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=16,
+            help="Number of threads liking and unliking the post at the same time.",
+        )
+        parser.add_argument(
+            "--seconds",
+            type=float,
+            default=10,
+            help="How long to run each benchmark for.",
+        )
+        parser.add_argument(
+            "--hold-ms",
+            type=float,
+            default=5,
+            help=(
+                "Milliseconds each like transaction stays open after the count is "
+                "updated, standing in for the rest of the request."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        environment = os.environ.get("DJANGO_ENV")
+        if environment != "test" and environment != "dev":
+            self.stdout.write(
+                self.style.ERROR(
+                    "This command can only be run in a test or local dev environment!"
+                )
+            )
+            return
+        if connection.vendor != "postgresql":
+            self.stdout.write(
+                self.style.ERROR(
+                    "This command needs Postgres, SQLite locks the whole database "
+                    "on write so there is no row contention to measure."
+                )
+            )
+            return
+
+        profiles = self.create_profiles(options["workers"] + 1)
+        author, likers = profiles[0], profiles[1:]
+        try:
+            for sharded in (False, True):
+                post = Post.objects.create(caption="Like benchmark", profile=author)
+                if sharded:
+                    shard_post_like_counter(post.id)
+
+                # a write count never equals 0, so the unsharded post is not
+                # promoted part way through its run
+                with override_settings(LIKE_COUNTER_SHARD_THRESHOLD=0):
+                    writes = self.run_workers(
+                        post.id, likers, options["seconds"], options["hold_ms"]
+                    )
+
+                post.refresh_from_db()
+                label = "sharded" if sharded else "single row"
+                self.stdout.write(
+                    f"{label}: {writes / options['seconds']:.0f} like writes/s "
+                    f"({writes} in {options['seconds']}s), "
+                    f"final like count {get_post_likes_count(post)}"
+                )
+        finally:
+            get_user_model().objects.filter(
+                profiles__username__startswith=USERNAME_PREFIX
+            ).delete()
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
+
+    def create_profiles(self, count):
+        profiles = []
+        for index in range(count):
+            user = get_user_model().objects.create_user(
+                email=f"{USERNAME_PREFIX}{index}@example.com"
+            )
+            profiles.append(
+                Profile.objects.create(username=f"{USERNAME_PREFIX}{index}", user=user)
+            )
+        return profiles
+
+    def run_workers(self, post_id, profiles, seconds, hold_ms):
+        """Like and unlike the post from each profile until time runs out."""
+        deadline = time.monotonic() + seconds
+        writes = [0] * len(profiles)
+
+        def work(index, profile):
+            try:
+                while time.monotonic() < deadline:
+                    with transaction.atomic():
+                        Like.objects.create(profile=profile, post_id=post_id)
+                        time.sleep(hold_ms / 1000)
+                    with transaction.atomic():
+                        Like.objects.get(profile=profile, post_id=post_id).delete()
+                        time.sleep(hold_ms / 1000)
+                    writes[index] += 2
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=work, args=(index, profile))
+            for index, profile in enumerate(profiles)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(writes)
@@ -0,0 +1,123 @@
+"""
+Django command to measure the memory and query time of the username index.
+"""
+
+import gc
+import random
+import string
+import time
+import tracemalloc
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core_app.search_index import SortedKeys, UsernameIndex, profile_keys
+
+WORDS = [
+    "buddy",
+    "max",
+    "bella",
+    "luna",
+    "charlie",
+    "daisy",
+    "milo",
+    "coco",
+    "rocky",
+    "bailey",
+    "the",
+    "dog",
+    "cat",
+    "pup",
+    "paws",
+]
+
+
+def fake_profile(rng):
+    """Return a username and name shaped like the ones people pick."""
+    first, second = rng.choice(WORDS), rng.choice(WORDS)
+    suffix = "".join(rng.choices(string.ascii_lowercase + string.digits, k=4))
+    return f"{first}_{second}_{suffix}", f"{first.title()} {second.title()}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the username index over synthetic profiles and report its memory, "
+        "the memory of the same keys in a sorted list of str and the time of "
+        "prefix queries. Doesn't need a database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--count",
+            type=int,
+            default=1_000_000,
+            help="Number of profiles.",
+        )
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=10_000,
+            help="Number of prefix queries timed.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        usernames = []
+        words = []
+        for profile_id in range(1, options["count"] + 1):
+            username_key, word_keys = profile_keys(*fake_profile(rng))
+            usernames.append((username_key, profile_id))
+            words.extend((word, profile_id) for word in word_keys)
+        self.stdout.write(
+            f"{len(usernames)} usernames, {len(words)} username and name words"
+        )
+
+        index, index_mb = self.measure(
+            lambda: (SortedKeys(usernames), SortedKeys(words))
+        )
+        self.stdout.write(
+            f"SortedKeys: {index_mb:.1f} MB "
+            f"({sum(keys.nbytes() for keys in index) / 2**20:.1f} MB of arrays)"
+        )
+        _, list_mb = self.measure(
+            lambda: (
+                sorted((key.decode(), pk) for key, pk in usernames),
+                sorted((key.decode(), pk) for key, pk in words),
+            )
+        )
+        self.stdout.write(f"sorted list of (str, id) tuples: {list_mb:.1f} MB")
+
+        username_index = UsernameIndex()
+        username_index.state = (*index, {})
+        prefixes = [
+            rng.choice(WORDS)[: rng.randint(1, 4)] for _ in range(options["queries"])
+        ]
+        limit = settings.USERNAME_INDEX_MAX_RESULTS + 1
+
+        def first_page(prefix):
+            return list(zip(range(13), index[0].with_prefix(prefix.encode())))
+
+        def search(prefix):
+            return username_index.search(prefix, limit)
+
+        for label, query in (
+            ("first 13 usernames", first_page),
+            (f"search for up to {limit} ids", search),
+        ):
+            start = time.perf_counter()
+            for prefix in prefixes:
+                query(prefix)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{label}: {elapsed * 1_000_000 / len(prefixes):.1f} us/query"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Benchmark finished."))
+
+    def measure(self, build):
+        """Return what build returns and the MB it allocated and kept."""
+        gc.collect()
+        tracemalloc.start()
+        result = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return result, size / 2**20
@@ -1,6 +1,7 @@
 import os
 from django.core.management.base import BaseCommand
 from django.core.management import call_command
+from apps.core_app.models import Post
 
 
 class Command(BaseCommand):
@@ -56,4 +57,10 @@ class Command(BaseCommand):
         for fixture_path in fixture_paths:
             call_command("loaddata", fixture_path)
 
+        # fixtures are loaded raw so the feeds, counters and moderation flags
+        # have to be built from the loaded data
+        call_command("rebuild_feeds")
+        call_command("reconcile_counters")
+        Post.objects.update_moderation_flags()
+
         self.stdout.write(self.style.SUCCESS("Database fixtures loaded successfully!"))
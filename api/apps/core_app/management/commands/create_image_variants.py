@@ -0,0 +1,75 @@
+from concurrent.futures import as_completed
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core_app.image_worker import create_pool, run_backfill_task
+from apps.core_app.images import (
+    PROCESSED_IMAGE_MODELS,
+    create_missing_variants,
+    missing_variant_sizes,
+)
+from apps.core_app.models import ImageStatus
+
+
+class Command(BaseCommand):
+    help = "Backfill the size variants of processed post and profile images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.IMAGE_PROCESSING_WORKERS,
+            help="Number of worker processes. 0 creates variants in this process.",
+        )
+        parser.add_argument(
+            "--memory-limit-mb",
+            type=int,
+            default=settings.IMAGE_PROCESSING_MEMORY_LIMIT_MB,
+            help="Address space limit of each worker process. 0 for no limit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of images to load from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        tasks = []
+        for model in PROCESSED_IMAGE_MODELS:
+            images = (
+                model.objects.filter(status=ImageStatus.READY)
+                .order_by("pk")
+                .values_list("pk", "variants")
+            )
+            for pk, variants in images.iterator(chunk_size=options["batch_size"]):
+                if missing_variant_sizes(model, variants):
+                    tasks.append((model._meta.label, pk))
+
+        self.stdout.write(f"{len(tasks)} images are missing variants.")
+
+        created_count = 0
+        failed_count = 0
+        if not options["workers"]:
+            for task in tasks:
+                created_count += create_missing_variants(*task)
+        else:
+            pool = create_pool(options["workers"], options["memory_limit_mb"])
+            with pool:
+                futures = {
+                    pool.submit(run_backfill_task, *task): task for task in tasks
+                }
+                for future in as_completed(futures):
+                    model_label, pk = futures[future]
+                    try:
+                        created_count += future.result()
+                    except Exception as e:
+                        failed_count += 1
+                        self.stderr.write(
+                            f"Error creating variants of {model_label} {pk}: {e}"
+                        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created_count} variants, {failed_count} images failed."
+            )
+        )
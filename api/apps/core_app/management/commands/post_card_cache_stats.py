@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core_app.post_cards import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the post card cache hits and misses of each endpoint since the "
+        "counts were last reset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counts after printing them.",
+        )
+
+    def handle(self, *args, **options):
+        for endpoint, counts in get_stats().items():
+            lookups = counts["hits"] + counts["misses"]
+            hit_rate = f"{counts['hits'] / lookups:.1%}" if lookups else "-"
+            enabled = "on" if endpoint in settings.POST_CARD_CACHE_ENDPOINTS else "off"
+            self.stdout.write(
+                f"{endpoint} ({enabled}): {counts['hits']} hits, "
+                f"{counts['misses']} misses, hit rate {hit_rate}"
+            )
+
+        if options["reset"]:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counts reset."))
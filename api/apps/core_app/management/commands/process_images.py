@@ -0,0 +1,127 @@
+import time
+from datetime import timedelta
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core_app.deletions import retry_storage_deletions
+from apps.core_app.image_worker import create_pool, run_task
+from apps.core_app.images import (
+    PROCESSED_IMAGE_MODELS,
+    claim_images,
+    process_image,
+    sweep_staged_images,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Crop and resize uploaded images waiting to be processed. Every "
+        "STAGED_IMAGE_SWEEP_INTERVAL seconds, also delete staged images that were "
+        "never posted and retry failed file deletions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.IMAGE_PROCESSING_WORKERS,
+            help="Number of worker processes. 0 processes images in this process.",
+        )
+        parser.add_argument(
+            "--memory-limit-mb",
+            type=int,
+            default=settings.IMAGE_PROCESSING_MEMORY_LIMIT_MB,
+            help="Address space limit of each worker process. 0 for no limit.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2,
+            help="Seconds to wait before checking again when no images are waiting.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the images that are waiting and exit.",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.pool = None
+        self.last_sweep = None
+        processed_count = 0
+
+        try:
+            while True:
+                self.sweep_if_due()
+                count = self.process_waiting_images()
+                processed_count += count
+                if options["once"] and not count:
+                    break
+                if not count:
+                    time.sleep(options["poll_interval"])
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed_count} images."))
+
+    def sweep_if_due(self):
+        """
+        Delete abandoned staged images and retry failed file deletions if the
+        sweep interval has passed.
+        """
+        now = time.monotonic()
+        if (
+            self.last_sweep is not None
+            and now - self.last_sweep < settings.STAGED_IMAGE_SWEEP_INTERVAL
+        ):
+            return
+        self.last_sweep = now
+        max_age = timedelta(hours=settings.STAGED_IMAGE_MAX_AGE_HOURS)
+        deleted = sweep_staged_images(max_age, batch_size=500)
+        if deleted:
+            self.stdout.write(f"Deleted {deleted} abandoned staged images.")
+        deleted = retry_storage_deletions()
+        if deleted:
+            self.stdout.write(f"Deleted {deleted} files that failed to delete before.")
+
+    def process_waiting_images(self):
+        """Claim a batch of waiting images, process them and return the count."""
+        # claim enough images to keep every worker busy
+        batch_size = max(self.options["workers"], 1) * 2
+        tasks = []
+        for model in PROCESSED_IMAGE_MODELS:
+            for pk in claim_images(model, batch_size - len(tasks)):
+                tasks.append((model._meta.label, pk))
+            if len(tasks) >= batch_size:
+                break
+
+        if not self.options["workers"]:
+            for model_label, pk in tasks:
+                process_image(model_label, pk)
+            return len(tasks)
+
+        futures = [self.get_pool().submit(run_task, *task) for task in tasks]
+        wait(futures)
+        for future, (model_label, pk) in zip(futures, tasks):
+            try:
+                future.result()
+            except BrokenProcessPool:
+                # a worker was killed, usually for running out of memory. The
+                # image is retried once its claim times out.
+                self.stderr.write(f"Worker died processing {model_label} {pk}.")
+                if self.pool is not None:
+                    self.pool.shutdown(wait=False)
+                    self.pool = None
+            except Exception as e:
+                self.stderr.write(f"Error processing {model_label} {pk}: {e}")
+        return len(tasks)
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = create_pool(
+                self.options["workers"], self.options["memory_limit_mb"]
+            )
+        return self.pool
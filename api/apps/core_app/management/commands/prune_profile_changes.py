@@ -0,0 +1,35 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core_app.search_index import prune_profile_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the profile changes every username index has read, those older "
+        "than USERNAME_INDEX_CHANGE_RETENTION_HOURS, every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.USERNAME_INDEX_PRUNE_INTERVAL,
+            help="Seconds to wait between prunes.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Prune the profile changes once and exit.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = prune_profile_changes()
+            if options["once"]:
+                break
+            if deleted:
+                self.stdout.write(f"Deleted {deleted} profile changes.")
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} profile changes."))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.core_app.feed import rebuild_feed, update_fan_out_modes
+from apps.core_app.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Backfill or rebuild the materialized home feed of each profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            type=int,
+            action="append",
+            dest="profile_ids",
+            help="Only rebuild the feed of this profile id. Can be repeated.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of profile ids to load from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        pulled_profile_ids = update_fan_out_modes()
+        self.stdout.write(
+            f"{len(pulled_profile_ids)} profiles have their posts pulled on read."
+        )
+
+        profiles = Profile.objects.order_by("id")
+        if options["profile_ids"]:
+            profiles = profiles.filter(id__in=options["profile_ids"])
+        profile_ids = profiles.values_list("id", flat=True)
+
+        profiles_count = 0
+        entries_count = 0
+        for profile_id in profile_ids.iterator(chunk_size=options["batch_size"]):
+            # one short transaction per profile so readers never see a half built feed
+            with transaction.atomic():
+                entries_count += rebuild_feed(profile_id)
+            profiles_count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {profiles_count} feeds with {entries_count} entries."
+            )
+        )
@@ -0,0 +1,60 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+from apps.core_app.counters import COUNTERS, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the denormalized like, comment, reply, follower, following and "
+        "post counters in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            choices=[model.__name__.lower() for model in COUNTERS],
+            help="Only reconcile the counters of this model. Can be repeated.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows to check in each transaction.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to pause between batches to limit load on the database.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        for model, counters in COUNTERS.items():
+            model_name = model.__name__.lower()
+            if options["models"] and model_name not in options["models"]:
+                continue
+
+            bounds = model.objects.aggregate(first=Min("pk"), last=Max("pk"))
+            if bounds["first"] is None:
+                continue
+
+            fixed_count = 0
+            for start_pk in range(bounds["first"], bounds["last"] + 1, batch_size):
+                # each batch runs in its own short transaction so rows are
+                # only locked while their batch is being fixed
+                with transaction.atomic():
+                    fixed_count += reconcile(model, start_pk, start_pk + batch_size)
+                if options["sleep"]:
+                    time.sleep(options["sleep"])
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Fixed {', '.join(counters)} on {fixed_count} {model_name} rows."
+                )
+            )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from apps.core_app.deletions import DELETE_BATCH_SIZE, retry_storage_deletions
+from apps.core_app.models import StorageDeletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Retry deleting the image files that couldn't be deleted with their rows. "
+        "process_images also runs this periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DELETE_BATCH_SIZE,
+            help="Number of files to delete in each request.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = retry_storage_deletions(options["batch_size"])
+        remaining = StorageDeletion.objects.count()
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} files, {remaining} still failing.")
+        )
@@ -0,0 +1,44 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core_app.emails import claim_emails, send_emails
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the emails waiting in the email outbox, one connection to the mail "
+        "server per batch. Emails that fail are retried with backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help="Number of emails sent over one connection.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2,
+            help="Seconds to wait before checking again when no emails are waiting.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the emails that are waiting and exit.",
+        )
+
+    def handle(self, *args, **options):
+        sent_count = 0
+
+        while True:
+            pks = claim_emails(options["batch_size"])
+            if pks:
+                sent_count += send_emails(pks)
+            if options["once"] and not pks:
+                break
+            if not pks:
+                time.sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent_count} emails."))
@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core_app.images import sweep_staged_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete staged post images that were never posted, and their files, in "
+        "batches. process_images also runs this sweep periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age-hours",
+            type=float,
+            default=settings.STAGED_IMAGE_MAX_AGE_HOURS,
+            help="Delete staged images uploaded more than this many hours ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of staged images to delete in each transaction.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = sweep_staged_images(
+            timedelta(hours=options["max_age_hours"]), options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} staged images."))
@@ -1,6 +1,7 @@
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils.functional import SimpleLazyObject
-from .models import Profile
+from .authentication import token_profile_ids
+from .profiles import get_owned_profile
 
 
 class ProfileAuthenticationMiddleware:
@@ -39,14 +40,16 @@ class ProfileAuthenticationMiddleware:
                 detail="Profile ID not provided in headers", code="profile_id_missing"
             )
 
-        try:
-            profile = request.user.profiles.get(id=profile_id)
-            return profile
-
-        except Profile.DoesNotExist:
+        # ownership comes from the token's claims or the cache, the rest of the
+        # profile is only loaded if used
+        profile = get_owned_profile(
+            request.user, profile_id, token_profile_ids(request)
+        )
+        if profile is None:
             raise AuthenticationFailed(
                 detail="Invalid profile ID", code="profile_invalid"
             )
+        return profile
 
     def _is_excluded_path(self, path):
         """
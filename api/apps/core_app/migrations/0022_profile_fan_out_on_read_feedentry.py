@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_app', '0021_resetpasswordtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='fan_out_on_read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='core_app.post')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='core_app.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', '-created_at', '-post'], name='feedentry_profile_created_idx')],
+                'unique_together': {('profile', 'post')},
+            },
+        ),
+    ]
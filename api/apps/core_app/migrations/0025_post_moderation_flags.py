@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:43
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def set_moderation_flags(apps, schema_editor):
+    Post = apps.get_model("core_app", "Post")
+    PostReport = apps.get_model("core_app", "PostReport")
+    open_reports = PostReport.objects.filter(post=OuterRef("pk")).exclude(
+        status="DISMISSED"
+    )
+    Post.objects.update(
+        # reason 1 is "Inappropriate Content"
+        is_inappropriate=Exists(open_reports.filter(reason=1)),
+        has_open_reports=Exists(open_reports),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_app', '0024_post_like_counter_sharded_postlikecountershard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='has_open_reports',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_inappropriate',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(set_moderation_flags, migrations.RunPython.noop),
+    ]
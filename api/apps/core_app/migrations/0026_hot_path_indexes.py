@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:46
+
+from django.db import migrations, models
+
+from apps.core_app.operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+    # indexes are created concurrently on Postgres, which can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('core_app', '0025_post_moderation_flags'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='comment',
+            index=models.Index(fields=['post', 'parent_comment', '-created_at'], name='comment_post_parent_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='comment',
+            index=models.Index(fields=['parent_comment', 'created_at'], name='comment_parent_created_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='follow',
+            index=models.Index(fields=['followed_by', 'followed'], name='follow_followed_by_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='like',
+            index=models.Index(fields=['post', 'profile'], name='like_post_profile_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='post',
+            index=models.Index(fields=['profile', '-created_at'], name='post_profile_created_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='postreport',
+            index=models.Index(fields=['post', 'status'], name='postreport_post_status_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='postreport',
+            index=models.Index(fields=['reporter', '-created_at'], name='postreport_reporter_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='savedpost',
+            index=models.Index(fields=['profile', '-saved_at'], name='savedpost_profile_saved_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-17 02:50
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from apps.core_app.operations import AddIndexConcurrentlyOnlyPostgres
+
+
+class Migration(migrations.Migration):
+    # indexes are created concurrently on Postgres, which can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('core_app', '0031_email_outbox'),
+    ]
+
+    operations = [
+        # only runs on Postgres
+        TrigramExtension(),
+        # the index is kept out of the state and Profile.Meta.indexes, so SQLite
+        # doesn't try to create it when it copies the table in later migrations
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                AddIndexConcurrentlyOnlyPostgres(
+                    model_name='profile',
+                    index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('username'), name='gin_trgm_ops'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='profile_search_trgm_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -1,5 +1,19 @@
 import os
-from django.db import models
+import re
+from django.db import connections, models
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import (
+    BooleanField,
+    Exists,
+    ExpressionWrapper,
+    F,
+    FilteredRelation,
+    OuterRef,
+    Prefetch,
+    Q,
+)
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from django.db import models
@@ -9,7 +23,6 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
 )
-from .utils import crop_square_and_resize
 
 
 class UserManager(BaseUserManager):
@@ -42,6 +55,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_email_verified = models.BooleanField(default=False)
+    # incremented to revoke the user's tokens, see core_app.authentication
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = UserManager()
 
@@ -50,6 +65,16 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def change_password(self, raw_password):
+        """
+        Save a new password and revoke the tokens issued before it. set_password
+        alone doesn't revoke them, as Django also calls it to upgrade the hash of
+        an unchanged password on login.
+        """
+        self.set_password(raw_password)
+        self.token_version = F("token_version") + 1
+        self.save(update_fields=["password", "token_version"])
+
 
 class VerifyEmailToken(models.Model):
     user = models.OneToOneField(
@@ -86,6 +111,55 @@ class PetType(models.Model):
         return self.name
 
 
+class ProfileQuerySet(models.QuerySet):
+    """QuerySet for Profiles."""
+
+    def search(self, text):
+        """Filter to the Profiles with a word of their username or name starting
+        with text, the same Profiles the username index finds, best matches
+        first. Usernames starting with text come first. On Postgres the rest are
+        ranked by trigram similarity and the match is served by the
+        profile_search_trgm_idx GIN index, other databases order them by username.
+        """
+        # words are split on the characters apps.core_app.search_index splits on
+        word_prefix = r"(^|\W|_)" + re.escape(text)
+        queryset = self.filter(
+            Q(username__iregex=word_prefix) | Q(name__iregex=word_prefix)
+        ).annotate(
+            username_prefix=ExpressionWrapper(
+                Q(username__istartswith=text), output_field=BooleanField()
+            )
+        )
+        ordering = ["-username_prefix"]
+        if connections[self.db].vendor == "postgresql":
+            queryset = queryset.annotate(
+                similarity=Greatest(
+                    TrigramSimilarity("username", text),
+                    TrigramSimilarity("name", text),
+                )
+            )
+            ordering.append("-similarity")
+        return queryset.order_by(*ordering, "username")
+
+    def with_viewer_following(self, profile_id):
+        """Annotate whether the requesting profile follows each Profile."""
+        return self.annotate(
+            viewer_following=Exists(
+                Follow.objects.filter(followed=OuterRef("pk"), followed_by=profile_id)
+            )
+        )
+
+    def with_details(self, profile_id):
+        """Attach everything the FollowProfileSerializer needs to each Profile.
+        The image and pet type are joined and whether the requesting profile
+        follows each Profile is annotated, so the Profiles of a page are loaded
+        in a single query.
+        """
+        return self.select_related("image", "pet_type").with_viewer_following(
+            profile_id
+        )
+
+
 class Profile(models.Model):
     """Profile for each user."""
 
@@ -99,11 +173,64 @@ class Profile(models.Model):
         PetType, on_delete=models.SET_NULL, null=True, related_name="type", blank=True
     )
     breed = models.CharField(max_length=64, default="", blank=True)
+    # not changed by the counter updates below, see apps.core_app.conditional
+    updated_at = models.DateTimeField(auto_now=True)
+    # Profiles with too many followers to copy each post into every follower's
+    # feed. Their posts are pulled into feeds when the feed is read instead.
+    fan_out_on_read = models.BooleanField(default=False)
+    # counters kept up to date by apps.core_app.counters
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+    posts_count = models.IntegerField(default=0)
+
+    # ProfileQuerySet.search is served by the profile_search_trgm_idx GIN index on
+    # Postgres. It isn't in Meta.indexes: SQLite copies the table with the Meta
+    # indexes to alter most fields and can't create it, so migration 0032 creates
+    # it on Postgres only without adding it to the migration state.
+    objects = ProfileQuerySet.as_manager()
 
     def __str__(self):
         return self.username
 
 
+class ImageStatus(models.TextChoices):
+    PROCESSING = "PROCESSING", _("Processing")
+    READY = "READY", _("Ready")
+    FAILED = "FAILED", _("Failed")
+
+
+class ProcessedImage(models.Model):
+    """
+    Base for uploaded images that are cropped and resized in the background.
+    New uploads are stored as sent with a PROCESSING status and processed by the
+    image workers (see apps.core_app.images), which swap in the processed file.
+    """
+
+    # widths (and heights) of the square variants created from the upload. The
+    # largest variant is stored in the image field.
+    variant_sizes = (160, 320, 640, 1080)
+
+    status = models.CharField(
+        max_length=10, choices=ImageStatus.choices, default=ImageStatus.READY
+    )
+    # storage names of the variants keyed by size, e.g. {"160": "images/..."}
+    variants = models.JSONField(default=dict, blank=True)
+    # set when a worker claims the image, used to retry images of crashed workers
+    processing_started_at = models.DateTimeField(null=True, blank=True)
+    processing_attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # a newly uploaded file has not been written to storage yet
+        if self.image and not self.image._committed:
+            self.status = ImageStatus.PROCESSING
+            self.processing_started_at = None
+            self.processing_attempts = 0
+        super().save(*args, **kwargs)
+
+
 def profile_image_path(instance, filename):
     """Generate S3 path (key) for saving profile image.
     The key is {user_id}/{profile_id}/profile_image.webp
@@ -120,7 +247,9 @@ def profile_image_path(instance, filename):
     return path
 
 
-class ProfileImage(models.Model):
+class ProfileImage(ProcessedImage):
+    variant_sizes = (160, 320)
+
     profile = models.OneToOneField(
         Profile, on_delete=models.CASCADE, related_name="image"
     )
@@ -128,9 +257,109 @@ class ProfileImage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def save(self, *args, **kwargs):
-        self.image = crop_square_and_resize(self.image, image_size=320)
-        super().save(*args, **kwargs)
+
+class PostQuerySet(models.QuerySet):
+    """QuerySet for Posts."""
+
+    def with_details(self, profile_id=None):
+        """Attach everything the PostDetailedSerializer needs to each Post.
+        The requesting profile's liked/saved/reported flags are annotated, and
+        images, the author profile (with image and pet type) and non-dismissed
+        reports are loaded in batches for the whole page.
+        """
+        queryset = (
+            self.select_related("profile__image", "profile__pet_type")
+            .prefetch_related(
+                "images",
+                Prefetch(
+                    "reports",
+                    queryset=PostReport.objects.filter(
+                        ~Q(status=PostReport.ReportStatus.DISMISSED)
+                    ).select_related("reason"),
+                    to_attr="open_reports",
+                ),
+            )
+        )
+
+        if profile_id:
+            queryset = queryset.annotate(
+                viewer_liked=Exists(
+                    Like.objects.filter(post=OuterRef("pk"), profile=profile_id)
+                ),
+                viewer_saved=Exists(
+                    SavedPost.objects.filter(post=OuterRef("pk"), profile=profile_id)
+                ),
+                viewer_reported=Exists(
+                    PostReport.objects.filter(
+                        post=OuterRef("pk"), reporter=profile_id
+                    )
+                ),
+            )
+
+        return queryset
+
+    def update_moderation_flags(self):
+        """Recompute is_inappropriate and has_open_reports from the Posts' reports."""
+        open_reports = PostReport.objects.filter(post=OuterRef("pk")).exclude(
+            status=PostReport.ReportStatus.DISMISSED
+        )
+        return self.update(
+            is_inappropriate=Exists(
+                open_reports.filter(reason=ReportReason.INAPPROPRIATE_CONTENT_ID)
+            ),
+            has_open_reports=Exists(open_reports),
+        )
+
+    def feed_sources_of(self, profile_id):
+        """Return the querysets of the posts in a Profile's home feed, one for
+        each source, annotated with feed_created_at which is used to order the
+        feed. Posts from most followed profiles are written to each follower's
+        feed as FeedEntry rows. Posts from profiles that fan out on read are read
+        from the posts of those profiles instead. Each source is a range of an
+        index, so a page of the feed is the merge of a page of each source, see
+        apps.posts_app.pagination.FeedPostsPagination.
+        """
+        sources = [
+            # a single range of the viewer's feed entries
+            self.annotate(
+                viewer_entry=FilteredRelation(
+                    "feed_entries", condition=Q(feed_entries__profile=profile_id)
+                )
+            )
+            .filter(viewer_entry__isnull=False)
+            .annotate(feed_created_at=F("viewer_entry__created_at"))
+        ]
+        pulled_profile_ids = list(
+            Follow.objects.filter(
+                followed_by=profile_id, followed__fan_out_on_read=True
+            ).values_list("followed", flat=True)
+        )
+        if pulled_profile_ids:
+            # feed entries are created with the created_at of their post
+            sources.append(
+                self.filter(profile__in=pulled_profile_ids).annotate(
+                    feed_created_at=F("created_at")
+                )
+            )
+        return sources
+
+    def in_feed_of(self, profile_id):
+        """Filter to the posts in a Profile's home feed, see feed_sources_of.
+        The ids of the posts of both sources are read by a UNION subquery, each
+        served by an index, and no query runs until the queryset is evaluated.
+        Each Post is annotated with feed_created_at.
+        """
+        pulled_profile_ids = Follow.objects.filter(
+            followed_by=profile_id, followed__fan_out_on_read=True
+        ).values("followed")
+        feed_post_ids = (
+            FeedEntry.objects.filter(profile=profile_id)
+            .values("post")
+            .union(Post.objects.filter(profile__in=pulled_profile_ids).values("id"))
+        )
+        return self.filter(id__in=feed_post_ids).annotate(
+            feed_created_at=F("created_at")
+        )
 
 
 class Post(models.Model):
@@ -141,10 +370,28 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     contains_ai = models.BooleanField(blank=True, default=False)
+    # counters kept up to date by apps.core_app.counters
+    likes_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    # likes of sharded posts are split between likes_count and PostLikeCounterShards
+    like_counter_sharded = models.BooleanField(default=False)
+    # moderation state kept up to date from the Post's non-dismissed reports
+    is_inappropriate = models.BooleanField(default=False, db_index=True)
+    has_open_reports = models.BooleanField(default=False, db_index=True)
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return f"Post {self.id} - {self.caption}"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["profile", "-created_at"], name="post_profile_created_idx"
+            ),
+            models.Index(fields=["-created_at", "-id"], name="post_created_idx"),
+        ]
+
 
 def post_image_path(instance, filename):
     """Generate S3 path (key) for saving post image.
@@ -165,15 +412,11 @@ def post_image_path(instance, filename):
     return path
 
 
-class PostImage(models.Model):
+class PostImage(ProcessedImage):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="images")
     image = models.ImageField(upload_to=post_image_path)
     is_main = models.BooleanField(default=False)
 
-    def save(self, *args, **kwargs):
-        self.image = crop_square_and_resize(self.image, image_size=1080)
-        super().save(*args, **kwargs)
-
 
 class Like(models.Model):
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="likes")
@@ -185,6 +428,69 @@ class Like(models.Model):
 
     class Meta:
         unique_together = (("profile", "post"),)
+        indexes = [
+            # covers the like lookups and counts done by post
+            models.Index(fields=["post", "profile"], name="like_post_profile_idx"),
+        ]
+
+
+class PostLikeCounterShard(models.Model):
+    """
+    One of the rows a hot Post's like count is spread across so concurrent likes
+    don't all wait on the lock of the Post row.
+    """
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="like_counter_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Post {self.post_id} like shard {self.shard}: {self.count}"
+
+    class Meta:
+        unique_together = (("post", "shard"),)
+
+
+class CommentQuerySet(models.QuerySet):
+    """QuerySet for Comments."""
+
+    def with_details(self, profile_id=None):
+        """Attach everything the CommentDetailedSerializer needs to each Comment.
+        The author profile (with image and pet type) and the profiles of the
+        comments it replies to are joined and whether the requesting profile
+        liked each Comment is annotated. The like and reply counts are columns.
+        """
+        queryset = self.select_related(
+            "profile__image",
+            "profile__pet_type",
+            "parent_comment__profile",
+            "reply_to_comment__profile",
+        )
+
+        if profile_id:
+            queryset = queryset.annotate(
+                viewer_liked=Exists(
+                    CommentLike.objects.filter(
+                        comment=OuterRef("pk"), profile=profile_id
+                    )
+                )
+            )
+
+        return queryset
+
+    def with_first_replies(self, profile_id=None):
+        """Attach the first COMMENT_THREAD_REPLIES replies of each Comment as
+        first_replies, with their details. The replies of a whole page are
+        loaded in one query.
+        """
+        replies = Comment.objects.with_details(profile_id).order_by("created_at")[
+            : settings.COMMENT_THREAD_REPLIES
+        ]
+        return self.prefetch_related(
+            Prefetch("all_replies", queryset=replies, to_attr="first_replies")
+        )
 
 
 class Comment(models.Model):
@@ -204,10 +510,27 @@ class Comment(models.Model):
     reply_to_comment = models.ForeignKey(
         "self", on_delete=models.CASCADE, related_name="replies", null=True, blank=True
     )
+    # counters kept up to date by apps.core_app.counters
+    likes_count = models.IntegerField(default=0)
+    replies_count = models.IntegerField(default=0)
+
+    objects = CommentQuerySet.as_manager()
 
     def __str__(self):
         return self.text
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["post", "parent_comment", "-created_at"],
+                name="comment_post_parent_idx",
+            ),
+            models.Index(
+                fields=["parent_comment", "created_at"],
+                name="comment_parent_created_idx",
+            ),
+        ]
+
 
 class Follow(models.Model):
     followed = models.ForeignKey(
@@ -223,6 +546,11 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = (("followed", "followed_by"),)
+        indexes = [
+            models.Index(
+                fields=["followed_by", "followed"], name="follow_followed_by_idx"
+            ),
+        ]
 
 
 class CommentLike(models.Model):
@@ -251,7 +579,13 @@ def post_image_staging_path(instance, filename):
     )
 
 
-class PostImageStaged(models.Model):
+class PostImageStaged(ProcessedImage):
+    """
+    An image uploaded while its Post is being written, identified by the
+    post_uuid the client generated. Staged images are processed into every Post
+    image size straight away, so creating the Post only has to move the rows.
+    """
+
     profile = models.ForeignKey(
         Profile, on_delete=models.CASCADE, related_name="staged_images"
     )
@@ -259,10 +593,6 @@ class PostImageStaged(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     image = models.ImageField(upload_to=post_image_staging_path)
 
-    def save(self, *args, **kwargs):
-        self.image = crop_square_and_resize(self.image, image_size=1080)
-        super().save(*args, **kwargs)
-
 
 class SavedPost(models.Model):
     profile = models.ForeignKey(
@@ -273,6 +603,11 @@ class SavedPost(models.Model):
 
     class Meta:
         unique_together = (("profile", "post"),)
+        indexes = [
+            models.Index(
+                fields=["profile", "-saved_at"], name="savedpost_profile_saved_idx"
+            ),
+        ]
 
 
 class ReportReason(models.Model):
@@ -280,6 +615,9 @@ class ReportReason(models.Model):
     Model to store predefined reasons for reporting posts
     """
 
+    # id of the "Inappropriate Content" reason loaded by load_report_reasons
+    INAPPROPRIATE_CONTENT_ID = 1
+
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, default="")
     is_active = models.BooleanField(default=True)
@@ -327,6 +665,101 @@ class PostReport(models.Model):
         ordering = ["-created_at"]
         # Prevent multiple reports from the same user on the same post
         unique_together = (("post", "reporter"),)
+        indexes = [
+            models.Index(fields=["post", "status"], name="postreport_post_status_idx"),
+            models.Index(
+                fields=["reporter", "-created_at"], name="postreport_reporter_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Report on {self.post} by {self.reporter}"
+
+
+class FeedEntry(models.Model):
+    """
+    Post in the home feed of a Profile.
+    Entries are written when a post is created or a profile is followed so that
+    reading a feed only has to read the viewer's own entries.
+    """
+
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="feed_entries"
+    )
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="feed_entries")
+    # copy of the Post created_at so the feed can be ordered from this table alone
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = (("profile", "post"),)
+        indexes = [
+            models.Index(
+                fields=["profile", "-created_at", "-post"],
+                name="feedentry_profile_created_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.post} in feed of {self.profile}"
+
+
+class StorageDeletion(models.Model):
+    """
+    A stored file that couldn't be deleted along with its row, kept so the
+    deletion can be retried by the retry_storage_deletions command.
+    """
+
+    name = models.CharField(max_length=1024, unique=True)
+    attempts = models.PositiveIntegerField(default=1)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Deletion of {self.name}"
+
+
+class EmailStatus(models.TextChoices):
+    PENDING = "PENDING", _("Pending")
+    SENT = "SENT", _("Sent")
+    FAILED = "FAILED", _("Failed")
+
+
+class EmailOutbox(models.Model):
+    """
+    An email written in the transaction that needs it and sent after the commit
+    by the send_email_outbox command, see apps.core_app.emails.
+    """
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    to = models.JSONField()
+    status = models.CharField(
+        max_length=10, choices=EmailStatus.choices, default=EmailStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "email outbox"
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)}"
+
+
+class ProfileChange(models.Model):
+    """
+    A Profile that was saved or deleted. The username index of each API process
+    reads them to stay current, see apps.core_app.search_index.
+    """
+
+    profile_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Change of profile {self.profile_id}"
@@ -0,0 +1,58 @@
+"""
+Custom migration operations.
+"""
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db.migrations import AddIndex
+
+
+class AddIndexConcurrentlyIfPostgres(AddIndexConcurrently):
+    """
+    Create an index without locking the table against writes on Postgres.
+    Other databases (SQLite in tests) don't support concurrent index creation,
+    so the index is created with a plain AddIndex there.
+
+    Migrations using this operation must set atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+        return super().database_forwards(
+            app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+        return super().database_backwards(
+            app_label, schema_editor, from_state, to_state
+        )
+
+
+class AddIndexConcurrentlyOnlyPostgres(AddIndexConcurrently):
+    """
+    Create a Postgres only index, such as a GIN index with trigram operator
+    classes, without locking the table against writes. Other databases (SQLite
+    in tests) can't create it and skip it.
+
+    Migrations using this operation must set atomic = False.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        return super().database_forwards(
+            app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        return super().database_backwards(
+            app_label, schema_editor, from_state, to_state
+        )
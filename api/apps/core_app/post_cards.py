@@ -0,0 +1,169 @@
+"""
+Cache of the parts of serialized Posts that are the same for every viewer.
+
+A post card is a Post serialized without the fields that depend on who is
+asking or that change on every like and comment: the caption, images, author
+profile and moderation state. Cards are cached for POST_CARD_CACHE_SECONDS
+under the Post's version and its author's version, and the list endpoints
+merge in the counts and the requesting profile's flags read with the page.
+Image URLs are made absolute with the request's host and the image field holds
+the variant asked for with image_size, so cards are also cached per variant of
+those, see PostCardsMixin.get_post_card_variant.
+
+A version is a token kept in the cache. Saving a Post, its images or its
+reports replaces the Post's token, and saving a Profile or its image replaces
+the author's token, once the transaction commits. A card stored under an old
+token is never read again, including one built from rows read just before the
+change was committed. A token evicted from the cache is replaced by a new one,
+so a card can't outlive the token it was stored under.
+
+Hits and misses are counted per endpoint in the cache, see the
+post_card_cache_stats command.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import PostImage, ProfileImage
+
+# names of the endpoints that can serve posts from the cache
+ENDPOINTS = [
+    "feed",
+    "explore",
+    "profile_posts",
+    "saved_posts",
+    "similar_posts",
+    "post_detail",
+]
+OUTCOMES = ("hits", "misses")
+
+
+def post_version_key(post_id):
+    return f"post-card-version:post:{post_id}"
+
+
+def profile_version_key(profile_id):
+    return f"post-card-version:profile:{profile_id}"
+
+
+def card_key(post_id, post_version, profile_version, variant=""):
+    return f"post-card:{post_id}:{post_version}:{profile_version}:{variant}"
+
+
+def metric_key(endpoint, outcome):
+    return f"post-card-cache:{endpoint}:{outcome}"
+
+
+def is_enabled(endpoint):
+    """Return whether the post card cache is used by the named endpoint."""
+    return endpoint in settings.POST_CARD_CACHE_ENDPOINTS
+
+
+def get_versions(keys):
+    """Return the version tokens of keys, creating the missing ones."""
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        # another process may create the token first, so it is read back
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+    if missing:
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def replace_version(key):
+    """Replace a version token once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, timeout=None))
+
+
+def invalidate_post_card(post_id):
+    """Stop serving the cached card of a Post."""
+    if post_id is not None:
+        replace_version(post_version_key(post_id))
+
+
+def invalidate_profile_cards(profile_id):
+    """Stop serving the cached cards of every Post of a Profile."""
+    if profile_id is not None:
+        replace_version(profile_version_key(profile_id))
+
+
+def invalidate_image_cards(image):
+    """Stop serving the cached cards that show an image."""
+    if isinstance(image, PostImage):
+        invalidate_post_card(image.post_id)
+    elif isinstance(image, ProfileImage):
+        invalidate_profile_cards(image.profile_id)
+
+
+def get_cards(posts, build_cards, endpoint, variant=""):
+    """
+    Return the card of each Post keyed by Post id. Cards missing from the cache
+    are built by build_cards, called with the ids of their Posts, and cached
+    under variant, which names what else the cards depend on.
+    """
+    post_keys = {post.id: post_version_key(post.id) for post in posts}
+    profile_keys = {post.id: profile_version_key(post.profile_id) for post in posts}
+    versions = get_versions(list({*post_keys.values(), *profile_keys.values()}))
+    keys = {
+        post.id: card_key(
+            post.id,
+            versions[post_keys[post.id]],
+            versions[profile_keys[post.id]],
+            variant,
+        )
+        for post in posts
+    }
+
+    cached = cache.get_many(list(keys.values()))
+    cards = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing_ids = [pk for pk in keys if pk not in cards]
+    if missing_ids:
+        built = build_cards(missing_ids)
+        cache.set_many(
+            {keys[pk]: card for pk, card in built.items()},
+            timeout=settings.POST_CARD_CACHE_SECONDS,
+        )
+        cards.update(built)
+
+    hits = len(keys) - len(missing_ids)
+    record_lookups(endpoint, hits=hits, misses=len(missing_ids))
+    return cards
+
+
+def record_lookups(endpoint, hits, misses):
+    """Add to the hit and miss counts of an endpoint."""
+    for outcome, count in zip(OUTCOMES, (hits, misses)):
+        if not count:
+            continue
+        key = metric_key(endpoint, outcome)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            # the key was evicted between add and incr
+            pass
+
+
+def get_stats():
+    """Return the hit and miss counts of each endpoint."""
+    counts = cache.get_many(
+        [metric_key(endpoint, outcome) for endpoint, outcome in metrics()]
+    )
+    stats = {endpoint: {} for endpoint in ENDPOINTS}
+    for endpoint, outcome in metrics():
+        stats[endpoint][outcome] = counts.get(metric_key(endpoint, outcome), 0)
+    return stats
+
+
+def reset_stats():
+    cache.delete_many(
+        [metric_key(endpoint, outcome) for endpoint, outcome in metrics()]
+    )
+
+
+def metrics():
+    return [(endpoint, outcome) for endpoint in ENDPOINTS for outcome in OUTCOMES]
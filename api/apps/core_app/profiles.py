@@ -0,0 +1,88 @@
+"""
+Cached ownership of profiles.
+
+Nearly every API request checks that a profile id, from the auth-profile-id
+header or the request body, belongs to the authenticated user. The ids of each
+user's profiles are cached for PROFILE_OWNERSHIP_CACHE_SECONDS so the check
+doesn't need a query, and the cache is cleared when one of their profiles is
+created or deleted.
+
+Access tokens carry the ids of their user's profiles too, and these are
+trusted without reading the cached ids. Deleting a profile marks its user for
+the lifetime of an access token, and until then the ids in the user's tokens
+are checked against the cached ids, so the deleted one is rejected.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Profile
+
+
+def profile_ids_cache_key(user_id):
+    return f"user-profile-ids:{user_id}"
+
+
+def get_profile_ids(user_id):
+    """Return the ids of the profiles of a user."""
+    key = profile_ids_cache_key(user_id)
+    profile_ids = cache.get(key)
+    if profile_ids is None:
+        profile_ids = list(
+            Profile.objects.filter(user=user_id).values_list("id", flat=True)
+        )
+        cache.set(key, profile_ids, timeout=settings.PROFILE_OWNERSHIP_CACHE_SECONDS)
+    return profile_ids
+
+
+def deleted_profile_cache_key(user_id):
+    return f"user-deleted-profile:{user_id}"
+
+
+def clear_profile_ids(user_id):
+    cache.delete(profile_ids_cache_key(user_id))
+
+
+def forget_deleted_profile(user_id):
+    """
+    Clear the cached profile ids of a user whose profile was deleted, and stop
+    trusting the profile ids in their access tokens until the tokens issued
+    before the deletion expire.
+    """
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.set(deleted_profile_cache_key(user_id), True, timeout=lifetime)
+    clear_profile_ids(user_id)
+
+
+def owns_profile(user, profile_id):
+    """Return whether the profile with profile_id belongs to user."""
+    try:
+        profile_id = int(profile_id)
+    except (TypeError, ValueError):
+        return False
+    return profile_id in get_profile_ids(user.id)
+
+
+def get_owned_profile(user, profile_id, profile_ids=None):
+    """
+    Return the Profile with profile_id if it belongs to user, otherwise None.
+    profile_ids, the ids in the claims of the access token, are trusted without
+    checking the cached ids unless one of the user's profiles was deleted. Only
+    the id and user of the Profile are loaded, its other fields are read from
+    the database the first time one of them is used.
+    """
+    try:
+        profile_id = int(profile_id)
+    except (TypeError, ValueError):
+        return None
+    trusted = profile_id in (profile_ids or ()) and not cache.get(
+        deleted_profile_cache_key(user.id)
+    )
+    if not trusted and not owns_profile(user, profile_id):
+        return None
+    profile = Profile.from_db(
+        Profile.objects.db, ["id", "user_id"], [profile_id, user.id]
+    )
+    profile.user = user
+    return profile
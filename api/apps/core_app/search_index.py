@@ -0,0 +1,274 @@
+"""
+In-process index of usernames for search as you type.
+
+Each API process keeps every profile's username, and the words of its username
+and name, in sorted arrays packed into a single bytes object each, so a prefix
+query is two binary searches and doesn't touch the database. Profile search
+lists the profiles whose username starts with the search text first, then
+those with a word of their username or name starting with it, and only loads
+the rows of the page it returns.
+
+Search is prefix only: a profile is found by the start of its username or of
+a word of its username or name, never by text in the middle of a word. The
+database search used while the index isn't available, ProfileQuerySet.search,
+matches the same profiles.
+
+The index is loaded on the first search, in a background thread, and search
+falls back to the database until it is ready. Saving or deleting a Profile
+writes a ProfileChange row. Every USERNAME_INDEX_POLL_SECONDS a background
+thread reads the profiles changed since its last poll and keeps their current
+keys in a small overlay that queries merge with the sorted arrays, so searches
+never query the database. Once the overlay holds USERNAME_INDEX_MAX_OVERLAY
+profiles, or the index missed changes that were already pruned, the arrays are
+rebuilt from the database. The prune_profile_changes command deletes the
+ProfileChanges every index has read.
+"""
+
+import heapq
+import logging
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Profile, ProfileChange
+
+logger = logging.getLogger(__name__)
+
+# parts of usernames and names that can be searched by prefix
+WORD_RE = re.compile(r"[^\W_]+")
+# seconds of changes read again by each poll, for changes written by
+# transactions that committed after a later poll started
+CHANGE_OVERLAP_SECONDS = 10
+# 0xff never appears in UTF-8, so it sorts after every key with the prefix
+PREFIX_END = b"\xff"
+
+
+def profile_keys(username, name):
+    """Return the username key and the word keys a profile is found by."""
+    username = username.casefold()
+    words = set(WORD_RE.findall(username)) | set(WORD_RE.findall(name.casefold()))
+    words.discard(username)
+    return username.encode(), sorted(word.encode() for word in words)
+
+
+class SortedKeys:
+    """
+    Keys sorted in a single bytes object with the id of the profile of each key.
+    1M keys take the bytes of the keys plus 12 bytes each, instead of the ~60
+    bytes of a str and a list slot each.
+    """
+
+    def __init__(self, pairs):
+        pairs = sorted(pairs)
+        self.blob = b"".join(key for key, _ in pairs)
+        self.offsets = array("I", [0])
+        self.ids = array("q")
+        end = 0
+        for key, profile_id in pairs:
+            end += len(key)
+            self.offsets.append(end)
+            self.ids.append(profile_id)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def key(self, index):
+        return self.blob[self.offsets[index] : self.offsets[index + 1]]
+
+    def with_prefix(self, prefix):
+        """Yield the (key, profile id) pairs whose key starts with prefix."""
+        positions = range(len(self))
+        start = bisect_left(positions, prefix, key=self.key)
+        end = bisect_left(positions, prefix + PREFIX_END, lo=start, key=self.key)
+        for index in range(start, end):
+            yield self.key(index), self.ids[index]
+
+    def nbytes(self):
+        return (
+            len(self.blob)
+            + self.offsets.itemsize * len(self.offsets)
+            + self.ids.itemsize * len(self.ids)
+        )
+
+
+class UsernameIndex:
+    """Prefix index of the usernames and name words of every profile."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refresher = None
+        self.reset()
+
+    def reset(self):
+        # (usernames, words, overlay) replaced as a whole, so a query reads a
+        # consistent state without taking the lock
+        self.state = None
+        self.loading = False
+        self.polled_at = None
+
+    def load(self):
+        """Build the index from every profile in the database."""
+        started_at = timezone.now()
+        usernames = []
+        words = []
+        profiles = Profile.objects.values_list("id", "username", "name")
+        for profile_id, username, name in profiles.iterator(chunk_size=10000):
+            username_key, word_keys = profile_keys(username, name)
+            usernames.append((username_key, profile_id))
+            words.extend((word, profile_id) for word in word_keys)
+
+        state = (SortedKeys(usernames), SortedKeys(words), {})
+        with self.lock:
+            self.state = state
+            # read the changes made while loading again
+            self.polled_at = started_at
+            self.loading = False
+        logger.info(f"Loaded the username index of {len(usernames)} profiles.")
+
+    def ensure_loading(self):
+        """Start loading the index unless it is loaded or loading."""
+        with self.lock:
+            if self.loading:
+                return
+            self.loading = True
+        if not settings.USERNAME_INDEX_BACKGROUND_LOAD:
+            try:
+                self.load()
+            finally:
+                self.loading = False
+            return
+        threading.Thread(target=self.load_in_thread, daemon=True).start()
+
+    def load_in_thread(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception("Error loading the username index.")
+            with self.lock:
+                self.loading = False
+        else:
+            self.ensure_refreshing()
+        finally:
+            connection.close()
+
+    def ensure_refreshing(self):
+        """Start the thread polling the profile changes unless it is running."""
+        with self.lock:
+            if self.refresher is not None and self.refresher.is_alive():
+                return
+            self.refresher = threading.Thread(target=self.refresh, daemon=True)
+        self.refresher.start()
+
+    def refresh(self):
+        """Poll the profile changes every USERNAME_INDEX_POLL_SECONDS."""
+        while True:
+            time.sleep(settings.USERNAME_INDEX_POLL_SECONDS)
+            if self.state is None:
+                continue
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Error polling the username index.")
+            finally:
+                connection.close_if_unusable_or_obsolete()
+
+    def poll(self):
+        """Apply the profiles changed since the last poll to the overlay."""
+        usernames, words, overlay = self.state
+
+        polled_at = timezone.now()
+        retention = timedelta(hours=settings.USERNAME_INDEX_CHANGE_RETENTION_HOURS)
+        if self.polled_at < polled_at - retention:
+            # changes this old may already be pruned
+            self.ensure_loading()
+            return
+
+        since = self.polled_at - timedelta(seconds=CHANGE_OVERLAP_SECONDS)
+        changed_ids = set(
+            ProfileChange.objects.filter(created_at__gte=since).values_list(
+                "profile_id", flat=True
+            )
+        )
+        if changed_ids:
+            overlay = dict(overlay)
+            overlay.update(dict.fromkeys(changed_ids))
+            profiles = Profile.objects.filter(id__in=changed_ids).values_list(
+                "id", "username", "name"
+            )
+            for profile_id, username, name in profiles:
+                overlay[profile_id] = profile_keys(username, name)
+        with self.lock:
+            if self.state is not None and self.state[0] is usernames:
+                self.state = (usernames, words, overlay)
+                self.polled_at = polled_at
+
+        if len(overlay) >= settings.USERNAME_INDEX_MAX_OVERLAY:
+            self.ensure_loading()
+
+    def search(self, text, limit):
+        """
+        Return the ids of up to limit profiles with a username starting with
+        text, in username order, followed by those with a word of their
+        username or name starting with text, in word order. Returns None if
+        the index isn't loaded yet.
+        """
+        if self.state is None:
+            self.ensure_loading()
+            if self.state is None:
+                return None
+        usernames, words, overlay = self.state
+        prefix = text.casefold().encode()
+
+        username_matches = heapq.merge(
+            (
+                pair
+                for pair in usernames.with_prefix(prefix)
+                if pair[1] not in overlay
+            ),
+            sorted(
+                (keys[0], profile_id)
+                for profile_id, keys in overlay.items()
+                if keys is not None and keys[0].startswith(prefix)
+            ),
+        )
+        word_matches = heapq.merge(
+            (pair for pair in words.with_prefix(prefix) if pair[1] not in overlay),
+            sorted(
+                (word, profile_id)
+                for profile_id, keys in overlay.items()
+                if keys is not None
+                for word in keys[1]
+                if word.startswith(prefix)
+            ),
+        )
+
+        ids = []
+        seen = set()
+        for matches in (username_matches, word_matches):
+            for _, profile_id in matches:
+                if profile_id in seen:
+                    continue
+                seen.add(profile_id)
+                ids.append(profile_id)
+                if len(ids) >= limit:
+                    return ids
+        return ids
+
+
+username_index = UsernameIndex()
+
+
+def prune_profile_changes():
+    """Delete the ProfileChanges every index has read. Returns the count."""
+    retention = timedelta(hours=settings.USERNAME_INDEX_CHANGE_RETENTION_HOURS)
+    deleted, _ = ProfileChange.objects.filter(
+        created_at__lt=timezone.now() - retention
+    ).delete()
+    return deleted
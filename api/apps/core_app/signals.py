@@ -1,12 +1,261 @@
-from .models import PostImage
+from .models import (
+    User,
+    PostImage,
+    Post,
+    Follow,
+    Like,
+    Comment,
+    CommentLike,
+    Profile,
+    ProfileChange,
+    PostReport,
+    ProfileImage,
+    PostImageStaged,
+    ImageStatus,
+    PetType,
+    ReportReason,
+)
+from .images import enqueue_image
+from .deletions import delete_files_on_commit
+from .profiles import clear_profile_ids, forget_deleted_profile
+from .post_cards import (
+    invalidate_image_cards,
+    invalidate_post_card,
+    invalidate_profile_cards,
+)
+from .caching import PET_TYPES, REPORT_REASONS, tiered_cache
+from .authentication import publish_token_version
+from .feed import fan_out_post, add_followed_posts, remove_followed_posts
+from .counters import (
+    add_post_likes,
+    decrement,
+    increment,
+    is_deleted_with,
+    mark_deleted,
+)
 from django.dispatch import receiver
-from django.db.models.signals import pre_delete
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
 
 
 @receiver(pre_delete, sender=PostImage)
-def delete_s3_image(sender, instance, **kwargs):
-    """Delete the Post images from S3 when an Image instance is deleted."""
-    try:
-        instance.image.delete(save=False)
-    except Exception as e:
-        print(f"Error deleting S3 file: {e}")
+@receiver(pre_delete, sender=ProfileImage)
+@receiver(pre_delete, sender=PostImageStaged)
+def delete_image_files(sender, instance, **kwargs):
+    """Delete the files of an image once the deletion of its row is committed."""
+    delete_files_on_commit(
+        instance.image.storage, [instance.image.name, *instance.variants.values()]
+    )
+
+
+@receiver(post_save, sender=PostImage)
+@receiver(post_save, sender=ProfileImage)
+@receiver(post_save, sender=PostImageStaged)
+def enqueue_uploaded_image(sender, instance, raw=False, **kwargs):
+    """Queue a newly uploaded image to be cropped and resized."""
+    if not raw and instance.status == ImageStatus.PROCESSING:
+        enqueue_image(instance)
+
+
+@receiver(post_save, sender=PostImage)
+@receiver(post_save, sender=ProfileImage)
+@receiver(post_delete, sender=PostImage)
+@receiver(post_delete, sender=ProfileImage)
+def invalidate_cards_of_image(sender, instance, **kwargs):
+    """Stop serving cached post cards showing the image that changed."""
+    invalidate_image_cards(instance)
+
+
+@receiver(post_save, sender=Profile)
+def clear_cached_profile_ids_on_create(sender, instance, created, **kwargs):
+    """Forget the cached profile ids of a user who created a profile."""
+    if created:
+        clear_profile_ids(instance.user_id)
+
+
+@receiver(post_delete, sender=Profile)
+def clear_cached_profile_ids_on_delete(sender, instance, **kwargs):
+    """Forget the cached profile ids of a user whose profile was deleted."""
+    forget_deleted_profile(instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def record_profile_change(sender, instance, **kwargs):
+    """Record the change for the username index of every API process."""
+    ProfileChange.objects.create(profile_id=instance.id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_cards_of_profile(sender, instance, **kwargs):
+    """Stop serving cached post cards showing the profile that changed."""
+    invalidate_profile_cards(instance.id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=PostReport)
+@receiver(post_delete, sender=PostReport)
+def invalidate_card_of_post(sender, instance, **kwargs):
+    """Stop serving the cached card of a Post that was edited or reported."""
+    invalidate_post_card(instance.post_id if sender is PostReport else instance.id)
+
+
+@receiver(post_save, sender=PetType)
+@receiver(post_delete, sender=PetType)
+def invalidate_cached_pet_types(sender, instance, **kwargs):
+    """Stop serving the cached pet types once one of them changed."""
+    tiered_cache.invalidate(PET_TYPES)
+
+
+@receiver(post_save, sender=ReportReason)
+@receiver(post_delete, sender=ReportReason)
+def invalidate_cached_report_reasons(sender, instance, **kwargs):
+    """Stop serving the cached report reasons once one of them changed."""
+    tiered_cache.invalidate(REPORT_REASONS)
+
+
+#
+# Token revocation
+#
+
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_of_deactivated_user(sender, instance, raw=False, **kwargs):
+    """Revoke the tokens of a user who is being deactivated."""
+    if raw or instance._state.adding or instance.is_active:
+        return
+    if User.objects.filter(id=instance.id, is_active=True).exists():
+        instance.token_version += 1
+
+
+@receiver(post_save, sender=User)
+def publish_user_token_version(sender, instance, created, raw=False, **kwargs):
+    """Publish the token version of a user so revoked tokens are rejected."""
+    if not created and not raw:
+        if hasattr(instance.token_version, "resolve_expression"):
+            # incremented with an F() expression, see User.change_password
+            instance.refresh_from_db(fields=["token_version"])
+        publish_token_version(instance.id, instance.token_version)
+
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_of_deleted_user(sender, instance, **kwargs):
+    # token versions are never negative, so every token of the user is rejected
+    publish_token_version(instance.id, -1)
+
+
+@receiver(post_save, sender=Post)
+def add_post_to_feeds(sender, instance, created, raw=False, **kwargs):
+    """Add a new Post to the feeds of the author's followers."""
+    # fixtures are loaded raw, feeds are rebuilt afterwards with rebuild_feeds
+    if created and not raw:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def add_followed_posts_to_feed(sender, instance, created, raw=False, **kwargs):
+    """Add the followed Profile's posts to the follower's feed."""
+    if created and not raw:
+        add_followed_posts(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_unfollowed_posts_from_feed(sender, instance, **kwargs):
+    """Remove the unfollowed Profile's posts from the follower's feed."""
+    remove_followed_posts(instance)
+
+
+#
+# Counter columns
+# Fixtures are loaded raw and counters are recomputed afterwards with
+# reconcile_counters, so raw saves are skipped.
+#
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        increment(Profile, instance.profile_id, "posts_count")
+
+
+@receiver(pre_delete, sender=Profile)
+@receiver(pre_delete, sender=Post)
+@receiver(pre_delete, sender=Comment)
+def mark_deleted_counter_row(sender, instance, origin=None, **kwargs):
+    """
+    Record the rows holding counters that a delete() removes, so the rows
+    deleted with them don't update their counters.
+    """
+    mark_deleted(origin, instance)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, origin=None, **kwargs):
+    if not is_deleted_with(origin, Profile, instance.profile_id):
+        decrement(Profile, instance.profile_id, "posts_count")
+
+
+@receiver(post_save, sender=Like)
+def increment_post_likes_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        add_post_likes(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Like)
+def decrement_post_likes_count(sender, instance, origin=None, **kwargs):
+    if not is_deleted_with(origin, Post, instance.post_id):
+        add_post_likes(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_counts(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        increment(Post, instance.post_id, "comments_count")
+        increment(Comment, instance.parent_comment_id, "replies_count")
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_counts(sender, instance, origin=None, **kwargs):
+    if not is_deleted_with(origin, Post, instance.post_id):
+        decrement(Post, instance.post_id, "comments_count")
+    if not is_deleted_with(origin, Comment, instance.parent_comment_id):
+        decrement(Comment, instance.parent_comment_id, "replies_count")
+
+
+@receiver(post_save, sender=CommentLike)
+def increment_comment_likes_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        increment(Comment, instance.comment_id, "likes_count")
+
+
+@receiver(post_delete, sender=CommentLike)
+def decrement_comment_likes_count(sender, instance, origin=None, **kwargs):
+    if not is_deleted_with(origin, Comment, instance.comment_id):
+        decrement(Comment, instance.comment_id, "likes_count")
+
+
+@receiver(post_save, sender=Follow)
+def increment_follow_counts(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        increment(Profile, instance.followed_id, "followers_count")
+        increment(Profile, instance.followed_by_id, "following_count")
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_follow_counts(sender, instance, origin=None, **kwargs):
+    if not is_deleted_with(origin, Profile, instance.followed_id):
+        decrement(Profile, instance.followed_id, "followers_count")
+    if not is_deleted_with(origin, Profile, instance.followed_by_id):
+        decrement(Profile, instance.followed_by_id, "following_count")
+
+
+@receiver(post_save, sender=PostReport)
+@receiver(post_delete, sender=PostReport)
+def update_post_moderation_flags(
+    sender, instance, raw=False, origin=None, **kwargs
+):
+    """Recompute the reported Post's moderation flags when a report changes."""
+    # raw fixture saves are covered by the migration and load_db
+    if not raw and not is_deleted_with(origin, Post, instance.post_id):
+        Post.objects.filter(pk=instance.post_id).update_moderation_flags()
@@ -0,0 +1,66 @@
+"""
+S3 storage that reuses presigned URLs.
+
+S3Storage signs a new URL every time the url of a file is read, so every response
+lists different image URLs and neither browsers nor CDNs can cache the images.
+CachedS3Storage caches the signed URL of each key and returns it until
+SIGNED_URL_CACHE_MARGIN seconds before it expires.
+
+With SIGNED_URL_BUCKET_SECONDS set, URLs are instead cached until the end of the
+current time bucket and signed to expire AWS_QUERYSTRING_EXPIRE seconds after it.
+Every URL of a bucket then has the same expiry, and with S3's default query
+string signature a key's URL is the same in every process until the bucket ends,
+cached or not.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from storages.backends.s3 import S3Storage
+
+
+def signed_url_lifetime(now, expire, bucket_seconds, margin):
+    """
+    Return the seconds a URL signed at now, in whole seconds, should be valid for
+    and the seconds it can be cached for.
+    """
+    if bucket_seconds:
+        bucket_end = (now // bucket_seconds + 1) * bucket_seconds
+        return bucket_end - now + expire, bucket_end - now
+    return expire, expire - margin
+
+
+class CachedS3Storage(S3Storage):
+    """S3Storage that caches the signed URL of each key."""
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        # only the plain signed URLs used to display images are cached
+        if (
+            not self.querystring_auth
+            or self.custom_domain
+            or parameters
+            or expire is not None
+            or http_method
+        ):
+            return super().url(name, parameters, expire, http_method)
+
+        # file names come from uploads and aren't safe cache keys
+        digest = hashlib.sha1(f"{self.bucket_name}/{name}".encode()).hexdigest()
+        key = f"signed-url:{digest}"
+        url = cache.get(key)
+        if url is None:
+            # the S3 client is created on first use, before the clock is read, so
+            # the signer's clock is in the same second and the expiry is exact
+            self.connection
+            expire, cache_seconds = signed_url_lifetime(
+                int(time.time()),
+                self.querystring_expire,
+                settings.SIGNED_URL_BUCKET_SECONDS,
+                settings.SIGNED_URL_CACHE_MARGIN,
+            )
+            url = super().url(name, expire=expire)
+            if cache_seconds > 0:
+                cache.set(key, url, timeout=cache_seconds)
+        return url
@@ -1,45 +1,122 @@
-from PIL import Image, ImageOps
+from PIL import ExifTags, Image
+from django.conf import settings
 from django.core.files import File
 from io import BytesIO
 import uuid
 
+# WebP encoder settings. method is the encoder effort, from 0 (fastest) to 6
+# (smallest files). The encoder default is 4.
+WEBP_PRESETS = {
+    "fast": {"quality": 70, "method": 2},
+    "balanced": {"quality": 70, "method": 4},
+    "small": {"quality": 70, "method": 6},
+}
 
-def crop_square_and_resize(image, image_size=1080):
+# EXIF orientation -> transpose that turns the image upright
+ORIENTATION_TRANSPOSES = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def crop_square(image, image_size=None):
     """
-    Crop and resize image to desired image size.
-    The image is cropped to into a square that is centered on the photo.
+    Open an image and crop it into a square that is centered on the photo.
     If the image is taller than it is wide, part of the top and bottom is cropped.
     If the image is wider than it is tall, part of the left and right is cropped.
+
+    If image_size is given, JPEGs are decoded at the smallest scale that still
+    leaves the square at least image_size pixels wide.
     """
     img = Image.open(image)
-    img = ImageOps.exif_transpose(img)  # rotate the image
+    orientation = img.getexif().get(ExifTags.Base.Orientation)
 
     width, height = img.size  # Get dimensions
+    short_side = min(width, height)
+    if image_size and short_side > image_size:
+        # JPEGs can be decoded at 1/2, 1/4 or 1/8 of their size, which skips
+        # most of the decoding work. Other formats ignore the draft request.
+        img.draft(
+            "RGB",
+            (width * image_size // short_side, height * image_size // short_side),
+        )
+        width, height = img.size
 
     if height > width:
         left = 0
         right = width
-        top = (height / 2) - (width / 2)
+        top = (height - width) // 2
         bottom = top + width
     else:
         top = 0
         bottom = height
-        left = (width / 2) - (height / 2)
+        left = (width - height) // 2
         right = left + height
 
     img = img.crop((left, top, right, bottom))
 
-    width, height = img.size
-    # resize image if it is larger than desired image size
-    if width > image_size:
-        img = img.resize((image_size, image_size))
+    # the square is centered so it is the same whether the image is rotated
+    # before or after cropping, and the cropped image is cheaper to rotate
+    transpose = ORIENTATION_TRANSPOSES.get(orientation)
+    if transpose is not None:
+        img = img.transpose(transpose)
+    return img
 
+
+def shrink_square(img, image_size):
+    """Scale a square image down to image_size. Images are never scaled up."""
+    if img.width <= image_size:
+        return img
+    factor = img.width // image_size
+    if factor >= 2:
+        # cheap box filter down to within 2x of the target size, so the
+        # resize below only works on a small image
+        img = img.reduce(factor)
+    if img.width == image_size:
+        return img
+    return img.resize((image_size, image_size))
+
+
+def encode_webp(img, name, preset=None):
+    """Encode a PIL image as WebP and return it as a File."""
+    options = WEBP_PRESETS[preset or settings.IMAGE_WEBP_PRESET]
     output = BytesIO()
-    img.save(output, "webp", optimize=True, quality=70)
+    img.save(output, "webp", **options)
+    return File(output, name=name)
+
+
+def crop_square_and_resize(image, image_size=1080, preset=None):
+    """
+    Crop and resize image to desired image size.
+    The image is cropped to into a square that is centered on the photo.
+    """
+    img = crop_square(image, image_size)
+    img = shrink_square(img, image_size)
 
     name_of_file = image.name.split(".")[0] + ".webp"
 
-    return File(output, name=name_of_file)
+    return encode_webp(img, name_of_file, preset)
+
+
+def create_square_variants(image, sizes, preset=None):
+    """
+    Crop image into a square and return a WebP File for each of the sizes, keyed
+    by size and named <image name>_<size>.webp. Images are never scaled up.
+    """
+    img = crop_square(image, max(sizes))
+    stem = image.name.split(".")[0]
+
+    variants = {}
+    # each variant is scaled down from the previous, larger one
+    for size in sorted(sizes, reverse=True):
+        img = shrink_square(img, size)
+        variants[size] = encode_webp(img, f"{stem}_{size}.webp", preset)
+    return variants
 
 
 def generate_verification_code():
@@ -1,24 +1,275 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class SearchedProfilesPagination(PageNumberPagination):
     page_size = 13
 
 
-class ListExplorePostsPagination(PageNumberPagination):
+class KeysetPagination(BasePagination):
+    """
+    Cursor (keyset) pagination over a unique ordering.
+
+    Pages are fetched with `WHERE (ordering fields) < (values of the last row seen)`
+    instead of OFFSET, so deep pages cost the same as the first one, rows inserted
+    while a client is scrolling do not shift the pages, and no COUNT(*) is run.
+    The cursor sent to clients is an opaque, url safe token holding the ordering
+    values of the row it points at.
+
+    `ordering` must uniquely identify a row (add the primary key as a tie breaker)
+    and every field in it must be readable as an attribute of the returned objects.
+
+    Querysets whose rows come from several sources can be paginated by returning
+    a queryset for each source from `get_sources`: a page of each one is fetched
+    and the pages are merged, a row found in several sources is returned once.
+
+    Clients that still send the `page` query param get the old page number
+    responses, including the total count.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    ordering = ("-created_at", "-id")
+    cursor_query_param = "cursor"
+    page_query_param = "page"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number_paginator = None
+
+        if self.page_query_param in request.query_params:
+            self.page_number_paginator = PageNumberPagination()
+            self.page_number_paginator.page_size = self.page_size
+            return self.page_number_paginator.paginate_queryset(
+                queryset, request, view
+            )
+
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        is_reversed = cursor is not None and cursor["reverse"]
+
+        ordering = self.ordering
+        if is_reversed:
+            ordering = [self._invert(field) for field in ordering]
+
+        keyset_filter = Q()
+        if cursor is not None:
+            values = self.clean_cursor_values(queryset.model, cursor["values"])
+            keyset_filter = self.get_keyset_filter(ordering, values)
+
+        # fetch one extra row to find out if there is another page
+        results = []
+        sources = self.get_sources(queryset, view)
+        for source in sources:
+            source = source.order_by(*ordering).filter(keyset_filter)
+            results.extend(source[: self.page_size + 1])
+        if len(sources) > 1:
+            results = self.merge_rows(results, ordering)[: self.page_size + 1]
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if is_reversed:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        return self.page
+
+    def get_sources(self, queryset, view):
+        """Return the querysets the rows of a page are fetched from."""
+        return [queryset]
+
+    @staticmethod
+    def merge_rows(rows, ordering):
+        """Sort the rows fetched from several sources in the given ordering."""
+        rows = list({row.pk: row for row in rows}.values())
+        for field in reversed(ordering):
+            rows.sort(
+                key=attrgetter(field.lstrip("-")), reverse=field.startswith("-")
+            )
+        return rows
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_query_param,
+                "required": False,
+                "in": "query",
+                "description": (
+                    "Page number. Use page number pagination instead of a cursor."
+                ),
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_keyset_filter(self, ordering, values):
+        """
+        Build the filter selecting rows that come after the given values in the
+        given ordering. For an ordering of (a, b) this is:
+        (a after value_a) OR (a = value_a AND b after value_b)
+        """
+        keyset_filter = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition = Q(**{f"{name}__{lookup}": values[index]})
+            for previous_field, previous_value in zip(ordering[:index], values):
+                condition &= Q(**{previous_field.lstrip("-"): previous_value})
+            keyset_filter |= condition
+        return keyset_filter
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            values = cursor["v"]
+            reverse = bool(cursor.get("r", False))
+        except (TypeError, ValueError, KeyError, binascii.Error, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {"values": values, "reverse": reverse}
+
+    def clean_cursor_values(self, model, values):
+        """
+        Convert the values of a cursor to the types of the ordering fields, so a
+        cursor holding values of the wrong type is rejected before it is queried.
+        Fields that aren't fields of the model are annotated timestamps, like
+        feed_created_at.
+        """
+        cleaned = []
+        try:
+            for field, value in zip(self.ordering, values):
+                try:
+                    model_field = model._meta.get_field(field.lstrip("-"))
+                except FieldDoesNotExist:
+                    value = parse_datetime(value)
+                    if value is None:
+                        raise ValueError("Invalid timestamp.")
+                else:
+                    value = model_field.get_prep_value(model_field.to_python(value))
+                cleaned.append(value)
+        except (ValidationError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+
+        cursor = {"v": values}
+        if reverse:
+            cursor["r"] = 1
+        encoded = urlsafe_b64encode(
+            json.dumps(cursor, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+
+        url = remove_query_param(self.base_url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class FeedPostsPagination(KeysetPagination):
+    # feed_created_at is annotated onto each Post by Post.objects.in_feed_of()
+    ordering = ("-feed_created_at", "-id")
+
+    def get_sources(self, queryset, view):
+        # a page of the feed entries and a page of the posts pulled from the
+        # profiles that fan out on read, see Post.objects.feed_sources_of()
+        return view.get_feed_sources()
+
+
+class ListExplorePostsPagination(KeysetPagination):
+    page_size = 24
+    ordering = ("-created_at", "-id")
+
+
+class ListProfilePostsPagination(KeysetPagination):
     page_size = 24
+    ordering = ("-created_at", "-id")
 
 
-class ListProfilePostsPagination(PageNumberPagination):
+class SavedPostsPagination(KeysetPagination):
     page_size = 24
+    # saved_at is annotated onto each Post by the saved posts view
+    ordering = ("-saved_at", "-id")
 
 
 class ListSimilarPostsPagination(PageNumberPagination):
     page_size = 5
 
 
-class FollowListPagination(PageNumberPagination):
+class FollowListPagination(KeysetPagination):
     page_size = 15
+    # usernames are unique so no tie breaker is needed
+    ordering = ("username",)
 
 
 class PostCommentsPagination(PageNumberPagination):
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from apps.core_app.models import (
     Post,
     PostImage,
+    PostImageStaged,
     Like,
     Comment,
     Profile,
@@ -11,20 +12,38 @@ from apps.core_app.models import (
     ReportReason,
     PostReport,
 )
+from apps.core_app.counters import get_post_likes_count
 from django.db.models import Q
 from ..user_app.serializers import (
+    ImageVariantsSerializerMixin,
     ProfileSerializer,
     ProfileImageSerializer,
     PetTypeSerializer,
 )
 
 
-class PostImageSerializer(serializers.ModelSerializer):
+class PostImageSerializer(ImageVariantsSerializerMixin, serializers.ModelSerializer):
     """Serializer for Post Images."""
 
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = PostImage
-        fields = ["id", "post", "image"]
+        fields = ["id", "post", "image", "srcset", "status"]
+        read_only_fields = ["status"]
+
+
+class PostImageStagedSerializer(
+    ImageVariantsSerializerMixin, serializers.ModelSerializer
+):
+    """Serializer for images uploaded before their Post is created."""
+
+    srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PostImageStaged
+        fields = ["id", "post_uuid", "image", "srcset", "status", "uploaded_at"]
+        read_only_fields = ["status", "uploaded_at"]
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -61,7 +80,7 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = "__all__"
-        read_only_fields = ["id", "created_at"]
+        read_only_fields = ["id", "created_at", "likes_count", "replies_count"]
 
 
 class CommentDetailedSerializer(serializers.ModelSerializer):
@@ -102,22 +121,33 @@ class CommentDetailedSerializer(serializers.ModelSerializer):
             "reply_to_comment_username",
         ]
 
-    def get_likes_count(self, obj) -> bool:
-        return obj.likes.count()
+    def get_likes_count(self, obj) -> int:
+        return obj.likes_count
+
+    # The methods below prefer the values attached by Comment.objects.with_details()
+    # and with_first_replies() and only fall back to a query when the Comment was
+    # loaded without them.
 
     def get_liked(self, obj) -> bool:
         # boolean - has requesting profile liked the comment being fetched
+        if hasattr(obj, "viewer_liked"):
+            return obj.viewer_liked
         auth_profile_id = self.context["request"].headers["auth-profile-id"]
         if auth_profile_id:
             return obj.likes.filter(profile=auth_profile_id).exists()
         return False
 
     def get_replies_count(self, obj) -> int:
-        replies_count = obj.all_replies.count()
-        return replies_count
+        return obj.replies_count
 
-    def get_replies(self, obj):
-        return []
+    def get_replies(self, obj) -> list[dict]:
+        # the first replies of a top level comment, the rest are listed by the
+        # comment replies endpoint
+        if not hasattr(obj, "first_replies"):
+            return []
+        return CommentDetailedSerializer(
+            obj.first_replies, many=True, context=self.context
+        ).data
 
     def get_parent_comment_username(self, obj) -> str | None:
         if obj.parent_comment:
@@ -254,13 +284,18 @@ class PostDetailedSerializer(serializers.ModelSerializer):
         ]
 
     def get_comments_count(self, obj) -> int:
-        return obj.comments.count()
+        return obj.comments_count
 
     def get_likes_count(self, obj) -> int:
-        return obj.likes.count()
+        return get_post_likes_count(obj)
+
+    # The methods below prefer the values attached by Post.objects.with_details()
+    # and only fall back to a query when the Post was loaded without them.
 
     def get_liked(self, obj) -> bool:
         # boolean - is requesting profile liked the post being fetched
+        if hasattr(obj, "viewer_liked"):
+            return obj.viewer_liked
         auth_profile_id = self.context["request"].headers["auth-profile-id"]
         if auth_profile_id:
             return obj.likes.filter(profile=auth_profile_id).exists()
@@ -268,23 +303,64 @@ class PostDetailedSerializer(serializers.ModelSerializer):
 
     def get_is_saved(self, obj) -> bool:
         # boolean - did requesting profile save the post being fetched
+        if hasattr(obj, "viewer_saved"):
+            return obj.viewer_saved
         requesting_profile = self.context["request"].headers["auth-profile-id"]
         if requesting_profile:
             return obj.saved_by.filter(profile=requesting_profile).exists()
         return False
 
+    def _open_reports(self, obj):
+        if hasattr(obj, "open_reports"):
+            return obj.open_reports
+        return obj.reports.filter(~Q(status="DISMISSED")).select_related("reason")
+
     def get_reports(self, obj):
-        reports = obj.reports.filter(~Q(status="DISMISSED"))
+        if not obj.has_open_reports:
+            return []
+        reports = self._open_reports(obj)
         serializer = PostReportPreviewSerializer(reports, many=True)
         return serializer.data
 
     def get_is_hidden(self, obj) -> bool:
-        return obj.reports.filter(~Q(status="DISMISSED")).count() > 0
+        return obj.has_open_reports
 
     def get_is_reported(self, obj) -> bool:
+        if hasattr(obj, "viewer_reported"):
+            return obj.viewer_reported
         current_profile = self.context["request"].current_profile
         return obj.reports.filter(reporter=current_profile).exists()
 
+    def to_representation_with_card(self, instance, card):
+        """
+        Return the representation of a Post with the fields of its post card
+        taken from the card, see apps.core_app.post_cards.
+        """
+        return {
+            name: (
+                card[name] if name in card else getattr(self, f"get_{name}")(instance)
+            )
+            for name in self.Meta.fields
+        }
+
+
+# fields of PostDetailedSerializer read for every request, the rest are in the
+# post card
+POST_REQUEST_FIELDS = [
+    "comments_count", "likes_count", "liked", "is_saved", "is_reported"
+]
+
+
+class PostCardSerializer(PostDetailedSerializer):
+    """Serializer for the parts of a Post that are the same for every viewer."""
+
+    class Meta(PostDetailedSerializer.Meta):
+        fields = [
+            name
+            for name in PostDetailedSerializer.Meta.fields
+            if name not in POST_REQUEST_FIELDS
+        ]
+
 
 class ProfileDetailsSerializer(serializers.ModelSerializer):
     """Detailed serializer for Profile."""
@@ -322,21 +398,18 @@ class ProfileDetailsSerializer(serializers.ModelSerializer):
 
     def get_posts_count(self, obj) -> int:
         requesting_profile = self.context["request"].query_params.get("profileId", None)
-        posts = obj.posts.all()
 
         # if profile is fetching own posts, return all including reported inappropriate
         if str(obj.id) == str(requesting_profile):
-            return posts.count()
+            return obj.posts_count
         # filter posts that have been reported as inappropriate from count
-        return posts.filter(~Q(reports__reason__id=1)).count()
+        return obj.posts.filter(is_inappropriate=False).count()
 
     def get_followers_count(self, obj) -> int:
-        followers = obj.following.all()
-        return followers.count()
+        return obj.followers_count
 
     def get_following_count(self, obj) -> int:
-        following = obj.followers.all()
-        return following.count()
+        return obj.following_count
 
 
 class SearchProfileSerializer(serializers.ModelSerializer):
@@ -352,6 +425,27 @@ class SearchProfileSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "name", "about", "is_following", "image"]
 
     def get_is_following(self, obj) -> bool:
+        # prefer the flag attached by Profile.objects.with_viewer_following()
+        if hasattr(obj, "viewer_following"):
+            return obj.viewer_following
+        requesting_profile = self.context.get("profile_id")
+        return obj.following.filter(followed_by=requesting_profile).exists()
+
+
+class FollowProfileSerializer(ProfileSerializer):
+    """Serializer for Profiles in follower and following lists.
+    This adds whether the requesting profile follows each listed profile.
+    """
+
+    is_following = serializers.SerializerMethodField()
+
+    class Meta(ProfileSerializer.Meta):
+        fields = ProfileSerializer.Meta.fields + ["is_following"]
+
+    def get_is_following(self, obj) -> bool:
+        # prefer the flag attached by Profile.objects.with_details()
+        if hasattr(obj, "viewer_following"):
+            return obj.viewer_following
         requesting_profile = self.context.get("profile_id")
         return obj.following.filter(followed_by=requesting_profile).exists()
 
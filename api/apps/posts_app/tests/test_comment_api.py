@@ -2,11 +2,19 @@
 Tests for the comment api.
 """
 
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
-from apps.core_app.models import Comment
+from apps.core_app.models import Comment, CommentLike
 
-from .util import PostsAppTestHelper, create_comment_url, list_post_comments_url
+from .util import (
+    PostsAppTestHelper,
+    create_comment,
+    create_comment_url,
+    list_post_comments_url,
+)
 
 
 class PrivateCommentApiTests(PostsAppTestHelper):
@@ -54,6 +62,68 @@ class PrivateCommentApiTests(PostsAppTestHelper):
         self.assertEqual(first_comment["text"], self.comment_2.text)
         self.assertEqual(second_comment["text"], self.comment_1.text)
 
+    @override_settings(COMMENT_THREAD_REPLIES=3)
+    def test_listing_post_comments_inlines_first_replies(self):
+        """
+        Test each listed comment includes its first replies, oldest first,
+        with the usernames they reply to and the requesting profile's likes.
+        """
+        replies = [
+            create_comment(self.profile_2, "Reply 1", self.post_1, self.comment_1)
+        ]
+        for index in range(2, 5):
+            replies.append(
+                create_comment(
+                    self.profile_3,
+                    f"Reply {index}",
+                    self.post_1,
+                    self.comment_1,
+                    replies[-1],
+                )
+            )
+        CommentLike.objects.create(profile=self.profile, comment=replies[1])
+
+        res = self.client.get(list_post_comments_url(self.post_1.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        comment_2, comment_1 = res.data["results"]
+        self.assertEqual(comment_2["replies"], [])
+        self.assertEqual(comment_1["replies_count"], 4)
+        inlined = comment_1["replies"]
+        self.assertEqual(
+            [reply["text"] for reply in inlined], ["Reply 1", "Reply 2", "Reply 3"]
+        )
+        self.assertEqual([reply["liked"] for reply in inlined], [False, True, False])
+        self.assertEqual(inlined[0]["parent_comment_username"], "username_1")
+        self.assertIsNone(inlined[0]["reply_to_comment_username"])
+        self.assertEqual(inlined[1]["reply_to_comment_username"], "username_2")
+        self.assertEqual(inlined[1]["profile"]["username"], "username_3")
+
+    def test_listing_post_comments_queries_do_not_grow_with_page(self):
+        """
+        Test listing comments runs the same number of queries however many
+        comments, replies and likes are on the page.
+        """
+        url = list_post_comments_url(self.post_1.id)
+        # the first request also looks up the profiles self.user owns
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as two_comments:
+            self.client.get(url)
+
+        for index in range(5):
+            comment = create_comment(self.profile_2, f"Comment {index}", self.post_1)
+            CommentLike.objects.create(profile=self.profile, comment=comment)
+            for _ in range(4):
+                reply = create_comment(
+                    self.profile_3, "Reply", self.post_1, comment, comment
+                )
+                CommentLike.objects.create(profile=self.profile, comment=reply)
+        with CaptureQueriesContext(connection) as seven_comments:
+            res = self.client.get(url)
+
+        self.assertEqual(len(res.data["results"]), 7)
+        self.assertEqual(len(seven_comments), len(two_comments))
+
     def test_creating_comment_with_other_users_profile_returns_error(self):
         """
         Test creating a comment using a profile id that does not belong to the authenticated
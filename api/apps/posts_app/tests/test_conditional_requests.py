@@ -0,0 +1,112 @@
+"""
+Tests for conditional GET requests of details and reference data.
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from apps.core_app.models import PetType
+from .util import (
+    PostsAppTestHelper,
+    create_follow,
+    create_like,
+    retrieve_destroy_post_url,
+    retrieve_profile_url,
+)
+
+
+class ConditionalRequestTests(PostsAppTestHelper):
+    """Test unchanged details and reference data are answered with a 304."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+    def get(self, url, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(url, headers=headers)
+
+    def assertNotModified(self, url, etag):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.get(url, etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+        self.assertLessEqual(len(queries), 1)
+
+    def assertModified(self, url, etag):
+        res = self.get(url, etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        return res["ETag"]
+
+    def test_unchanged_post_is_not_modified(self):
+        """Test an unchanged post is answered with a 304 in at most one query."""
+        url = retrieve_destroy_post_url(self.post_5.id)
+        res = self.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("private", res["Cache-Control"])
+        self.assertIn("no-cache", res["Cache-Control"])
+
+        self.assertNotModified(url, res["ETag"])
+
+    def test_changed_post_is_modified(self):
+        """Test likes, edits and author changes give the post a new ETag."""
+        url = retrieve_destroy_post_url(self.post_5.id)
+        etag = self.get(url)["ETag"]
+
+        create_like(self.profile, self.post_5)
+        etag = self.assertModified(url, etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile_3.username = "renamed"
+            self.profile_3.save()
+        etag = self.assertModified(url, etag)
+
+        self.post_5.caption = "Edited caption"
+        self.post_5.save()
+        res = self.get(url, self.assertModified(url, etag))
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_profile_is_modified_by_follows_and_edits(self):
+        """Test a profile's ETag changes with its counts and its columns."""
+        url = retrieve_profile_url(self.profile_3.id, self.profile.id)
+        res = self.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotModified(url, res["ETag"])
+
+        create_follow(self.profile, self.profile_3)
+        etag = self.assertModified(url, res["ETag"])
+
+        self.profile_3.about = "New about text."
+        self.profile_3.save()
+        etag = self.assertModified(url, etag)
+        self.assertNotModified(url, etag)
+
+    def test_reference_data_can_be_cached(self):
+        """Test pet types are cacheable and modified once one is added."""
+        url = reverse("user_app:list_pet_types")
+        res = self.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("public", res["Cache-Control"])
+        self.assertIn("max-age=", res["Cache-Control"])
+        self.assertNotModified(url, res["ETag"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PetType.objects.create(name="Axolotl")
+        res = self.get(url, self.assertModified(url, res["ETag"]))
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_report_reasons_are_not_modified(self):
+        """Test report reasons are answered with a 304 without a query."""
+        url = reverse("posts_app:report-reason-list")
+        etag = self.get(url)["ETag"]
+        self.get(url, etag)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.get(url, etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
@@ -0,0 +1,233 @@
+"""
+Tests for the denormalized engagement counters.
+"""
+
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from apps.core_app.counters import get_post_likes_count, shard_post_like_counter
+from apps.core_app.models import (
+    Comment,
+    CommentLike,
+    Post,
+    PostLikeCounterShard,
+    Profile,
+)
+from .util import (
+    PostsAppTestHelper,
+    create_comment,
+    create_comment_url,
+    create_destroy_follow_url,
+    create_follow_url,
+    create_like,
+    create_like_url,
+    destroy_like_url,
+    retrieve_destroy_post_url,
+)
+
+
+class CounterTests(PostsAppTestHelper):
+    """Test the counters are kept up to date and can be reconciled."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+    def test_setup_counters(self):
+        """Test the counters match the rows created by the test helper."""
+        self.profile.refresh_from_db()
+        self.profile_2.refresh_from_db()
+        self.post_1.refresh_from_db()
+        self.assertEqual(self.profile.posts_count, 2)
+        self.assertEqual(self.profile.following_count, 1)
+        self.assertEqual(self.profile_2.followers_count, 1)
+        self.assertEqual(self.post_1.comments_count, 2)
+
+    def test_like_and_unlike_update_likes_count(self):
+        """Test liking and un-liking a post updates the post likes count."""
+        res = self.client.post(
+            create_like_url(self.post_3.id), data={"profileId": self.profile.id}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.post_3.refresh_from_db()
+        self.assertEqual(self.post_3.likes_count, 1)
+
+        res = self.client.get(retrieve_destroy_post_url(self.post_3.id))
+        self.assertEqual(res.data["likes_count"], 1)
+
+        res = self.client.delete(destroy_like_url(self.post_3.id, self.profile.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.post_3.refresh_from_db()
+        self.assertEqual(self.post_3.likes_count, 0)
+
+    def test_reply_updates_comment_and_reply_counts(self):
+        """Test a reply updates the post comments count and parent replies count."""
+        payload = {
+            "text": "A reply",
+            "profileId": self.profile.id,
+            "parent_comment": self.comment_1.id,
+            "reply_to_comment": self.comment_1.id,
+        }
+        res = self.client.post(create_comment_url(self.post_1.id), data=payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.post_1.refresh_from_db()
+        self.comment_1.refresh_from_db()
+        self.assertEqual(self.post_1.comments_count, 3)
+        self.assertEqual(self.comment_1.replies_count, 1)
+
+    def test_follow_and_unfollow_update_follow_counts(self):
+        """Test following and un-following updates both profiles counts."""
+        res = self.client.post(
+            create_follow_url(self.profile.id), data={"profileId": self.profile_3.id}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.profile.refresh_from_db()
+        self.profile_3.refresh_from_db()
+        self.assertEqual(self.profile.following_count, 2)
+        self.assertEqual(self.profile_3.followers_count, 1)
+
+        res = self.client.delete(
+            create_destroy_follow_url(self.profile.id, self.profile_3.id)
+        )
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.profile.refresh_from_db()
+        self.profile_3.refresh_from_db()
+        self.assertEqual(self.profile.following_count, 1)
+        self.assertEqual(self.profile_3.followers_count, 0)
+
+    def test_deleting_post_does_not_update_its_counters(self):
+        """Test the likes and comments of a deleted post don't update it."""
+        create_like(self.profile_2, self.post_1)
+        reply = create_comment(self.profile_2, "Reply", self.post_1, self.comment_1)
+        CommentLike.objects.create(profile=self.profile_2, comment=reply)
+        CommentLike.objects.create(profile=self.profile_2, comment=self.comment_1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.delete(retrieve_destroy_post_url(self.post_1.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        updates = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertFalse([sql for sql in updates if '"core_app_post"' in sql])
+        self.assertFalse([sql for sql in updates if '"core_app_comment"' in sql])
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.posts_count, 1)
+
+    def test_deleting_comment_updates_post_comments_count(self):
+        """Test deleting a comment with a reply still updates the post."""
+        create_comment(self.profile_2, "Reply", self.post_1, self.comment_1)
+
+        self.comment_1.delete()
+
+        self.post_1.refresh_from_db()
+        self.assertEqual(self.post_1.comments_count, 1)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Test the reconcile_counters command fixes counters that have drifted."""
+        create_like(self.profile_2, self.post_1)
+        create_comment(self.profile_2, "Reply", self.post_1, self.comment_1)
+        Post.objects.filter(id=self.post_1.id).update(likes_count=7, comments_count=0)
+        Comment.objects.filter(id=self.comment_1.id).update(replies_count=5)
+        Profile.objects.filter(id=self.profile_2.id).update(followers_count=-1)
+
+        call_command("reconcile_counters", batch_size=2, stdout=StringIO())
+
+        self.post_1.refresh_from_db()
+        self.comment_1.refresh_from_db()
+        self.profile_2.refresh_from_db()
+        self.assertEqual(self.post_1.likes_count, 1)
+        self.assertEqual(self.post_1.comments_count, 3)
+        self.assertEqual(self.comment_1.replies_count, 1)
+        self.assertEqual(self.profile_2.followers_count, 1)
+
+
+@override_settings(LIKE_COUNTER_SHARD_THRESHOLD=2, LIKE_COUNTER_SHARDS=4)
+class ShardedLikeCounterTests(PostsAppTestHelper):
+    """Test hot posts are switched to a sharded like counter."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        cache.clear()
+
+    def test_post_sharded_after_threshold(self):
+        """Test a post liked more than the threshold gets a sharded counter."""
+        with self.captureOnCommitCallbacks(execute=True):
+            create_like(self.profile_2, self.post_1)
+        self.post_1.refresh_from_db()
+        self.assertFalse(self.post_1.like_counter_sharded)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_like(self.profile_3, self.post_1)
+        self.post_1.refresh_from_db()
+        self.assertTrue(self.post_1.like_counter_sharded)
+        self.assertEqual(self.post_1.like_counter_shards.count(), 4)
+        self.assertEqual(self.post_1.likes_count, 2)
+
+    def test_deleting_post_with_more_likes_than_threshold(self):
+        """Test the likes deleted with a post don't count toward sharding it."""
+        # the likes are created without running the promotion callbacks
+        for profile in (self.profile_2, self.profile_3, self.profile_4):
+            create_like(profile, self.post_1)
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(retrieve_destroy_post_url(self.post_1.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Post.objects.filter(id=self.post_1.id).exists())
+
+    def test_deleted_post_is_not_sharded(self):
+        """Test a promotion scheduled before the post was deleted does nothing."""
+        post_id = self.post_1.id
+        self.post_1.delete()
+
+        shard_post_like_counter(post_id)
+
+        self.assertFalse(PostLikeCounterShard.objects.filter(post=post_id).exists())
+
+    def test_sharded_likes_written_to_shards(self):
+        """Test likes of a sharded post update a shard instead of the post row."""
+        shard_post_like_counter(self.post_1.id)
+        create_like(self.profile_2, self.post_1)
+        like = create_like(self.profile_3, self.post_1)
+        like.delete()
+        create_like(self.profile_4, self.post_1)
+
+        self.post_1.refresh_from_db()
+        self.assertEqual(self.post_1.likes_count, 0)
+        shards = self.post_1.like_counter_shards.values_list("count", flat=True)
+        self.assertEqual(sum(shards), 2)
+        self.assertEqual(get_post_likes_count(self.post_1), 2)
+
+        self.client.force_authenticate(user=self.user_2)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile_2.id)
+        res = self.client.get(retrieve_destroy_post_url(self.post_1.id))
+        self.assertEqual(res.data["likes_count"], 2)
+
+    def test_reconcile_counters_keeps_shards(self):
+        """Test reconciling a sharded post accounts for the shard counts."""
+        create_like(self.profile_2, self.post_1)
+        shard_post_like_counter(self.post_1.id)
+        create_like(self.profile_3, self.post_1)
+        Post.objects.filter(id=self.post_1.id).update(likes_count=9)
+
+        call_command("reconcile_counters", model=["post"], stdout=StringIO())
+
+        self.post_1.refresh_from_db()
+        self.assertEqual(self.post_1.likes_count, 1)
+        self.assertEqual(get_post_likes_count(self.post_1), 2)
@@ -2,9 +2,19 @@
 Tests for the Explore api.
 """
 
+import json
+from base64 import urlsafe_b64encode
+
 from rest_framework import status
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .util import PostsAppTestHelper, create_like, create_post, get_explore_posts_url
 
-from .util import PostsAppTestHelper, get_explore_posts_url
+
+def encode_cursor(values):
+    """Encode a cursor holding values like the ones the api issues."""
+    return urlsafe_b64encode(json.dumps({"v": values}).encode()).decode()
 
 
 class PrivateExploreApiTests(PostsAppTestHelper):
@@ -27,6 +37,46 @@ class PrivateExploreApiTests(PostsAppTestHelper):
 
         self.assertEqual(len(res.data["results"]), 4)
 
+    def test_fetch_explore_posts_query_count_does_not_grow_with_page(self):
+        """
+        Test the number of queries used to fetch explore posts does not depend on
+        the number of posts on the page.
+        """
+        url = get_explore_posts_url(self.profile.id)
+
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(url)
+
+        for i in range(6):
+            post = create_post(f"Extra post {i}", self.profile_3)
+            create_like(self.profile, post)
+
+        with CaptureQueriesContext(connection) as large_page:
+            res = self.client.get(url)
+
+        self.assertEqual(len(res.data["results"]), 10)
+        self.assertEqual(len(large_page), len(small_page))
+        self.assertTrue(all(post["liked"] for post in res.data["results"][:6]))
+        self.assertTrue(all(post["likes_count"] == 1 for post in res.data["results"][:6]))
+
+    def assertCursorIsRejected(self, values):
+        res = self.client.get(
+            get_explore_posts_url(self.profile.id), {"cursor": encode_cursor(values)}
+        )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fetch_explore_posts_with_text_cursor_returns_error(self):
+        """Test a cursor whose timestamp isn't a timestamp returns 404."""
+        self.assertCursorIsRejected(["x", "y"])
+
+    def test_fetch_explore_posts_with_text_id_cursor_returns_error(self):
+        """Test a cursor whose id isn't a number returns 404."""
+        self.assertCursorIsRejected(["2024-01-01T00:00:00+00:00", "y"])
+
+    def test_fetch_explore_posts_with_object_cursor_returns_error(self):
+        """Test a cursor holding an object instead of a value returns 404."""
+        self.assertCursorIsRejected([{"a": 1}, 1])
+
 
 class PublicExploreApiTests(PostsAppTestHelper):
     """Test the public, unauthenticated features of the Explore API."""
@@ -2,9 +2,15 @@
 Tests for the Feed api.
 """
 
+from io import StringIO
+
 from rest_framework import status
+from django.core.management import call_command
+from django.test import override_settings
 
-from .util import get_feed_url, PostsAppTestHelper
+from apps.core_app.models import FeedEntry, Follow, Post, Profile
+from apps.posts_app.pagination import FeedPostsPagination
+from .util import get_feed_url, create_follow, create_post, PostsAppTestHelper
 
 
 class PrivateFeedApiTests(PostsAppTestHelper):
@@ -27,6 +33,145 @@ class PrivateFeedApiTests(PostsAppTestHelper):
 
         self.assertEqual(len(res.data["results"]), 1)
 
+    def test_fetch_feed_with_cursor_returns_each_post_once(self):
+        """
+        Test following the cursor links of a feed returns every feed post exactly once
+        in newest first order, even when a post is created between page fetches.
+        """
+        for i in range(5):
+            create_post(f"Feed post {i}", self.profile_2)
+        expected_ids = list(
+            Post.objects.filter(profile=self.profile_2)
+            .exclude(id=self.post_4.id)  # reported as inappropriate
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+
+        res = self.client.get(get_feed_url(self.profile.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", res.data)
+        self.assertIsNone(res.data["previous"])
+        fetched_ids = [post["id"] for post in res.data["results"]]
+
+        # a new post should not shift the following pages
+        create_post("Posted while scrolling", self.profile_2)
+
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            fetched_ids += [post["id"] for post in res.data["results"]]
+
+        self.assertEqual(fetched_ids, expected_ids)
+
+    def test_fetch_feed_with_page_param_uses_page_numbers(self):
+        """
+        Test fetching a feed with the page query param returns a page number response.
+        """
+        res = self.client.get(get_feed_url(self.profile.id), {"page": 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(res.data["count"], 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_fetch_feed_with_invalid_cursor_returns_error(self):
+        """
+        Test fetching a feed with a cursor that was not issued by the api returns 404.
+        """
+        res = self.client.get(get_feed_url(self.profile.id), {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_new_post_is_written_to_followers_feeds(self):
+        """
+        Test creating a post adds it to the feed of each follower of the author.
+        """
+        create_follow(self.profile_3, self.profile_2)
+        post = create_post("New post", self.profile_2)
+
+        self.assertEqual(
+            set(FeedEntry.objects.filter(post=post).values_list("profile", flat=True)),
+            {self.profile.id, self.profile_3.id},
+        )
+
+        res = self.client.get(get_feed_url(self.profile.id))
+        self.assertEqual(res.data["results"][0]["id"], post.id)
+
+    def test_unfollow_removes_posts_from_feed(self):
+        """
+        Test deleting a follow removes the unfollowed profile's posts from the feed.
+        """
+        Follow.objects.get(followed_by=self.profile, followed=self.profile_2).delete()
+
+        self.assertFalse(FeedEntry.objects.filter(profile=self.profile).exists())
+        res = self.client.get(get_feed_url(self.profile.id))
+        self.assertEqual(len(res.data["results"]), 0)
+
+    @override_settings(FEED_FAN_OUT_MAX_FOLLOWERS=0)
+    def test_posts_from_profiles_over_fan_out_limit_are_read_from_follows(self):
+        """
+        Test a post from a profile with more followers than the fan out limit is not
+        written to feeds but is still returned in the feed of its followers.
+        """
+        post = create_post("Popular post", self.profile_2)
+
+        self.profile_2.refresh_from_db()
+        self.assertTrue(self.profile_2.fan_out_on_read)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+
+        res = self.client.get(get_feed_url(self.profile.id))
+        self.assertEqual(
+            [result["id"] for result in res.data["results"]],
+            [post.id, self.post_3.id],
+        )
+
+    def test_feed_merges_feed_entries_and_pulled_posts(self):
+        """
+        Test following the cursor links of a feed with posts from feed entries and
+        from profiles that fan out on read returns every post once, in order.
+        """
+        create_follow(self.profile, self.profile_3)
+        Profile.objects.filter(id=self.profile_2.id).update(fan_out_on_read=True)
+        for i in range(15):
+            create_post(f"Pulled post {i}", self.profile_2)
+            create_post(f"Written post {i}", self.profile_3)
+        expected_ids = list(
+            Post.objects.filter(
+                profile__in=[self.profile_2, self.profile_3], is_inappropriate=False
+            )
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)
+        )
+
+        res = self.client.get(get_feed_url(self.profile.id))
+        fetched_ids = [post["id"] for post in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            fetched_ids += [post["id"] for post in res.data["results"]]
+
+        self.assertEqual(fetched_ids, expected_ids)
+        res = self.client.get(get_feed_url(self.profile.id), {"page": 1})
+        self.assertEqual(res.data["count"], len(expected_ids))
+        self.assertEqual(
+            [post["id"] for post in res.data["results"]],
+            expected_ids[: FeedPostsPagination.page_size],
+        )
+
+    def test_rebuild_feeds_command_restores_feed(self):
+        """
+        Test the rebuild_feeds command recreates missing feed entries.
+        """
+        FeedEntry.objects.all().delete()
+
+        call_command("rebuild_feeds", stdout=StringIO())
+
+        self.assertEqual(
+            set(FeedEntry.objects.values_list("profile", "post")),
+            {
+                (self.profile.id, self.post_3.id),
+                (self.profile.id, self.post_4.id),
+            },
+        )
+
     def test_fetch_feed_of_another_user_returns_error(self):
         """
         Test fetching a profiles feed that is not a profile of the authenticated user
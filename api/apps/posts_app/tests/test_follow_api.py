@@ -2,13 +2,19 @@
 Tests for the Follow api.
 """
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 
+from apps.core_app.models import PetType, ProfileImage
 from .util import (
     PostsAppTestHelper,
     create_follow,
     create_follow_url,
     create_destroy_follow_url,
+    create_profile,
+    list_followers_url,
+    list_following_url,
 )
 
 
@@ -85,6 +91,72 @@ class PrivateFollowApiTests(PostsAppTestHelper):
         current_follows_count = self.get_follows_count()
         self.assertEqual(current_follows_count, starting_follows_count)
 
+    def test_list_followers_successful(self):
+        """
+        Test listing a profile's followers returns the follower profiles
+        ordered by username.
+        """
+        create_follow(self.profile_4, self.profile_2)
+        create_follow(self.profile_3, self.profile_2)
+
+        url = list_followers_url(self.profile_2.id)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        usernames = [profile["username"] for profile in res.data["results"]]
+        self.assertEqual(usernames, ["username_1", "username_3", "username_4"])
+        self.assertIsNone(res.data["next"])
+
+    def test_list_followers_flags_profiles_the_viewer_follows(self):
+        """
+        Test each listed profile says whether the requesting profile follows
+        it.
+        """
+        create_follow(self.profile_2, self.profile_4)
+        create_follow(self.profile_3, self.profile_4)
+
+        res = self.client.get(list_followers_url(self.profile_4.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        flags = {
+            profile["username"]: profile["is_following"]
+            for profile in res.data["results"]
+        }
+        self.assertEqual(flags, {"username_2": True, "username_3": False})
+
+    def test_list_following_queries_do_not_grow_with_page(self):
+        """
+        Test listing followed profiles with images and pet types runs the same
+        number of queries however many profiles are on the page.
+        """
+        pet_type = PetType.objects.create(name="Dog")
+
+        def follow_new_profile(index):
+            profile = create_profile(f"followed_{index}", "About.", self.user_2)
+            profile.pet_type = pet_type
+            profile.save()
+            ProfileImage.objects.create(profile=profile, image=f"followed_{index}.png")
+            create_follow(self.profile_3, profile)
+            create_follow(self.profile, profile)
+
+        follow_new_profile(0)
+        # the first request also looks up the profiles self.user owns
+        self.client.get(list_following_url(self.profile_3.id))
+        with CaptureQueriesContext(connection) as one_profile:
+            res = self.client.get(list_following_url(self.profile_3.id))
+        self.assertEqual(len(res.data["results"]), 1)
+
+        for index in range(1, 10):
+            follow_new_profile(index)
+        with CaptureQueriesContext(connection) as ten_profiles:
+            res = self.client.get(list_following_url(self.profile_3.id))
+
+        self.assertEqual(len(res.data["results"]), 10)
+        self.assertEqual(len(ten_profiles), len(one_profile))
+        for profile in res.data["results"]:
+            self.assertTrue(profile["is_following"])
+            self.assertEqual(profile["pet_type"]["name"], "Dog")
+
     def test_destroy_follow_successful(self):
         """
         Test removing a follow is successful and removes
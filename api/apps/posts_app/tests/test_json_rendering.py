@@ -0,0 +1,129 @@
+"""
+Tests for the orjson renderer and parser.
+"""
+
+import datetime
+import importlib
+import uuid
+from decimal import Decimal
+from io import BytesIO
+
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from apps.core_app.parsers import ORJSONParser
+from apps.core_app.renderers import ORJSONRenderer
+from .util import PostsAppTestHelper, create_like, get_explore_posts_url
+
+
+class ORJSONRendererTests(TestCase):
+    """Test the orjson renderer renders the same bytes as JSONRenderer."""
+
+    def assertRendersLikeJSONRenderer(self, data, accepted_media_type=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def test_values_are_encoded_like_json_renderer(self):
+        """Test datetimes, Decimals, UUIDs and lazy strings are encoded the same."""
+        five_hours = datetime.timedelta(hours=5)
+        data = {
+            "aware": timezone.now(),
+            "offset": datetime.datetime(
+                2024, 10, 13, 15, 48, 3, 38000, datetime.timezone(-five_hours)
+            ),
+            "naive": datetime.datetime(2024, 10, 13, 15, 48, 3),
+            "date": datetime.date(2024, 10, 13),
+            "time": datetime.time(15, 48, 3, 38),
+            "timedelta": datetime.timedelta(minutes=5),
+            "decimal": Decimal("12.50"),
+            "uuid": uuid.uuid4(),
+            "lazy": gettext_lazy("Processing"),
+            "text": "Pawsome 🐾 é \u2028 \u2029",
+            "ints": {1: [1, 2.5, None, True], 2: (3, 4)},
+        }
+
+        self.assertRendersLikeJSONRenderer(data)
+        self.assertRendersLikeJSONRenderer(data, "application/json; indent=4")
+        # rendered by JSONRenderer
+        self.assertRendersLikeJSONRenderer({"big": 2**70})
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_unserializable_values_raise_like_json_renderer(self):
+        """Test values JSON can't hold raise the errors JSONRenderer raises."""
+        aware_time = datetime.time(15, 48, tzinfo=datetime.timezone.utc)
+
+        with self.assertRaises(ValueError):
+            ORJSONRenderer().render({"time": aware_time})
+        with self.assertRaises(TypeError):
+            ORJSONRenderer().render({"object": object()})
+
+    def test_parser_parses_json(self):
+        """Test bodies are parsed and invalid JSON is rejected."""
+        parser = ORJSONParser()
+        body = '{"caption": "Pawsome 🐾", "images": [1, 2]}'
+
+        self.assertEqual(
+            parser.parse(BytesIO(body.encode())),
+            {"caption": "Pawsome 🐾", "images": [1, 2]},
+        )
+        self.assertEqual(
+            parser.parse(
+                BytesIO('{"name": "Élan"}'.encode("latin-1")),
+                parser_context={"encoding": "latin-1"},
+            ),
+            {"name": "Élan"},
+        )
+        for invalid in (b'{"caption": }', b'{"likes": NaN}', b"\xff"):
+            with self.assertRaises(ParseError):
+                parser.parse(BytesIO(invalid))
+
+
+class EnvironmentSettingsTests(TestCase):
+    """Test every environment renders and parses JSON with orjson."""
+
+    def test_environments_use_orjson_renderer_and_parser(self):
+        """Test each environment's REST_FRAMEWORK keeps the orjson classes."""
+        for environment in ("dev", "staging", "prod", "test"):
+            with self.subTest(environment=environment):
+                module = importlib.import_module(f"core.settings_{environment}")
+                rest_framework = module.REST_FRAMEWORK
+
+                self.assertEqual(
+                    rest_framework["DEFAULT_RENDERER_CLASSES"],
+                    (
+                        "apps.core_app.renderers.ORJSONRenderer",
+                        "rest_framework.renderers.BrowsableAPIRenderer",
+                    ),
+                )
+                self.assertEqual(
+                    rest_framework["DEFAULT_PARSER_CLASSES"],
+                    (
+                        "apps.core_app.parsers.ORJSONParser",
+                        "rest_framework.parsers.FormParser",
+                        "rest_framework.parsers.MultiPartParser",
+                    ),
+                )
+
+
+class ORJSONResponseTests(PostsAppTestHelper):
+    """Test API responses are rendered with the orjson renderer."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+    def test_page_is_rendered_like_json_renderer(self):
+        """Test a page of posts is the same as rendered by JSONRenderer."""
+        create_like(self.profile, self.post_5)
+
+        res = self.client.get(get_explore_posts_url(self.profile.id))
+
+        self.assertEqual(res.content, JSONRenderer().render(res.data))
+        self.assertIsInstance(res.accepted_renderer, ORJSONRenderer)
@@ -0,0 +1,185 @@
+"""
+Tests for the post card cache.
+"""
+
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from apps.core_app.images import process_image
+from apps.core_app.models import ImageStatus, PostImage, PostReport
+from apps.core_app.post_cards import ENDPOINTS, get_stats
+from .util import (
+    PostsAppTestHelper,
+    create_image_upload,
+    create_like,
+    get_explore_posts_url,
+    get_feed_url,
+    retrieve_destroy_post_url,
+)
+
+
+@override_settings(POST_CARD_CACHE_ENDPOINTS=ENDPOINTS, MEDIA_ROOT=tempfile.mkdtemp())
+class PostCardCacheTests(PostsAppTestHelper):
+    """Test posts are served from cached post cards."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        cache.clear()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+    def tearDown(self):
+        cache.clear()
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def get_explore(self):
+        res = self.client.get(get_explore_posts_url(self.profile.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {post["id"]: post for post in res.data["results"]}
+
+    def test_cached_posts_match_uncached_posts(self):
+        """Test cached and uncached responses are the same."""
+        create_like(self.profile, self.post_5)
+        urls = [
+            get_explore_posts_url(self.profile.id),
+            get_feed_url(self.profile.id),
+            retrieve_destroy_post_url(self.post_5.id),
+        ]
+        with override_settings(POST_CARD_CACHE_ENDPOINTS=[]):
+            uncached = [self.client.get(url).json() for url in urls]
+
+        # the first request builds the cards, the second reads them
+        for _ in range(2):
+            self.assertEqual([self.client.get(url).json() for url in urls], uncached)
+
+        stats = get_stats()
+        for endpoint, response in zip(["explore", "feed"], uncached):
+            count = len(response["results"])
+            self.assertEqual(stats[endpoint], {"hits": count, "misses": count})
+        # the card of the post was built by the explore request
+        self.assertEqual(stats["post_detail"], {"hits": 2, "misses": 0})
+
+    def test_cached_cards_skip_related_rows(self):
+        """Test a page of cached cards doesn't read images, profiles or reports."""
+        self.get_explore()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.get_explore()
+
+        tables = ["core_app_postimage", "core_app_profileimage", "core_app_postreport"]
+        for query in queries:
+            for table in tables:
+                # the viewer's flags are read in subqueries on an alias
+                self.assertNotIn(f'"{table}"."id"', query["sql"])
+
+    def test_counts_and_viewer_flags_are_read_for_each_request(self):
+        """Test likes are shown without invalidating the cached card."""
+        self.assertFalse(self.get_explore()[self.post_5.id]["liked"])
+
+        create_like(self.profile, self.post_5)
+        create_like(self.profile_2, self.post_5)
+
+        post = self.get_explore()[self.post_5.id]
+        self.assertTrue(post["liked"])
+        self.assertEqual(post["likes_count"], 2)
+        self.assertEqual(get_stats()["explore"]["hits"], 4)
+
+    def test_editing_post_replaces_its_card(self):
+        """Test an edited caption is shown once the edit is committed."""
+        self.get_explore()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_5.caption = "Edited caption"
+            self.post_5.save()
+
+        post = self.get_explore()[self.post_5.id]
+        self.assertEqual(post["caption"], "Edited caption")
+
+    def test_editing_profile_replaces_cards_of_its_posts(self):
+        """Test a new username is shown on every post of the profile."""
+        self.get_explore()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile_3.username = "renamed"
+            self.profile_3.save()
+
+        posts = self.get_explore()
+        for post in (self.post_5, self.post_6):
+            self.assertEqual(posts[post.id]["profile"]["username"], "renamed")
+        self.assertEqual(posts[self.post_7.id]["profile"]["username"], "username_4")
+
+    def test_reporting_post_replaces_its_card(self):
+        """Test a report is shown on the reported post."""
+        res = self.client.get(retrieve_destroy_post_url(self.post_5.id))
+        self.assertFalse(res.data["is_hidden"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PostReport.objects.create(
+                post=self.post_5, reporter=self.profile_2, reason=self.reason2
+            )
+
+        res = self.client.get(retrieve_destroy_post_url(self.post_5.id))
+        self.assertTrue(res.data["is_hidden"])
+        self.assertEqual(len(res.data["reports"]), 1)
+
+    @override_settings(IMAGE_PROCESSING_BACKEND="worker")
+    def test_processed_image_replaces_card(self):
+        """Test an image is shown as ready once it is processed."""
+        with self.captureOnCommitCallbacks(execute=True):
+            image = PostImage.objects.create(
+                post=self.post_5, image=create_image_upload("post.png", 400, 300)
+            )
+        post = self.get_explore()[self.post_5.id]
+        self.assertEqual(post["images"][0]["status"], ImageStatus.PROCESSING)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_image(PostImage._meta.label, image.pk)
+
+        post = self.get_explore()[self.post_5.id]
+        self.assertEqual(post["images"][0]["status"], ImageStatus.READY)
+
+    def test_cards_are_cached_per_image_size(self):
+        """Test each requested image size gets the variant it asked for."""
+        image = PostImage.objects.create(
+            post=self.post_5, image=create_image_upload("post.png", 800, 600)
+        )
+        process_image(PostImage._meta.label, image.pk)
+        image.refresh_from_db()
+        url = retrieve_destroy_post_url(self.post_5.id)
+
+        for size in ("160", "640", "160"):
+            res = self.client.get(url, {"image_size": size})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertTrue(
+                res.data["images"][0]["image"].endswith(image.variants[size])
+            )
+
+    def test_endpoint_left_out_does_not_use_cache(self):
+        """Test the cache is turned off for endpoints left out of the setting."""
+        endpoints = [endpoint for endpoint in ENDPOINTS if endpoint != "explore"]
+        with override_settings(POST_CARD_CACHE_ENDPOINTS=endpoints):
+            self.get_explore()
+            self.get_explore()
+
+        self.assertEqual(get_stats()["explore"], {"hits": 0, "misses": 0})
+
+    def test_stats_command_prints_and_resets_counts(self):
+        """Test the stats command prints the hit rate of each endpoint."""
+        self.get_explore()
+        self.get_explore()
+
+        out = StringIO()
+        call_command("post_card_cache_stats", "--reset", stdout=out)
+
+        self.assertIn("explore (on): 4 hits, 4 misses, hit rate 50.0%", out.getvalue())
+        self.assertEqual(get_stats()["explore"], {"hits": 0, "misses": 0})
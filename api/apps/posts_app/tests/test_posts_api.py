@@ -2,14 +2,38 @@
 Tests for the Posts api.
 """
 
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from PIL import ExifTags, Image
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import override_settings
+from django.utils import timezone
 from rest_framework import status
-from apps.core_app.models import Post
+from apps.core_app.deletions import PendingDeletions
+from apps.core_app.images import claim_images
+from apps.core_app.models import (
+    ImageStatus,
+    Post,
+    PostImage,
+    PostImageStaged,
+    ProfileImage,
+    StorageDeletion,
+)
 
 from .util import (
     CREATE_POST_URL,
+    CREATE_POST_IMAGE_STAGED_URL,
     PostsAppTestHelper,
     retrieve_destroy_post_url,
     create_post,
+    create_image_upload,
 )
 
 
@@ -111,3 +135,380 @@ class PrivatePostsApiTests(PostsAppTestHelper):
         current_post_count = self.get_posts_count()
         self.assertEqual(current_post_count, starting_post_count)
         self.assertEqual(len(Post.objects.filter(id=new_post.id)), 0)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PostImageProcessingTests(PostsAppTestHelper):
+    """Test uploaded post images are processed in the background."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def create_post_with_image(self, upload):
+        new_post = {
+            "caption": "Test caption",
+            "profileId": self.profile.id,
+            "images": upload if isinstance(upload, list) else [upload],
+        }
+        res = self.client.post(CREATE_POST_URL, data=new_post, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res
+
+    def test_create_post_stores_upload_for_processing(self):
+        """
+        Test creating a Post with an image returns it in the processing state and
+        the process_images command swaps in the cropped and resized image.
+        """
+        res = self.create_post_with_image(create_image_upload("photo.png", 1600, 1200))
+        self.assertEqual(res.data["images"][0]["status"], ImageStatus.PROCESSING)
+
+        image = PostImage.objects.get(id=res.data["images"][0]["id"])
+        upload_name = image.image.name
+        self.assertTrue(upload_name.endswith(".png"))
+
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+
+        image.refresh_from_db()
+        self.assertEqual(image.status, ImageStatus.READY)
+        self.assertTrue(image.image.name.endswith(".webp"))
+        self.assertFalse(image.image.storage.exists(upload_name))
+        with Image.open(image.image.path) as processed:
+            self.assertEqual(processed.size, (1080, 1080))
+
+        self.assertEqual(
+            sorted(image.variants, key=int), ["160", "320", "640", "1080"]
+        )
+        self.assertEqual(image.variants["1080"], image.image.name)
+        for size, name in image.variants.items():
+            with Image.open(image.image.storage.path(name)) as variant:
+                self.assertEqual(variant.size, (int(size), int(size)))
+
+    def test_create_post_saves_images_concurrently(self):
+        """
+        Test the images of a multi image Post are all saved, in order, and their
+        save times are returned in the Server-Timing header.
+        """
+        uploads = [
+            create_image_upload("photo.png", 400 + index, 300) for index in range(5)
+        ]
+        res = self.create_post_with_image(uploads)
+
+        timings = [timing.split(";")[0] for timing in res["Server-Timing"].split(", ")]
+        self.assertEqual(
+            timings, ["image-0", "image-1", "image-2", "image-3", "image-4", "images"]
+        )
+        images = PostImage.objects.filter(post=res.data["id"]).order_by("id")
+        self.assertEqual(len(images), 5)
+        upload_names = [image.image.name for image in images]
+        for index, image in enumerate(images):
+            self.assertEqual(image.status, ImageStatus.PROCESSING)
+            with Image.open(image.image.path) as upload:
+                self.assertEqual(upload.size, (400 + index, 300))
+
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+
+        for image, upload_name in zip(images, upload_names):
+            image.refresh_from_db()
+            self.assertEqual(image.status, ImageStatus.READY)
+            self.assertFalse(image.image.storage.exists(upload_name))
+
+    def test_rotated_jpeg_is_processed_upright(self):
+        """
+        Test a JPEG decoded at reduced size is cropped and turned upright by its
+        EXIF orientation.
+        """
+        # stored sideways: red on the left, blue on the right. Orientation 6
+        # displays it rotated clockwise, red on top.
+        img = Image.new("RGB", (2400, 1200), color=(255, 0, 0))
+        img.paste((0, 0, 255), (1200, 0, 2400, 1200))
+        exif = Image.Exif()
+        exif[ExifTags.Base.Orientation] = 6
+        output = BytesIO()
+        img.save(output, "jpeg", exif=exif)
+        upload = SimpleUploadedFile("photo.jpg", output.getvalue())
+        res = self.create_post_with_image(upload)
+
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+
+        image = PostImage.objects.get(id=res.data["images"][0]["id"])
+        self.assertEqual(image.status, ImageStatus.READY)
+        with Image.open(image.image.path) as processed:
+            self.assertEqual(processed.size, (1080, 1080))
+            top = processed.convert("RGB").getpixel((540, 100))
+            bottom = processed.convert("RGB").getpixel((540, 980))
+        self.assertGreater(top[0], 200)
+        self.assertLess(top[2], 50)
+        self.assertGreater(bottom[2], 200)
+        self.assertLess(bottom[0], 50)
+
+    def test_image_size_param_selects_variant(self):
+        """
+        Test post images list their variants in srcset and the image_size param
+        returns the smallest variant at least that wide.
+        """
+        res = self.create_post_with_image(create_image_upload("photo.png", 1600, 1200))
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+        image = PostImage.objects.get(id=res.data["images"][0]["id"])
+
+        res = self.client.get(retrieve_destroy_post_url(image.post_id))
+        srcset = res.data["images"][0]["srcset"]
+        self.assertEqual(list(srcset), ["160", "320", "640", "1080"])
+        self.assertTrue(srcset["320"].endswith(image.variants["320"]))
+        self.assertTrue(res.data["images"][0]["image"].endswith(image.image.name))
+
+        url = f"{retrieve_destroy_post_url(image.post_id)}?image_size=300"
+        res = self.client.get(url)
+        self.assertEqual(res.data["images"][0]["image"], srcset["320"])
+
+    def test_create_image_variants_backfills_missing_variants(self):
+        """Test the create_image_variants command adds variants to old images."""
+        res = self.create_post_with_image(create_image_upload("photo.png", 1600, 1200))
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+        image = PostImage.objects.get(id=res.data["images"][0]["id"])
+        # images processed before variants existed only have the full size image
+        for size in ["160", "320", "640"]:
+            image.image.storage.delete(image.variants[size])
+        PostImage.objects.filter(id=image.id).update(variants={})
+
+        call_command("create_image_variants", workers=0, stdout=StringIO())
+
+        image.refresh_from_db()
+        self.assertEqual(
+            sorted(image.variants, key=int), ["160", "320", "640", "1080"]
+        )
+        self.assertEqual(image.variants["1080"], image.image.name)
+        for name in image.variants.values():
+            self.assertTrue(image.image.storage.exists(name))
+
+    def test_invalid_upload_is_marked_failed(self):
+        """Test an upload that is not an image is marked as failed."""
+        upload = SimpleUploadedFile("photo.png", b"not an image")
+        res = self.create_post_with_image(upload)
+
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+
+        image = PostImage.objects.get(id=res.data["images"][0]["id"])
+        self.assertEqual(image.status, ImageStatus.FAILED)
+
+    def test_images_of_crashed_workers_are_retried_then_failed(self):
+        """Test images claimed by a worker that never finished are retried."""
+        res = self.create_post_with_image(create_image_upload("photo.png", 100, 100))
+        image = PostImage.objects.get(id=res.data["images"][0]["id"])
+
+        self.assertEqual(claim_images(PostImage, 10), [image.id])
+        # claimed images are not handed out again until their claim times out
+        self.assertEqual(claim_images(PostImage, 10), [])
+
+        stale = timezone.now() - timedelta(seconds=settings.IMAGE_PROCESSING_TIMEOUT)
+        PostImage.objects.filter(id=image.id).update(processing_started_at=stale)
+        self.assertEqual(claim_images(PostImage, 10), [image.id])
+
+        PostImage.objects.filter(id=image.id).update(
+            processing_started_at=stale,
+            processing_attempts=settings.IMAGE_PROCESSING_MAX_ATTEMPTS,
+        )
+        self.assertEqual(claim_images(PostImage, 10), [])
+        image.refresh_from_db()
+        self.assertEqual(image.status, ImageStatus.FAILED)
+
+    def stage_image(self, post_uuid):
+        upload = create_image_upload("photo.png", 1600, 1200)
+        data = {"postUuid": post_uuid, "image": upload}
+        res = self.client.post(
+            CREATE_POST_IMAGE_STAGED_URL, data=data, format="multipart"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res
+
+    def test_create_post_publishes_staged_images(self):
+        """
+        Test images staged before the Post is created are processed right away
+        and moved to the Post created with the same postUuid.
+        """
+        for _ in range(2):
+            res = self.stage_image("post-uuid-1")
+            self.assertEqual(res.data["status"], ImageStatus.PROCESSING)
+        # an image staged for another post is not published
+        self.stage_image("post-uuid-2")
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+
+        staged = PostImageStaged.objects.filter(post_uuid="post-uuid-1").first()
+        self.assertEqual(staged.status, ImageStatus.READY)
+        self.assertEqual(
+            sorted(staged.variants, key=int), ["160", "320", "640", "1080"]
+        )
+
+        new_post = {
+            "caption": "Test caption",
+            "profileId": self.profile.id,
+            "postUuid": "post-uuid-1",
+        }
+        res = self.client.post(CREATE_POST_URL, data=new_post, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        images = res.data["images"]
+        self.assertEqual(len(images), 2)
+        self.assertEqual(images[0]["status"], ImageStatus.READY)
+        self.assertEqual(list(images[0]["srcset"]), ["160", "320", "640", "1080"])
+        image = PostImage.objects.get(id=images[0]["id"])
+        self.assertEqual(image.image.name, staged.image.name)
+        self.assertTrue(image.image.storage.exists(image.image.name))
+
+        remaining = PostImageStaged.objects.values_list("post_uuid", flat=True)
+        self.assertEqual(list(remaining), ["post-uuid-2"])
+
+    def test_staged_images_of_other_profiles_are_not_published(self):
+        """Test a Post only takes the staged images of its own profile."""
+        self.stage_image("post-uuid-1")
+        staged = PostImageStaged.objects.get()
+        PostImageStaged.objects.filter(id=staged.id).update(profile=self.profile_2)
+
+        new_post = {
+            "caption": "Test caption",
+            "profileId": self.profile.id,
+            "postUuid": "post-uuid-1",
+        }
+        res = self.client.post(CREATE_POST_URL, data=new_post, format="multipart")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["images"], [])
+        self.assertTrue(PostImageStaged.objects.filter(id=staged.id).exists())
+
+    def test_sweep_deletes_abandoned_staged_images(self):
+        """Test staged images that were never posted are deleted with their files."""
+        self.stage_image("post-uuid-1")
+        self.stage_image("post-uuid-2")
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+        old, recent = PostImageStaged.objects.order_by("id")
+        PostImageStaged.objects.filter(id=old.id).update(
+            uploaded_at=timezone.now() - timedelta(days=2)
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sweep_staged_images", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(list(PostImageStaged.objects.all()), [recent])
+        storage = old.image.storage
+        for name in old.variants.values():
+            self.assertFalse(storage.exists(name))
+        for name in recent.variants.values():
+            self.assertTrue(storage.exists(name))
+
+    def create_processed_post_image(self):
+        res = self.create_post_with_image(create_image_upload("photo.png", 400, 300))
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+        return PostImage.objects.get(id=res.data["images"][0]["id"])
+
+    def test_deleting_post_deletes_image_files_on_commit(self):
+        """Test the files of a deleted Post's images are deleted after commit."""
+        image = self.create_processed_post_image()
+        storage = image.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(retrieve_destroy_post_url(image.post_id))
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            # nothing is deleted until the transaction commits
+            for name in image.variants.values():
+                self.assertTrue(storage.exists(name))
+
+        for name in image.variants.values():
+            self.assertFalse(storage.exists(name))
+
+    def test_files_deleted_in_a_transaction_are_deleted_together(self):
+        """Test the files deleted in one transaction are queued in one batch."""
+        image = self.create_processed_post_image()
+        other_image = self.create_processed_post_image()
+        storage = image.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            image.post.delete()
+            other_image.post.delete()
+
+        batches = [c for c in callbacks if isinstance(c, PendingDeletions)]
+        self.assertEqual(len(batches), 1)
+        for name in [*image.variants.values(), *other_image.variants.values()]:
+            self.assertFalse(storage.exists(name))
+
+    def test_files_queued_after_a_batch_ran_are_deleted(self):
+        """Test files queued after the batch of the transaction ran get a new one."""
+        image = self.create_processed_post_image()
+        other_image = self.create_processed_post_image()
+        storage = image.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.post.delete()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            other_image.post.delete()
+
+        self.assertTrue(any(isinstance(c, PendingDeletions) for c in callbacks))
+        for name in [*image.variants.values(), *other_image.variants.values()]:
+            self.assertFalse(storage.exists(name))
+
+    def test_deleting_user_deletes_profile_image_files(self):
+        """Test the files of a Profile image are deleted with its user."""
+        ProfileImage.objects.create(
+            profile=self.profile, image=create_image_upload("me.png", 400, 300)
+        )
+        call_command("process_images", workers=0, once=True, stdout=StringIO())
+        image = ProfileImage.objects.get(profile=self.profile)
+        self.assertEqual(sorted(image.variants, key=int), ["160", "320"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        for name in image.variants.values():
+            self.assertFalse(image.image.storage.exists(name))
+
+    def test_rolled_back_delete_keeps_image_files(self):
+        """Test the files of an image whose deletion is rolled back are kept."""
+        image = self.create_processed_post_image()
+        other_image = self.create_processed_post_image()
+        storage = image.image.storage
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    image.post.delete()
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            other_image.post.delete()
+
+        for name in image.variants.values():
+            self.assertTrue(storage.exists(name))
+        for name in other_image.variants.values():
+            self.assertFalse(storage.exists(name))
+
+    @override_settings(STORAGE_DELETE_ATTEMPTS=1)
+    def test_failed_file_deletions_are_recorded_and_retried(self):
+        """
+        Test files that can't be deleted are recorded and deleted by the
+        retry_storage_deletions command.
+        """
+        image = self.create_processed_post_image()
+        storage = image.image.storage
+        # a directory that isn't empty can't be deleted
+        blocked_name = os.path.join(os.path.dirname(image.image.name), "blocked")
+        storage.save(os.path.join(blocked_name, "file.txt"), StringIO("data"))
+        PostImage.objects.filter(id=image.id).update(
+            variants={**image.variants, "2000": blocked_name}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.post.delete()
+
+        deletion = StorageDeletion.objects.get()
+        self.assertEqual(deletion.name, blocked_name)
+        self.assertTrue(deletion.last_error)
+        self.assertFalse(storage.exists(image.image.name))
+
+        storage.delete(os.path.join(blocked_name, "file.txt"))
+        call_command("retry_storage_deletions", stdout=StringIO())
+
+        self.assertFalse(StorageDeletion.objects.exists())
+        self.assertFalse(storage.exists(blocked_name))
@@ -0,0 +1,88 @@
+"""
+Tests for the cached ownership of profiles.
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from apps.core_app.profiles import get_owned_profile
+from .util import PostsAppTestHelper, create_profile
+
+SAVED_POSTS_URL = reverse("posts_app:list_create_saved_post")
+
+
+class ProfileOwnershipTests(PostsAppTestHelper):
+    """Test the auth-profile-id header is checked against cached profile ids."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        cache.clear()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_owned_profile_is_cached(self):
+        """Test the owned profile is found without a query once cached."""
+        get_owned_profile(self.user, self.profile.id)
+
+        with self.assertNumQueries(0):
+            profile = get_owned_profile(self.user, self.profile.id)
+            self.assertEqual(profile.id, self.profile.id)
+            self.assertEqual(profile.user, self.user)
+        # the other fields are loaded when used
+        with self.assertNumQueries(1):
+            self.assertEqual(profile.username, self.profile.username)
+
+        self.assertIsNone(get_owned_profile(self.user, self.profile_2.id))
+        self.assertIsNone(get_owned_profile(self.user, "not an id"))
+
+    def test_requests_do_not_query_the_profile(self):
+        """Test requests don't load the profile to check the header."""
+        self.client.get(SAVED_POSTS_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(SAVED_POSTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        profile_queries = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('SELECT "core_app_profile"')
+        ]
+        self.assertEqual(profile_queries, [])
+
+    def test_new_profile_can_be_used_right_away(self):
+        """Test creating a profile clears the cached profile ids of its user."""
+        self.client.get(SAVED_POSTS_URL)
+        new_profile = create_profile("username_new", "About text.", self.user)
+
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=new_profile.id)
+        res = self.client.get(SAVED_POSTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_deleted_profile_is_rejected(self):
+        """Test a deleted profile can't be used once it is deleted."""
+        self.client.get(SAVED_POSTS_URL)
+        self.profile.delete()
+
+        res = self.client.get(SAVED_POSTS_URL)
+
+        self.assertIn(
+            res.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN]
+        )
+
+    def test_profile_of_another_user_is_rejected(self):
+        """Test the header can't be set to a profile of another user."""
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile_2.id)
+        res = self.client.get(SAVED_POSTS_URL)
+
+        self.assertIn(
+            res.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN]
+        )
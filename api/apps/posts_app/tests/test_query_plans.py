@@ -0,0 +1,159 @@
+"""
+Tests that the list endpoints' queries are served from indexes.
+"""
+
+import re
+from unittest import skipUnless
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from apps.core_app.models import Profile, SavedPost
+from .util import (
+    PostsAppTestHelper,
+    create_comment,
+    create_follow,
+    create_like,
+    create_post,
+    get_explore_posts_url,
+    get_feed_url,
+    list_followers_url,
+    list_following_url,
+    list_post_comments_url,
+    search_profiles_url,
+)
+
+# a SQLite plan step reading a whole table without an index
+SQLITE_FULL_SCAN = re.compile(r"^SCAN \S+$")
+
+
+class QueryPlanTests(PostsAppTestHelper):
+    """Test the list endpoints do not read whole tables once data is seeded."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+        # seed enough rows that reading a whole table is never the cheapest plan
+        profiles = [self.profile_2, self.profile_3, self.profile_4]
+        for index in range(30):
+            post = create_post(f"Seeded post {index}", profiles[index % 3])
+            create_like(self.profile, post)
+            SavedPost.objects.create(profile=self.profile, post=post)
+            comment = create_comment(self.profile_2, "Seeded comment", post)
+            create_comment(self.profile_3, "Seeded reply", post, comment, comment)
+        create_follow(self.profile_3, self.profile)
+        create_follow(self.profile_4, self.profile)
+        self.reply = create_comment(
+            self.profile_2, "Reply", self.post_1, self.comment_1, self.comment_1
+        )
+
+    def get_query_plans(self, url):
+        """Request the url and return the query plan of each query it ran."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        plans = []
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # make any index usable for the query beat a sequential scan
+                cursor.execute("SET enable_seqscan = off")
+            for query in queries.captured_queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT"):
+                    continue
+                if connection.vendor == "postgresql":
+                    cursor.execute(f"EXPLAIN {sql}")
+                    plan = [row[0] for row in cursor.fetchall()]
+                else:
+                    cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                    plan = [row[-1] for row in cursor.fetchall()]
+                plans.append((sql, plan))
+            if connection.vendor == "postgresql":
+                cursor.execute("RESET enable_seqscan")
+        return plans
+
+    def assertUsesIndexes(self, url):
+        """Assert no query run by the url reads a whole table."""
+        for sql, plan in self.get_query_plans(url):
+            if connection.vendor == "postgresql":
+                full_scans = [step for step in plan if "Seq Scan" in step]
+            else:
+                # reading the rows of a subquery (a co-routine) reads no table
+                subqueries = {
+                    step.removeprefix("CO-ROUTINE ")
+                    for step in plan
+                    if step.startswith("CO-ROUTINE ")
+                }
+                full_scans = [
+                    step
+                    for step in plan
+                    if SQLITE_FULL_SCAN.match(step)
+                    and step.removeprefix("SCAN ") not in subqueries
+                ]
+            self.assertEqual(full_scans, [], f"{sql}\n" + "\n".join(plan))
+
+    def test_feed_uses_indexes(self):
+        """Test the feed queries are served from indexes."""
+        self.assertUsesIndexes(get_feed_url(self.profile.id))
+
+    def test_feed_with_pulled_posts_uses_indexes(self):
+        """
+        Test the feed queries are served from indexes when the feed also reads
+        the posts of a profile that fans out on read.
+        """
+        Profile.objects.filter(id=self.profile_2.id).update(fan_out_on_read=True)
+        self.assertUsesIndexes(get_feed_url(self.profile.id))
+
+    def test_explore_uses_indexes(self):
+        """Test the explore queries are served from indexes."""
+        self.assertUsesIndexes(get_explore_posts_url(self.profile.id))
+
+    def test_profile_posts_uses_indexes(self):
+        """Test the profile posts queries are served from indexes."""
+        self.assertUsesIndexes(
+            reverse("posts_app:list_profile_posts", args=[self.profile_2.id])
+        )
+
+    def test_saved_posts_uses_indexes(self):
+        """Test the saved posts queries are served from indexes."""
+        self.assertUsesIndexes(reverse("posts_app:list_create_saved_post"))
+
+    def test_similar_posts_uses_indexes(self):
+        """Test the similar posts queries are served from indexes."""
+        url = reverse("posts_app:lists_similar_posts", args=[self.post_1.id])
+        self.assertUsesIndexes(f"{url}?profileId={self.profile.id}")
+
+    def test_post_comments_uses_indexes(self):
+        """Test the post comments queries are served from indexes."""
+        self.assertUsesIndexes(list_post_comments_url(self.post_1.id))
+
+    def test_comment_replies_uses_indexes(self):
+        """Test the comment replies queries are served from indexes."""
+        self.assertUsesIndexes(
+            reverse(
+                "posts_app:list_comment_replies",
+                args=[self.post_1.id, self.comment_1.id],
+            )
+        )
+
+    def test_followers_and_following_use_indexes(self):
+        """Test the follow list queries are served from indexes."""
+        self.assertUsesIndexes(list_followers_url(self.profile.id))
+        self.assertUsesIndexes(list_following_url(self.profile.id))
+
+    def test_own_reports_uses_indexes(self):
+        """Test the own reports queries are served from indexes."""
+        self.assertUsesIndexes(reverse("posts_app:report-my-reports"))
+
+    @skipUnless(
+        connection.vendor == "postgresql", "trigram indexes only exist on Postgres"
+    )
+    def test_profile_search_uses_trigram_index(self):
+        """Test the profile search is served from the trigram index."""
+        self.assertUsesIndexes(search_profiles_url(self.profile.id, "user"))
@@ -103,6 +103,27 @@ class PrivatePostReportTests(PostsAppTestHelper):
         self.assertEqual(report.resolution_note, "Content removed")
         self.assertEqual(report.resolved_by, self.profile)
 
+    def test_report_updates_post_moderation_flags(self):
+        """Test creating and dismissing reports updates the post moderation flags"""
+        self.post_4.refresh_from_db()
+        self.assertTrue(self.post_4.is_inappropriate)
+        self.assertTrue(self.post_4.has_open_reports)
+
+        report = PostReport.objects.create(
+            post=self.post_5, reporter=self.profile_4, reason=self.reason2
+        )
+        self.post_5.refresh_from_db()
+        self.assertTrue(self.post_5.has_open_reports)
+        self.assertFalse(self.post_5.is_inappropriate)
+
+        url = reverse("posts_app:report-resolve", kwargs={"pk": report.id})
+        response = self.client.patch(url, {"status": "DISMISSED"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.post_5.refresh_from_db()
+        self.assertFalse(self.post_5.has_open_reports)
+        self.assertFalse(self.post_5.is_inappropriate)
+
     def test_list_reported_posts(self):
         """Test listing reports on user's posts"""
         url = reverse("posts_app:report-reported-posts")
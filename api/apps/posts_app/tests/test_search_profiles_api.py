@@ -3,10 +3,17 @@ Tests for the search profiles api.
 """
 
 from rest_framework import status
+from django.db import connection
 from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
 
 from apps.core_app.models import Profile
-from .util import PostsAppTestHelper, create_user, create_profile, search_profiles_url
+from .util import (
+    PostsAppTestHelper,
+    create_user,
+    create_profile,
+    search_profiles_url,
+)
 
 
 class PrivateSearchProfilesApiTests(PostsAppTestHelper):
@@ -37,6 +44,45 @@ class PrivateSearchProfilesApiTests(PostsAppTestHelper):
         )
         self.assertEqual(len(res.data["results"]), match_count)
 
+    def test_search_profiles_lists_prefix_matches_first(self):
+        """Test usernames starting with the search text are listed first."""
+        create_profile("the_buddy", "Test about text.", self.user_5)
+        create_profile("buddy", "Test about text.", self.user_5)
+        named = create_profile("max", "Test about text.", self.user_5)
+        named.name = "Buddy"
+        named.save()
+
+        res = self.client.get(search_profiles_url(self.profile.id, "bud"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        usernames = [profile["username"] for profile in res.data["results"]]
+        self.assertEqual(usernames[0], "buddy")
+        self.assertCountEqual(usernames, ["buddy", "the_buddy", "max"])
+
+    def test_search_profiles_is_following_in_one_query(self):
+        """
+        Test is_following is resolved for the whole page without a query
+        per profile.
+        """
+        # self.profile follows profile_2 from the helper's setUp
+        url = search_profiles_url(self.profile.id, "user")
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        for index in range(5):
+            create_profile(f"username_extra_{index}", "About.", self.user_5)
+        with self.assertNumQueries(len(queries)):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        following = {
+            profile["username"]: profile["is_following"]
+            for profile in res.data["results"]
+        }
+        self.assertTrue(following["username_2"])
+        self.assertFalse(following["username_3"])
+
     def test_search_profiles_without_username_returns_error(self):
         """
         Test searching for profiles by username but not
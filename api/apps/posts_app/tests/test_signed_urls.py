@@ -0,0 +1,75 @@
+"""
+Tests for the cached signed S3 image URLs.
+"""
+
+import time
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from apps.core_app.storage import CachedS3Storage, signed_url_lifetime
+
+# presigned URLs are signed locally, no request is made to S3
+STORAGE_OPTIONS = {
+    "bucket_name": "only-paws-test",
+    "access_key": "test-access-key",
+    "secret_key": "test-secret-key",
+    "region_name": "us-east-1",
+    "querystring_expire": 600,
+}
+
+
+def url_expires(url):
+    """Seconds until a signed URL expires."""
+    return int(parse_qs(urlparse(url).query)["Expires"][0]) - int(time.time())
+
+
+class SignedUrlCacheTests(TestCase):
+    """Test signed image URLs are reused until shortly before they expire."""
+
+    def setUp(self):
+        cache.clear()
+        self.storage = CachedS3Storage(**STORAGE_OPTIONS)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_signed_url_is_reused(self):
+        """Test the same URL is returned for a key until it is close to expiring."""
+        url = self.storage.url("images/1/1/1/photo_1080.webp")
+
+        self.assertAlmostEqual(url_expires(url), 600, delta=1)
+        self.assertEqual(self.storage.url("images/1/1/1/photo_1080.webp"), url)
+        self.assertNotEqual(self.storage.url("images/1/1/1/photo_640.webp"), url)
+
+    def test_urls_with_custom_expiry_are_not_cached(self):
+        """Test only the default image URLs are cached."""
+        url = self.storage.url("images/1/1/1/photo_1080.webp", expire=60)
+
+        self.assertAlmostEqual(url_expires(url), 60, delta=1)
+        url = self.storage.url("images/1/1/1/photo_1080.webp")
+        self.assertAlmostEqual(url_expires(url), 600, delta=1)
+
+    @override_settings(SIGNED_URL_BUCKET_SECONDS=300)
+    def test_bucketed_urls_are_the_same_across_processes(self):
+        """
+        Test bucketed URLs expire at the end of their bucket plus the expiry, so
+        a URL signed again in the same bucket, as another process would, is the
+        same.
+        """
+        url = self.storage.url("images/1/1/1/photo_1080.webp")
+        expires = int(parse_qs(urlparse(url).query)["Expires"][0])
+        self.assertEqual((expires - 600) % 300, 0)
+        self.assertGreaterEqual(url_expires(url), 600)
+
+        cache.clear()
+        other_storage = CachedS3Storage(**STORAGE_OPTIONS)
+        if int(time.time()) < expires - 600:
+            self.assertEqual(other_storage.url("images/1/1/1/photo_1080.webp"), url)
+
+    def test_signed_url_lifetime(self):
+        """Test URLs are cached until the margin, or the end of their bucket."""
+        self.assertEqual(signed_url_lifetime(1000, 600, 0, 60), (600, 540))
+        self.assertEqual(signed_url_lifetime(1000, 600, 300, 60), (800, 200))
+        self.assertEqual(signed_url_lifetime(1199, 600, 300, 60), (601, 1))
@@ -0,0 +1,141 @@
+"""
+Tests for the two tier cache of reference data.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from apps.core_app.caching import (
+    LocalCache,
+    TieredCache,
+    lock_key,
+    tiered_cache,
+    value_key,
+)
+from apps.core_app.models import ReportReason
+from .util import PostsAppTestHelper
+
+
+@override_settings(TIERED_CACHE_ENABLED=True)
+class TieredCacheTests(PostsAppTestHelper):
+    """Test values are cached in the process and in the shared cache."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        cache.clear()
+        tiered_cache.reset()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+    def tearDown(self):
+        cache.clear()
+        tiered_cache.reset()
+
+    def counting(self, value, seconds=0):
+        """Return a function computing value and the list of its calls."""
+        calls = []
+
+        def compute():
+            calls.append(value)
+            time.sleep(seconds)
+            return value
+
+        return compute, calls
+
+    def test_local_cache_evicts_least_recently_used(self):
+        """Test the entry read least recently is evicted first, and expired ones."""
+        local = LocalCache(max_entries=2)
+        local.set("a", 1, timeout=60)
+        local.set("b", 2, timeout=60)
+        local.get("a")
+        local.set("c", 3, timeout=60)
+
+        self.assertEqual(local.get("a"), 1)
+        self.assertIsNone(local.get("b"))
+
+        local.set("a", 1, timeout=0)
+        self.assertIsNone(local.get("a"))
+        self.assertEqual(len(local), 1)
+
+    def test_value_is_read_from_process(self):
+        """Test a cached value is read without the shared cache or recomputing."""
+        compute, calls = self.counting(["dog"])
+        tiered_cache.get_or_set("tests", "key", compute)
+        cache.clear()
+
+        self.assertEqual(tiered_cache.get_or_set("tests", "key", compute), ["dog"])
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_value_is_served_while_recomputed_elsewhere(self):
+        """Test a stale value is served until the lock holder recomputes it."""
+        tiered_cache.get_or_set("tests", "key", lambda: "old", timeout=0)
+        full_key = value_key("tests", tiered_cache.get_version("tests"), "key")
+
+        cache.add(lock_key(full_key), 1)
+        self.assertEqual(tiered_cache.get_or_set("tests", "key", lambda: "new"), "old")
+
+        cache.delete(lock_key(full_key))
+        self.assertEqual(tiered_cache.get_or_set("tests", "key", lambda: "new"), "new")
+        self.assertEqual(
+            tiered_cache.get_or_set("tests", "key", lambda: "newer"), "new"
+        )
+
+    def test_concurrent_misses_compute_once(self):
+        """Test requests missing the same key wait for a single computation."""
+        compute, calls = self.counting("dog", seconds=0.2)
+        results = []
+
+        def read():
+            results.append(tiered_cache.get_or_set("tests", "key", compute))
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["dog"] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_invalidation_reaches_other_processes(self):
+        """
+        Test an invalidated namespace is recomputed at once in the process that
+        invalidated it, and in other processes once they are told.
+        """
+        other_process = TieredCache()
+        for process in (tiered_cache, other_process):
+            process.get_or_set("tests", "key", lambda: "old")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tiered_cache.invalidate("tests")
+
+        self.assertEqual(tiered_cache.get_or_set("tests", "key", lambda: "new"), "new")
+        self.assertEqual(other_process.get_or_set("tests", "key", lambda: "x"), "old")
+
+        other_process.handle_message(b"tests")
+        self.assertEqual(other_process.get_or_set("tests", "key", lambda: "x"), "new")
+
+    def test_report_reasons_are_cached_until_changed(self):
+        """Test report reasons are listed without a query until one is added."""
+        url = reverse("posts_app:report-reason-list")
+        self.assertEqual(len(self.client.get(url).data), 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 4)
+        for query in queries:
+            self.assertNotIn("core_app_reportreason", query["sql"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ReportReason.objects.create(name="Spam", description="Spam.")
+
+        self.assertEqual(len(self.client.get(url).data), 5)
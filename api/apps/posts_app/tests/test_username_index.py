@@ -0,0 +1,158 @@
+"""
+Tests for the in-process username index used by profile search.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from apps.core_app.models import Profile, ProfileChange
+from apps.core_app.search_index import SortedKeys, username_index
+from .util import PostsAppTestHelper, create_profile, search_profiles_url
+
+
+@override_settings(
+    USERNAME_INDEX_ENABLED=True,
+    USERNAME_INDEX_BACKGROUND_LOAD=False,
+)
+class UsernameIndexTests(PostsAppTestHelper):
+    """Test profile search is answered from the username index."""
+
+    def setUp(self):
+        super(self.__class__, self).setUp()
+        username_index.reset()
+        # extend setUp by authenticating self.profile
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTH_PROFILE_ID=self.profile.id)
+
+    def tearDown(self):
+        username_index.reset()
+
+    def search(self, text):
+        res = self.client.get(search_profiles_url(self.profile.id, text))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [profile["username"] for profile in res.data["results"]]
+
+    def test_sorted_keys_prefix_match(self):
+        """Test only keys starting with the prefix are returned, in order."""
+        keys = SortedKeys(
+            [(b"bella", 1), (b"buddy", 2), (b"bud", 3), ("bébé".encode(), 4)]
+        )
+
+        self.assertEqual(list(keys.with_prefix(b"bud")), [(b"bud", 3), (b"buddy", 2)])
+        self.assertEqual(
+            list(keys.with_prefix("bé".encode())), [("bébé".encode(), 4)]
+        )
+        self.assertEqual(list(keys.with_prefix(b"c")), [])
+
+    def test_search_lists_username_prefixes_then_words(self):
+        """
+        Test usernames starting with the text come first, then usernames and
+        names with a word starting with it.
+        """
+        create_profile("the_buddy", "About.", self.user_2)
+        create_profile("buddy", "About.", self.user_2)
+        named = create_profile("max", "About.", self.user_2)
+        named.name = "Budgie Max"
+        named.save()
+        create_profile("nobuddy", "About.", self.user_2)
+
+        self.assertEqual(self.search("Bud"), ["buddy", "the_buddy", "max"])
+
+    def test_search_loads_only_the_page(self):
+        """Test the search runs no LIKE query and excludes the searching profile."""
+        self.search("user")
+
+        with CaptureQueriesContext(connection) as queries:
+            usernames = self.search("user")
+
+        self.assertEqual(usernames, ["username_2", "username_3", "username_4"])
+        like_queries = [
+            query["sql"] for query in queries if "LIKE" in query["sql"].upper()
+        ]
+        self.assertEqual(like_queries, [])
+
+    def test_search_follows_profile_changes(self):
+        """Test created, renamed and deleted profiles are picked up."""
+        self.assertEqual(self.search("rex"), [])
+
+        profile = create_profile("rex", "About.", self.user_2)
+        username_index.poll()
+        self.assertEqual(self.search("rex"), ["rex"])
+
+        profile.username = "rexford"
+        profile.save()
+        username_index.poll()
+        self.assertEqual(self.search("rexf"), ["rexford"])
+
+        self.profile_3.username = "another_name"
+        self.profile_3.save()
+        username_index.poll()
+        self.assertEqual(self.search("username"), ["username_2", "username_4"])
+
+        profile.delete()
+        username_index.poll()
+        self.assertEqual(self.search("rex"), [])
+
+    def test_search_does_not_poll_profile_changes(self):
+        """Test searches leave polling the profile changes to the refresher."""
+        self.search("user")
+        create_profile("rex", "About.", self.user_2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.search("rex"), [])
+
+        change_queries = [
+            query["sql"] for query in queries if "profilechange" in query["sql"]
+        ]
+        self.assertEqual(change_queries, [])
+
+    def test_database_search_matches_the_index(self):
+        """
+        Test searching the database finds the profiles the index finds, by the
+        start of a word and not by text in the middle of one.
+        """
+        create_profile("the_buddy", "About.", self.user_2)
+        create_profile("buddy", "About.", self.user_2)
+        named = create_profile("max", "About.", self.user_2)
+        named.name = "Budgie Max"
+        named.save()
+        create_profile("nobuddy", "About.", self.user_2)
+        indexed = self.search("Bud")
+
+        with override_settings(USERNAME_INDEX_ENABLED=False):
+            searched = self.search("Bud")
+
+        self.assertEqual(indexed, ["buddy", "the_buddy", "max"])
+        self.assertCountEqual(searched, indexed)
+        self.assertEqual(searched[0], "buddy")
+
+    @override_settings(USERNAME_INDEX_MAX_OVERLAY=2)
+    def test_index_is_rebuilt_when_overlay_is_full(self):
+        """Test the index is rebuilt once enough profiles have changed."""
+        self.search("user")
+        create_profile("rex", "About.", self.user_2)
+        create_profile("rexford", "About.", self.user_2)
+        username_index.poll()
+
+        self.assertEqual(self.search("rex"), ["rex", "rexford"])
+        self.assertEqual(username_index.state[2], {})
+        self.assertEqual(self.search("rex"), ["rex", "rexford"])
+
+    def test_prune_profile_changes(self):
+        """Test only the profile changes older than the retention are pruned."""
+        ProfileChange.objects.update(created_at=timezone.now() - timedelta(days=2))
+        create_profile("rex", "About.", self.user_2)
+
+        call_command("prune_profile_changes", once=True, stdout=StringIO())
+
+        self.assertEqual(
+            list(ProfileChange.objects.values_list("profile_id", flat=True)),
+            [Profile.objects.get(username="rex").id],
+        )
@@ -1,3 +1,7 @@
+from io import BytesIO
+
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIClient
 from django.test import TestCase
 from django.urls import reverse
@@ -119,12 +123,30 @@ def create_comment(
     )
 
 
+def create_image_upload(name: str, width: int, height: int) -> SimpleUploadedFile:
+    """Create and return an uploaded PNG image file.
+
+    Parameters
+    ----------
+    name : str
+        File name of the upload.
+    width : int
+        Width of the image in pixels.
+    height : int
+        Height of the image in pixels.
+    """
+    output = BytesIO()
+    Image.new("RGB", (width, height), color=(200, 120, 60)).save(output, "png")
+    return SimpleUploadedFile(name, output.getvalue(), content_type="image/png")
+
+
 #
 # Create url helper functions
 #
 
 
 CREATE_POST_URL = reverse("posts_app:create_post")
+CREATE_POST_IMAGE_STAGED_URL = reverse("posts_app:create_post_image_staged")
 
 
 def get_explore_posts_url(profile_id: int):
@@ -223,6 +245,28 @@ def create_destroy_follow_url(auth_profile_id: int, followed_profile_id: int):
     )
 
 
+def list_followers_url(profile_id: int):
+    """Create and return a list followers url.
+
+    Parameters
+    ----------
+    profile_id : int
+        The id of the profile whose followers are listed.
+    """
+    return reverse("posts_app:list_followers", args=[profile_id])
+
+
+def list_following_url(profile_id: int):
+    """Create and return a list following url.
+
+    Parameters
+    ----------
+    profile_id : int
+        The id of the profile whose followed profiles are listed.
+    """
+    return reverse("posts_app:list_following", args=[profile_id])
+
+
 def search_profiles_url(profile_id: int, search_text: str):
     """Create and return a search profiles url.
 
@@ -236,6 +280,20 @@ def search_profiles_url(profile_id: int, search_text: str):
     return f"{reverse("posts_app:search_profiles", args=[profile_id])}?username={search_text}"
 
 
+def retrieve_profile_url(profile_id: int, requesting_profile_id: int):
+    """Create and return a retrieve Profile url.
+
+    Parameters
+    ----------
+    profile_id : int
+        The id of the Profile to fetch.
+    requesting_profile_id : int
+        The id of the profile fetching it.
+    """
+    url = reverse("posts_app:retrieve_profile", args=[profile_id])
+    return f"{url}?profileId={requesting_profile_id}"
+
+
 def retrieve_destroy_post_url(post_id: int):
     """Create and return a retrieve/destroy Post url.
 
@@ -12,6 +12,11 @@ router.register(r"report", PostReportViewSet, basename="report")
 
 urlpatterns = [
     path("post/", views.CreatePostView.as_view(), name="create_post"),
+    path(
+        "post/staged-image/",
+        views.CreatePostImageStagedView.as_view(),
+        name="create_post_image_staged",
+    ),
     path(
         "post/<int:pk>",
         views.RetrieveDestroyPostView.as_view(),
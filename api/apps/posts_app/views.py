@@ -2,11 +2,15 @@
 Views for the posts api.
 """
 
+import logging
+import time
 from rest_framework import generics, permissions, mixins, status, viewsets
 from rest_framework.decorators import action
 from apps.core_app.models import (
+    ImageStatus,
     Post,
     PostImage,
+    PostImageStaged,
     Profile,
     Like,
     Comment,
@@ -18,12 +22,15 @@ from apps.core_app.models import (
 )
 from .serializers import (
     PostSerializer,
+    PostImageStagedSerializer,
     LikeSerializer,
     CommentSerializer,
     ProfileDetailsSerializer,
     PostDetailedSerializer,
+    PostCardSerializer,
     CommentDetailedSerializer,
     SearchProfileSerializer,
+    FollowProfileSerializer,
     FollowSerializer,
     CommentLikeSerializer,
     CreateSavedPostSerializer,
@@ -31,17 +38,26 @@ from .serializers import (
     CreatePostReportSerializer,
     ReportReasonSerializer,
 )
-from ..user_app.serializers import ProfileSerializer
+from apps.user_app.serializers import get_requested_image_size
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
+from apps.core_app import conditional, post_cards
+from apps.core_app.caching import REPORT_REASONS, cached_serializer
+from apps.core_app.deletions import delete_stored_files
+from apps.core_app.images import publish_staged_images, upload_post_images
+from apps.core_app.parsers import ORJSONParser
+from apps.core_app.search_index import username_index
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import F, Q
 from django.db import transaction
 from .pagination import (
     SearchedProfilesPagination,
+    FeedPostsPagination,
     ListExplorePostsPagination,
     ListProfilePostsPagination,
     ListSimilarPostsPagination,
+    SavedPostsPagination,
     FollowListPagination,
     PostCommentsPagination,
     CommentRepliesPagination,
@@ -54,6 +70,8 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 
+logger = logging.getLogger(__name__)
+
 # schema parameter for auth profile id header
 auth_profile_param = OpenApiParameter(
     name="auth-profile-id",
@@ -71,20 +89,35 @@ username_param = OpenApiParameter(
 )
 
 
+def server_timing(uploaded, upload_seconds):
+    """Server-Timing header value with the time taken to save each image."""
+    timings = [
+        f"image-{index};dur={seconds * 1000:.1f}"
+        for index, (_, seconds) in enumerate(uploaded)
+    ]
+    timings.append(f"images;dur={upload_seconds * 1000:.1f}")
+    return ", ".join(timings)
+
+
 @extend_schema_view(
     post=extend_schema(parameters=[auth_profile_param]),
 )
 class CreatePostView(generics.CreateAPIView):
-    """Create a new Post."""
+    """
+    Create a new Post.
+    Images are either sent with the Post, or staged beforehand with the same
+    postUuid, which only moves the already processed images to the Post.
+    """
 
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
 
     def post(self, request, *args, **kwargs):
         profile_id = request.data.get("profileId", None)
         caption = request.data.get("caption", None)
         contains_ai = request.data.get("aiGenerated", False)
+        post_uuid = request.data.get("postUuid", None)
         images = request.FILES.getlist("images")
 
         # ensure that the profile sent belongs to the current authenticated user
@@ -92,6 +125,24 @@ class CreatePostView(generics.CreateAPIView):
         if str(profile_id) != str(current_profile.id) or not caption:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        # images are saved to storage concurrently before the transaction, so
+        # the transaction only writes the rows
+        start = time.perf_counter()
+        try:
+            uploaded = upload_post_images(current_profile, images) if images else []
+        except Exception:
+            logger.exception("Error saving post images.")
+            return Response(
+                {"message": "Error creating that post."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        upload_seconds = time.perf_counter() - start
+        if uploaded:
+            logger.info(
+                f"Saved {len(uploaded)} post images in {upload_seconds * 1000:.0f} ms "
+                f"({', '.join(f'{seconds * 1000:.0f}' for _, seconds in uploaded)} ms)"
+            )
+
         try:
             with transaction.atomic():
                 # create post
@@ -106,23 +157,62 @@ class CreatePostView(generics.CreateAPIView):
 
                 new_post = Post.objects.get(id=serializer.data["id"])
 
-                for image in images:
-                    PostImage.objects.create(image=image, post=new_post)
-                new_post = Post.objects.get(id=serializer.data["id"])
+                if post_uuid:
+                    publish_staged_images(new_post, post_uuid)
+                for name, _ in uploaded:
+                    PostImage.objects.create(
+                        image=name, post=new_post, status=ImageStatus.PROCESSING
+                    )
+                new_post = Post.objects.with_details(current_profile.id).get(
+                    id=serializer.data["id"]
+                )
                 serializer = PostDetailedSerializer(
                     new_post, context={"request": request}
                 )
                 headers = self.get_success_headers(serializer.data)
+                if uploaded:
+                    headers["Server-Timing"] = server_timing(uploaded, upload_seconds)
                 return Response(
                     serializer.data, status=status.HTTP_201_CREATED, headers=headers
                 )
-        except Exception as e:
+        except Exception:
             # If an exception occurs, the transaction will be rolled back
-            # and the main object will be deleted.
-            Response(
-                {"message": "Error creating that post."},
-                status=status.HTTP_400_BAD_REQUEST,
+            # and the main object will be deleted, the images saved before it
+            # are deleted here.
+            logger.exception("Error creating post.")
+            delete_stored_files(
+                PostImage._meta.get_field("image").storage,
+                [name for name, _ in uploaded],
             )
+            raise
+
+
+@extend_schema_view(
+    post=extend_schema(parameters=[auth_profile_param]),
+)
+class CreatePostImageStagedView(generics.CreateAPIView):
+    """
+    Upload an image for a Post that is still being written. The image is
+    processed right away and added to the Post created with the same postUuid.
+    """
+
+    serializer_class = PostImageStagedSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    queryset = PostImageStaged.objects.all()
+
+    def create(self, request, *args, **kwargs):
+        data = {
+            "post_uuid": request.data.get("postUuid", None),
+            "image": request.data.get("image", None),
+        }
+        serializer = self.get_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(profile=request.current_profile)
+        headers = self.get_success_headers(serializer.data)
+        return Response(
+            serializer.data, status=status.HTTP_201_CREATED, headers=headers
+        )
 
 
 @extend_schema_view(
@@ -187,25 +277,84 @@ class DestroyLikeView(generics.DestroyAPIView):
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
-class ListProfilePostsView(generics.ListAPIView):
+class PostCardsMixin:
+    """
+    Serialize Posts from the post card cache when post_card_endpoint is one of
+    POST_CARD_CACHE_ENDPOINTS, see apps.core_app.post_cards. The page is read
+    without the related rows held by the cards, and only the cards missing from
+    the cache are loaded with them.
+    """
+
+    post_card_endpoint = None
+
+    def use_post_cards(self):
+        return post_cards.is_enabled(self.post_card_endpoint)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_post_cards():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(
+            queryset.select_related(None).prefetch_related(None)
+        )
+        return self.get_paginated_response(self.serialize_posts(page))
+
+    def serialize_posts(self, posts):
+        """Return the representation of each Post that still exists."""
+        cards = post_cards.get_cards(
+            posts,
+            self.build_post_cards,
+            self.post_card_endpoint,
+            self.get_post_card_variant(),
+        )
+        serializer = PostDetailedSerializer(context=self.get_serializer_context())
+        return [
+            serializer.to_representation_with_card(post, cards[post.id])
+            for post in posts
+            if post.id in cards
+        ]
+
+    def get_post_card_variant(self):
+        """
+        Return the parts of the request the cards are built from: the host their
+        image URLs are made absolute with and the requested image size.
+        """
+        request = self.request
+        size = get_requested_image_size(request) or ""
+        return f"{request.scheme}://{request.get_host()}:{size}"
+
+    def build_post_cards(self, post_ids):
+        posts = Post.objects.with_details().in_bulk(post_ids)
+        context = self.get_serializer_context()
+        return {
+            pk: dict(PostCardSerializer(post, context=context).data)
+            for pk, post in posts.items()
+        }
+
+
+class ListProfilePostsView(PostCardsMixin, generics.ListAPIView):
     """List all posts from a profile."""
 
     serializer_class = PostDetailedSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = ListProfilePostsPagination
+    post_card_endpoint = "profile_posts"
 
     def get_queryset(self):
         profile_id = self.kwargs.get("id", None)
         current_profile = self.request.current_profile
 
-        profile_posts = Post.objects.filter(Q(profile__id=profile_id))
+        profile_posts = Post.objects.with_details(current_profile.id).filter(
+            Q(profile__id=profile_id)
+        )
 
         if str(profile_id) == str(current_profile.id):
             # Don't filter inappropriate posts if profile is requesting their own posts
             return profile_posts.order_by("-created_at")
 
         # filter reported inappropriate content
-        return profile_posts.filter(~Q(reports__reason__id=1)).order_by("-created_at")
+        return profile_posts.filter(is_inappropriate=False).order_by("-created_at")
 
 
 class RetrieveProfileView(generics.RetrieveAPIView):
@@ -216,20 +365,29 @@ class RetrieveProfileView(generics.RetrieveAPIView):
     queryset = Profile.objects.all()
 
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, context={"request": request})
-        return Response(serializer.data)
+        etag = conditional.profile_etag(
+            self.kwargs["pk"], request.query_params.get("profileId", None)
+        )
+
+        def get_response():
+            instance = self.get_object()
+            serializer = self.get_serializer(instance, context={"request": request})
+            return Response(serializer.data)
+
+        return conditional.conditional_response(request, etag, get_response)
 
 
 @extend_schema_view(
     get=extend_schema(parameters=[auth_profile_param]),
 )
-class RetrieveFeedView(generics.ListAPIView):
+class RetrieveFeedView(PostCardsMixin, generics.ListAPIView):
     """List feed posts from profiles that the authenticated profile follows."""
 
     serializer_class = PostDetailedSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Post.objects.all()
+    pagination_class = FeedPostsPagination
+    post_card_endpoint = "feed"
 
     def get(self, request, *args, **kwargs):
         profile_id = self.kwargs.get("id", None)
@@ -242,12 +400,28 @@ class RetrieveFeedView(generics.ListAPIView):
 
     def get_queryset(self):
         requesting_profile_id = self.kwargs.get("id", None)
-        posts = Post.objects.filter(
-            Q(profile__following__followed_by=requesting_profile_id)
-            & ~Q(reports__reason__id=1)  # filter reported inappropriate content
-        ).order_by("-created_at")
+        posts = (
+            self.get_posts()
+            .in_feed_of(requesting_profile_id)
+            .order_by("-feed_created_at", "-id")
+        )
         return posts
 
+    def get_feed_sources(self):
+        """Return a queryset for each source of the feed, see FeedPostsPagination."""
+        requesting_profile_id = self.kwargs.get("id", None)
+        posts = self.get_posts()
+        if self.use_post_cards():
+            # like the queryset paginated by PostCardsMixin.list
+            posts = posts.select_related(None).prefetch_related(None)
+        return posts.feed_sources_of(requesting_profile_id)
+
+    def get_posts(self):
+        requesting_profile_id = self.kwargs.get("id", None)
+        return Post.objects.with_details(requesting_profile_id).filter(
+            is_inappropriate=False  # filter reported inappropriate content
+        )
+
 
 @extend_schema_view(
     post=extend_schema(parameters=[auth_profile_param]),
@@ -286,7 +460,9 @@ class CreateCommentView(generics.CreateAPIView):
         )
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        comment = Comment.objects.get(id=serializer.data["id"])
+        comment = Comment.objects.with_details(current_profile.id).get(
+            id=serializer.data["id"]
+        )
 
         res_serializer = CommentDetailedSerializer(
             comment, context={"request": request}
@@ -297,8 +473,11 @@ class CreateCommentView(generics.CreateAPIView):
         )
 
 
+@extend_schema_view(
+    get=extend_schema(parameters=[auth_profile_param]),
+)
 class ListPostCommentsView(generics.ListAPIView):
-    """List Comments for a Post."""
+    """List Comments for a Post, each with its first replies."""
 
     serializer_class = CommentDetailedSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -307,25 +486,42 @@ class ListPostCommentsView(generics.ListAPIView):
 
     def get_queryset(self):
         post_id = self.kwargs.get("pk")
-        comments = self.queryset.filter(
-            Q(post=post_id) & Q(parent_comment=None)
-        ).order_by("-created_at")
+        profile_id = self.request.current_profile.id
+        comments = (
+            Comment.objects.with_details(profile_id)
+            .with_first_replies(profile_id)
+            .filter(Q(post=post_id) & Q(parent_comment=None))
+            .order_by("-created_at")
+        )
         return comments
 
 
 @extend_schema_view(
     delete=extend_schema(parameters=[auth_profile_param]),
 )
-class RetrieveDestroyPostView(generics.RetrieveDestroyAPIView):
+class RetrieveDestroyPostView(PostCardsMixin, generics.RetrieveDestroyAPIView):
     """Get details of a Post."""
 
     serializer_class = PostDetailedSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Post.objects.all()
+    post_card_endpoint = "post_detail"
 
     def get(self, request, *args, **kwargs):
         post_id = self.kwargs.get("pk")
-        post = self.queryset.get(id=post_id)
+        current_profile = request.current_profile
+        etag = conditional.post_etag(post_id, current_profile.id)
+        return conditional.conditional_response(
+            request, etag, lambda: self.retrieve_post(request, post_id)
+        )
+
+    def retrieve_post(self, request, post_id):
+        posts = self.queryset.with_details(request.current_profile.id)
+        if self.use_post_cards():
+            post = posts.select_related(None).prefetch_related(None).get(id=post_id)
+            return Response(self.serialize_posts([post])[0], status=status.HTTP_200_OK)
+
+        post = posts.get(id=post_id)
         serializer = self.serializer_class(post, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -335,7 +531,7 @@ class RetrieveDestroyPostView(generics.RetrieveDestroyAPIView):
         instance = self.get_object()
 
         # check that the user requesting the delete owns the post
-        if instance.profile.user != self.request.user:
+        if instance.profile.user_id != self.request.user.id:
             return Response(
                 {"error": "Requesting user does not own this resource."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -373,13 +569,45 @@ class ListSearchedProfilesView(generics.ListAPIView):
             )
         return self.list(request, *args, **kwargs)
 
-    def get_queryset(self):
+    def list(self, request, *args, **kwargs):
+        profile_ids = self.get_indexed_profile_ids()
+        if profile_ids is None:
+            return super().list(request, *args, **kwargs)
+
+        # the index gives the ids in order, only the page's rows are loaded
+        page_ids = self.paginate_queryset(profile_ids)
+        profiles = self.get_profiles().in_bulk(page_ids)
+        page = [profiles[pk] for pk in page_ids if pk in profiles]
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_indexed_profile_ids(self):
+        """
+        Return the ids of the matching profiles from the username index, or None
+        if the index is disabled or not loaded yet.
+        """
+        if not settings.USERNAME_INDEX_ENABLED:
+            return None
         username = self.request.query_params.get("username", None)
         profile_id = self.kwargs.get("id", None)
-        profiles = Profile.objects.filter(
-            Q(username__icontains=username) & ~Q(id=profile_id)
-        ).order_by("username")
-        return profiles
+        limit = settings.USERNAME_INDEX_MAX_RESULTS
+        profile_ids = username_index.search(username, limit + 1)
+        if profile_ids is None:
+            return None
+        return [pk for pk in profile_ids if pk != profile_id][:limit]
+
+    def get_profiles(self):
+        profile_id = self.kwargs.get("id", None)
+        return (
+            Profile.objects.exclude(id=profile_id)
+            .with_viewer_following(profile_id)
+            .select_related("image")
+        )
+
+    def get_queryset(self):
+        # searched in the database while the username index isn't available
+        username = self.request.query_params.get("username", None)
+        return self.get_profiles().search(username)
 
     def get_serializer_context(self):
         profile_id = self.kwargs.get("id", None)
@@ -426,52 +654,64 @@ class CreateFollowView(generics.CreateAPIView):
         )
 
 
-@extend_schema_view(get=extend_schema(parameters=[username_param]))
-class ListFollowersView(generics.ListAPIView):
-    """List Profiles that follow a given Profile."""
+class FollowProfilesListView(generics.ListAPIView):
+    """Base view for the lists of Profiles on one side of a Profile's follows."""
 
-    serializer_class = ProfileSerializer
+    serializer_class = FollowProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Profile.objects.all()
     pagination_class = FollowListPagination
 
+    def list(self, request, *args, **kwargs):
+        # the follows are sorted and paged on the columns the cursor needs, then
+        # only the page's rows are joined with their image, pet type and the
+        # viewer's follow flag
+        queryset = self.filter_queryset(self.get_queryset()).only("id", "username")
+        page_ids = [profile.id for profile in self.paginate_queryset(queryset)]
+        viewer_id = request.current_profile.id
+        profiles = Profile.objects.with_details(viewer_id).in_bulk(page_ids)
+        page = [profiles[pk] for pk in page_ids if pk in profiles]
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["profile_id"] = self.request.current_profile.id
+        return context
+
+
+@extend_schema_view(
+    get=extend_schema(parameters=[auth_profile_param, username_param])
+)
+class ListFollowersView(FollowProfilesListView):
+    """List Profiles that follow a given Profile."""
+
     def get_queryset(self):
         profile_id = self.kwargs.get("id", None)
         username = self.request.query_params.get("username", None)
 
-        profile = Profile.objects.get(id=profile_id)
-        followers_objs = profile.following.all()
+        # profiles with a Follow where they follow the given profile
+        followers = Profile.objects.filter(followers__followed=profile_id)
         if username:
-            followers_objs = followers_objs.filter(
-                Q(followed_by__username__icontains=username)
-            )
-        sorted = followers_objs.order_by("followed_by__username")
-        followers = [obj.followed_by for obj in sorted]
-        return followers
+            followers = followers.filter(Q(username__icontains=username))
+        return followers.order_by("username")
 
 
-@extend_schema_view(get=extend_schema(parameters=[username_param]))
-class ListFollowingView(generics.ListAPIView):
+@extend_schema_view(
+    get=extend_schema(parameters=[auth_profile_param, username_param])
+)
+class ListFollowingView(FollowProfilesListView):
     """List Profiles that a given Profile follows."""
 
-    serializer_class = ProfileSerializer
-    permission_classes = [permissions.IsAuthenticated]
-    queryset = Profile.objects.all()
-    pagination_class = FollowListPagination
-
     def get_queryset(self):
         profile_id = self.kwargs.get("id", None)
         username = self.request.query_params.get("username", None)
 
-        profile = Profile.objects.get(id=profile_id)
-        following_objs = profile.followers.all()
+        # profiles with a Follow where they are followed by the given profile
+        following = Profile.objects.filter(following__followed_by=profile_id)
         if username:
-            following_objs = following_objs.filter(
-                Q(followed__username__icontains=username)
-            )
-        sorted = following_objs.order_by("followed__username")
-        following = [obj.followed for obj in sorted]
-        return following
+            following = following.filter(Q(username__icontains=username))
+        return following.order_by("username")
 
 
 @extend_schema_view(
@@ -505,21 +745,22 @@ class DestroyFollowView(generics.DestroyAPIView):
 @extend_schema_view(
     get=extend_schema(parameters=[auth_profile_param]),
 )
-class ListExplorePostsView(generics.ListAPIView):
+class ListExplorePostsView(PostCardsMixin, generics.ListAPIView):
     """List explore posts from profiles that the authenticated profile does not follow."""
 
     serializer_class = PostDetailedSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Post.objects.all()
     pagination_class = ListExplorePostsPagination
+    post_card_endpoint = "explore"
 
     def get_queryset(self):
         requesting_profile_id = self.kwargs.get("id")
 
-        posts = Post.objects.filter(
+        posts = Post.objects.with_details(requesting_profile_id).filter(
             ~Q(profile__following__followed_by=requesting_profile_id)
             & ~Q(profile__user=self.request.user)
-            & ~Q(reports__gt=0)  # filter all reported posts for explore screen
+            & Q(has_open_reports=False)  # filter all reported posts for explore screen
         ).order_by("-created_at")
         return posts
 
@@ -535,21 +776,23 @@ class ListExplorePostsView(generics.ListAPIView):
         ]
     )
 )
-class ListSimilarPostsView(generics.ListAPIView):
+class ListSimilarPostsView(PostCardsMixin, generics.ListAPIView):
     """Get explore posts that are similar to the desired post."""
 
     serializer_class = PostDetailedSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = Post.objects.all()
     pagination_class = ListSimilarPostsPagination
+    post_card_endpoint = "similar_posts"
 
     def get_queryset(self):
         post_id = self.kwargs.get("pk")
         profile_id = self.request.GET.get("profileId")
-        posts = Post.objects.filter(
+        current_profile = self.request.current_profile
+        posts = Post.objects.with_details(current_profile.id).filter(
             ~Q(profile=profile_id)
             & Q(id__gt=post_id)
-            & ~Q(reports__reason__id=1)  # filter reported inappropriate content
+            & Q(is_inappropriate=False)  # filter reported inappropriate content
         ).order_by("-created_at")
         return posts
 
@@ -629,8 +872,11 @@ class ListCommentRepliesView(generics.ListAPIView):
 
     def get_queryset(self):
         comment_id = self.kwargs.get("comment_id")
-        replies = Comment.objects.filter(Q(parent_comment=comment_id)).order_by(
-            "created_at"
+        profile_id = self.request.current_profile.id
+        replies = (
+            Comment.objects.with_details(profile_id)
+            .filter(Q(parent_comment=comment_id))
+            .order_by("created_at")
         )
         return replies
 
@@ -639,19 +885,22 @@ class ListCommentRepliesView(generics.ListAPIView):
     get=extend_schema(parameters=[auth_profile_param]),
     post=extend_schema(parameters=[auth_profile_param]),
 )
-class ListCreateSavedPostView(generics.ListCreateAPIView):
+class ListCreateSavedPostView(PostCardsMixin, generics.ListCreateAPIView):
     serializer_class = CreateSavedPostSerializer
     permission_classes = [permissions.IsAuthenticated]
     queryset = SavedPost.objects.all()
-    pagination_class = ListProfilePostsPagination
+    pagination_class = SavedPostsPagination
+    post_card_endpoint = "saved_posts"
 
     def get_queryset(self):
-        profile_id = self.request.headers["auth-profile-id"]
-        profile = Profile.objects.get(id=profile_id)
+        profile_id = self.request.current_profile.id
 
-        saved_posts = profile.saved_posts.all()
-        saved_posts_ordered = saved_posts.order_by("-saved_at")
-        posts = [obj.post for obj in saved_posts_ordered]
+        posts = (
+            Post.objects.with_details(profile_id)
+            .filter(saved_by__profile=profile_id)
+            .annotate(saved_at=F("saved_by__saved_at"))
+            .order_by("-saved_at")
+        )
         return posts
 
     def get_serializer_class(self):
@@ -659,22 +908,10 @@ class ListCreateSavedPostView(generics.ListCreateAPIView):
             return PostDetailedSerializer
         return CreateSavedPostSerializer
 
-    def get(self, request, *args, **kwargs):
-        profile_id = self.request.headers["auth-profile-id"]
-        user_profile_match = self.request.user.profiles.filter(id=profile_id).first()
-
-        if not user_profile_match:
-            return Response(
-                {"message": "Profile does not belong to the authenticated user."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        return super().get(request, *args, **kwargs)
-
     def post(self, request, *args, **kwargs):
         profile_id = request.data["profile"]
-        user_profile_match = self.request.user.profiles.filter(id=profile_id).first()
         # ensure profile creating saved post belongs to the authenticated user
-        if not user_profile_match:
+        if str(profile_id) != str(request.current_profile.id):
             return Response(
                 {"message": "Profile does not belong to the authenticated user."},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -694,20 +931,10 @@ class DestroySavedPostView(generics.DestroyAPIView):
 
     def destroy(self, request, *args, **kwargs):
         post_id = self.kwargs.get("post_id", None)
-        profile_id = self.request.headers["auth-profile-id"]
-
-        user_profile_match = self.request.user.profiles.filter(id=profile_id).first()
-
-        if not user_profile_match:
-            return Response(
-                {"message": "Profile does not belong to the authenticated user."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        current_profile = request.current_profile
 
         if post_id:
-            like = get_object_or_404(
-                SavedPost, profile=user_profile_match, post=post_id
-            )
+            like = get_object_or_404(SavedPost, profile=current_profile, post=post_id)
             self.perform_destroy(like)
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -731,15 +958,20 @@ class ReportReasonViewSet(viewsets.ReadOnlyModelViewSet):
     def list(self, request, *args, **kwargs):
         if not request.current_profile:
             return Response(status=status.HTTP_401_UNAUTHORIZED)
-        queryset = self.filter_queryset(self.get_queryset())
+        return conditional.conditional_response(
+            request,
+            conditional.reference_etag(REPORT_REASONS),
+            lambda: Response(serialize_active_report_reasons()),
+            max_age=settings.REFERENCE_DATA_MAX_AGE,
+        )
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+@cached_serializer(REPORT_REASONS)
+def serialize_active_report_reasons():
+    """The active report reasons, the same for every request."""
+    return ReportReasonSerializer(
+        ReportReason.objects.filter(is_active=True), many=True
+    )
 
 
 @extend_schema_view(
@@ -32,19 +32,73 @@ class UserSerializer(serializers.ModelSerializer):
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
-            user.save()
+            user.change_password(password)
 
         return user
 
 
-class ProfileImageSerializer(serializers.ModelSerializer):
+def get_requested_image_size(request, query_param="image_size"):
+    """Return the image width a request asks for with query_param, or None."""
+    if request is None:
+        return None
+    try:
+        return int(request.query_params[query_param])
+    except (AttributeError, KeyError, ValueError):
+        return None
+
+
+class ImageVariantsSerializerMixin:
+    """
+    Adds a srcset map of the size variants of an image (width -> url) to an image
+    serializer. Requests can ask for a variant with the image_size query param,
+    the image field is then the smallest variant at least that wide.
+    """
+
+    image_size_query_param = "image_size"
+
+    def get_srcset(self, obj) -> dict[str, str]:
+        sizes = sorted(obj.variants, key=int)
+        return {size: self.get_variant_url(obj, obj.variants[size]) for size in sizes}
+
+    def get_variant_url(self, obj, name):
+        url = obj.image.storage.url(name)
+        request = self.context.get("request")
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_requested_size(self):
+        return get_requested_image_size(
+            self.context.get("request"), self.image_size_query_param
+        )
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        requested_size = self.get_requested_size()
+        if requested_size and instance.variants:
+            sizes = sorted(int(size) for size in instance.variants)
+            size = next((size for size in sizes if size >= requested_size), sizes[-1])
+            data["image"] = self.get_variant_url(instance, instance.variants[str(size)])
+        return data
+
+
+class ProfileImageSerializer(ImageVariantsSerializerMixin, serializers.ModelSerializer):
     """Serializer for profile image."""
 
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ProfileImage
-        fields = ["id", "profile", "image", "created_at", "updated_at"]
-        read_only_fields = ["created_at", "updated_at"]
+        fields = [
+            "id",
+            "profile",
+            "image",
+            "srcset",
+            "status",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["status", "created_at", "updated_at"]
 
 
 class PetTypeSerializer(serializers.ModelSerializer):
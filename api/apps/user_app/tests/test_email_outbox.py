@@ -0,0 +1,175 @@
+"""
+Tests for the transactional email outbox.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from apps.core_app.emails import claim_emails, queue_email, send_emails
+from apps.core_app.models import EmailOutbox, EmailStatus, User, VerifyEmailToken
+
+CREATE_USER_URL = reverse("user_app:create_user")
+REQUEST_PASSWORD_RESET_URL = reverse("user_app:request_password_reset")
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Email backend whose mail server refuses every message."""
+
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("Mail server unavailable")
+
+
+class CountingEmailBackend(BaseEmailBackend):
+    """Email backend counting the connections it opens."""
+
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return True
+
+    def send_messages(self, email_messages):
+        mail.outbox.extend(email_messages)
+        return len(email_messages)
+
+
+class EmailOutboxTests(TestCase):
+    """Test emails are queued by requests and sent by the outbox command."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_registration_queues_verification_email(self):
+        """Test creating a user queues the email instead of sending it."""
+        res = self.client.post(
+            CREATE_USER_URL,
+            {
+                "email": "test@example.com",
+                "password": "test-user-password-123",
+                "username": "test_username",
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.to, ["test@example.com"])
+        self.assertEqual(email.status, EmailStatus.PENDING)
+
+        call_command("send_email_outbox", "--once", stdout=StringIO())
+
+        token = VerifyEmailToken.objects.get(user__email="test@example.com")
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["test@example.com"])
+        self.assertEqual(
+            mail.outbox[0].body, f"Your verification code is: {token.token}"
+        )
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailStatus.SENT)
+        self.assertIsNotNone(email.sent_at)
+
+    def test_password_reset_queues_email(self):
+        """Test requesting a password reset queues the reset email."""
+        User.objects.create_user(email="test@example.com", password="password123")
+
+        res = self.client.post(
+            REQUEST_PASSWORD_RESET_URL, {"email": "test@example.com"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        email = EmailOutbox.objects.get()
+        self.assertEqual(email.subject, "Reset Your OnlyPaws Password")
+
+    def test_batch_is_sent_over_one_connection(self):
+        """Test a batch of emails opens a single connection to the mail server."""
+        for index in range(3):
+            queue_email("Subject", "Body", [f"test{index}@example.com"])
+        CountingEmailBackend.opened = 0
+
+        with override_settings(
+            EMAIL_BACKEND=f"{__name__}.{CountingEmailBackend.__name__}"
+        ):
+            sent = send_emails(claim_emails(10))
+
+        self.assertEqual(sent, 3)
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    @override_settings(
+        EMAIL_BACKEND=f"{__name__}.{FailingEmailBackend.__name__}",
+        EMAIL_OUTBOX_RETRY_DELAY=30,
+        EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    )
+    def test_failed_email_is_retried_with_backoff(self):
+        """Test a failed email waits longer after each attempt, then fails."""
+        email = queue_email("Subject", "Body", ["test@example.com"])
+
+        delays = []
+        for _ in range(2):
+            before = timezone.now()
+            self.assertEqual(send_emails(claim_emails(10)), 0)
+            email.refresh_from_db()
+            self.assertEqual(email.status, EmailStatus.PENDING)
+            self.assertIn("Mail server unavailable", email.last_error)
+            delays.append(email.next_attempt_at - before)
+            # not due yet, so it isn't claimed again
+            self.assertEqual(claim_emails(10), [])
+            EmailOutbox.objects.filter(pk=email.pk).update(
+                next_attempt_at=timezone.now()
+            )
+
+        self.assertAlmostEqual(
+            delays[0].total_seconds(), timedelta(seconds=30).total_seconds(), delta=5
+        )
+        self.assertAlmostEqual(
+            delays[1].total_seconds(), timedelta(seconds=60).total_seconds(), delta=5
+        )
+
+        send_emails(claim_emails(10))
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailStatus.FAILED)
+        self.assertEqual(email.attempts, 3)
+
+    def test_claimed_email_is_not_claimed_again(self):
+        """Test an email claimed by one sender is skipped by the others."""
+        email = queue_email("Subject", "Body", ["test@example.com"])
+
+        self.assertEqual(claim_emails(10), [email.pk])
+        self.assertEqual(claim_emails(10), [])
+
+    @override_settings(EMAIL_OUTBOX_BACKEND="immediate")
+    def test_immediate_backend_sends_on_commit(self):
+        """Test the immediate backend sends the email once the commit happens."""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            queue_email("Subject", "Body", ["test@example.com"])
+        self.assertEqual(len(mail.outbox), 0)
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailStatus.SENT)
+
+    @override_settings(EMAIL_OUTBOX_BACKEND="immediate")
+    def test_immediate_backend_skips_email_claimed_by_worker(self):
+        """Test an email claimed by a send_email_outbox worker isn't sent again."""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            email = queue_email("Subject", "Body", ["test@example.com"])
+        self.assertEqual(claim_emails(10), [email.pk])
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(claim_emails(10), [])
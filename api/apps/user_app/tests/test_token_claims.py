@@ -0,0 +1,218 @@
+"""
+Tests for the stateless JWT authentication.
+"""
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core_app.authentication import token_version_cache_key
+from apps.core_app.models import Profile, User
+
+LOGIN_URL = reverse("user_app:token_obtain_pair")
+REFRESH_TOKEN_URL = reverse("user_app:token_refresh")
+PET_TYPES_URL = reverse("user_app:list_pet_types")
+SAVED_POSTS_URL = reverse("posts_app:list_create_saved_post")
+PASSWORD = "test-user-password-123"
+
+
+class TokenClaimsTests(TestCase):
+    """Test requests are authenticated from the claims of the access token."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="test@example.com", password=PASSWORD
+        )
+        self.profile = Profile.objects.create(
+            username="test_username", about="About me.", user=self.user
+        )
+        self.tokens = self.login()
+
+    def tearDown(self):
+        cache.clear()
+
+    def login(self):
+        res = self.client.post(
+            LOGIN_URL, {"email": self.user.email, "password": PASSWORD}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def authenticate(self, access):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {access}",
+            HTTP_AUTH_PROFILE_ID=self.profile.id,
+        )
+
+    def test_access_token_has_user_claims(self):
+        """Test the access token carries the flags and profile ids of the user."""
+        token = AccessToken(self.tokens["access"])
+
+        self.assertEqual(token["user_id"], self.user.id)
+        self.assertTrue(token["is_active"])
+        self.assertFalse(token["is_staff"])
+        self.assertFalse(token["is_email_verified"])
+        self.assertEqual(token["profile_ids"], [self.profile.id])
+        self.assertEqual(token["token_version"], self.user.token_version)
+
+    def test_requests_do_not_query_user_or_profile(self):
+        """Test authenticating a request and its profile header needs no query."""
+        self.authenticate(self.tokens["access"])
+
+        with self.assertNumQueries(1):
+            res = self.client.get(PET_TYPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(SAVED_POSTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        auth_queries = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith(
+                ('SELECT "core_app_user"', 'SELECT "core_app_profile"')
+            )
+        ]
+        self.assertEqual(auth_queries, [])
+
+    def test_changing_password_revokes_tokens(self):
+        """Test tokens issued before the password changed are rejected."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.change_password("new-user-password-123")
+
+        self.authenticate(self.tokens["access"])
+        res = self.client.get(PET_TYPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": self.tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_upgrading_password_hash_keeps_tokens_valid(self):
+        """
+        Test logging in with a password stored with an outdated hasher, which
+        Django upgrades, issues tokens that can be used and refreshed.
+        """
+        User.objects.filter(id=self.user.id).update(
+            password=make_password(PASSWORD, hasher="pbkdf2_sha1")
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tokens = self.login()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(AccessToken(tokens["access"])["token_version"], 0)
+        self.authenticate(tokens["access"])
+        res = self.client.get(PET_TYPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_revoked_tokens_rejected_after_cached_version_expires(self):
+        """
+        Test the token version is read from the database again once it has
+        expired from the cache, so revoked tokens stay rejected.
+        """
+        User.objects.filter(id=self.user.id).update(
+            token_version=F("token_version") + 1
+        )
+        cache.clear()
+
+        self.authenticate(self.tokens["access"])
+        res = self.client.get(PET_TYPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_version_cached_again_after_it_expires(self):
+        """Test a valid token is accepted and its version cached on a cache miss."""
+        cache.clear()
+
+        self.authenticate(self.tokens["access"])
+        res = self.client.get(PET_TYPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            cache.get(token_version_cache_key(self.user.id)), self.user.token_version
+        )
+
+        with self.assertNumQueries(1):
+            res = self.client.get(PET_TYPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_deactivating_user_revokes_tokens(self):
+        """Test tokens of a deactivated user are rejected."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        self.authenticate(self.tokens["access"])
+        res = self.client.get(PET_TYPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": self.tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleting_profile_rejects_only_that_profile(self):
+        """
+        Test tokens carrying the id of a deleted profile reject that profile and
+        can still be used with the user's other profiles.
+        """
+        other_profile = Profile.objects.create(
+            username="other_username", about="About me.", user=self.user
+        )
+        tokens = self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            other_profile.delete()
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {tokens['access']}",
+            HTTP_AUTH_PROFILE_ID=other_profile.id,
+        )
+        res = self.client.get(SAVED_POSTS_URL)
+        self.assertIn(
+            res.status_code, [status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN]
+        )
+
+        self.authenticate(tokens["access"])
+        res = self.client.get(SAVED_POSTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_refresh_reads_claims_again(self):
+        """Test the refreshed access token has the current claims of the user."""
+        new_profile = Profile.objects.create(
+            username="new_username", about="About me.", user=self.user
+        )
+        User.objects.filter(id=self.user.id).update(is_email_verified=True)
+
+        res = self.client.post(REFRESH_TOKEN_URL, {"refresh": self.tokens["refresh"]})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        token = AccessToken(res.data["access"])
+        self.assertTrue(token["is_email_verified"])
+        self.assertCountEqual(token["profile_ids"], [self.profile.id, new_profile.id])
+
+    def test_profile_created_after_login_can_be_used(self):
+        """Test a profile missing from the claims is checked against the database."""
+        new_profile = Profile.objects.create(
+            username="new_username", about="About me.", user=self.user
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}",
+            HTTP_AUTH_PROFILE_ID=new_profile.id,
+        )
+
+        res = self.client.get(SAVED_POSTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
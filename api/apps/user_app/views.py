@@ -12,6 +12,11 @@ from apps.core_app.models import (
     VerifyEmailToken,
     ResetPasswordToken,
 )
+from apps.core_app import conditional
+from apps.core_app.authentication import load_user
+from apps.core_app.caching import PET_TYPES, cached_serializer
+from apps.core_app.emails import queue_email
+from apps.core_app.profiles import owns_profile
 from apps.core_app.utils import generate_verification_code
 from rest_framework import serializers
 from .serializers import (
@@ -28,7 +33,7 @@ from .serializers import (
 )
 from rest_framework.response import Response
 import logging
-from django.core.mail import send_mail
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 from datetime import timedelta
@@ -37,7 +42,6 @@ from drf_spectacular.utils import (
     extend_schema,
     OpenApiParameter,
 )
-from django.conf import settings
 
 
 # schema parameter for auth profile id header
@@ -55,29 +59,17 @@ logger = logging.getLogger(__file__)
 
 # helper function to send verification email
 def send_verification_email(user, token):
-    """Send verification email to user."""
+    """Queue the verification email of a user."""
     subject = "Verify Your OnlyPaws Email"
     message = f"Your verification code is: {token}"
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        fail_silently=False,
-    )
+    queue_email(subject, message, [user.email])
 
 
 def send_reset_password_email(user, token):
-    """Send reset password email to user."""
+    """Queue the reset password email of a user."""
     subject = "Reset Your OnlyPaws Password"
     message = f"Your password reset code is: {token}"
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        fail_silently=False,
-    )
+    queue_email(subject, message, [user.email])
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -132,7 +124,7 @@ class CreateUserView(generics.CreateAPIView):
                 )
 
                 # send email with token
-                send_verification_email(user, token)
+                send_verification_email(user, token.token)
 
                 response_serializer = UserProfileSerializer(user)
 
@@ -179,7 +171,7 @@ class RetrieveUpdateUserView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         """Retrieve and return authenticated user."""
-        return self.request.user
+        return load_user(self.request.user)
 
 
 class CreateProfileView(generics.CreateAPIView):
@@ -245,8 +237,7 @@ class RetrieveUpdateProfileView(generics.RetrieveUpdateAPIView):
     def update(self, request, *args, **kwargs):
         profile_id = self.kwargs.get("pk")
         # ensure that the profile sent belongs to the current authenticated user
-        user_profile_match = self.request.user.profiles.filter(id=profile_id).first()
-        if not user_profile_match:
+        if not owns_profile(request.user, profile_id):
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
         partial = kwargs.pop("partial", False)
@@ -271,7 +262,7 @@ class RetrieveUserInfoView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        user = self.request.user
+        user = load_user(self.request.user)
         serializer = self.serializer_class(user, context={"request": request})
         logger.info(f"{user.email} retrieved their info.")
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -290,13 +281,11 @@ class CreateProfileImageView(generics.CreateAPIView):
         image = request.FILES.get("image")
 
         # ensure that the profile sent belongs to the current authenticated user
-        user_profile_match = self.request.user.profiles.filter(id=profile_id).first()
-
-        if not user_profile_match or not image:
+        if not owns_profile(request.user, profile_id) or not image:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
         image_serializer = self.get_serializer(
-            data={"profile": user_profile_match.id, "image": image}
+            data={"profile": profile_id, "image": image}
         )
         image_serializer.is_valid(raise_exception=True)
         self.perform_create(image_serializer)
@@ -318,9 +307,7 @@ class UpdateProfileImageView(generics.UpdateAPIView):
     def patch(self, request, *args, **kwargs):
         profile_id = request.data.get("profileId", None)
         # ensure that the profile sent belongs to the current authenticated user
-        user_profile_match = self.request.user.profiles.filter(id=profile_id).first()
-
-        if not user_profile_match:
+        if not owns_profile(request.user, profile_id):
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
         return self.partial_update(request, *args, **kwargs)
@@ -338,6 +325,20 @@ class ListPetTypesView(generics.ListAPIView):
         options = PetType.objects.all().order_by("name")
         return options
 
+    def list(self, request, *args, **kwargs):
+        return conditional.conditional_response(
+            request,
+            conditional.reference_etag(PET_TYPES),
+            lambda: Response(serialize_pet_types()),
+            max_age=settings.REFERENCE_DATA_MAX_AGE,
+        )
+
+
+@cached_serializer(PET_TYPES)
+def serialize_pet_types():
+    """The pet type options, the same for every request."""
+    return PetTypeSerializer(PetType.objects.all().order_by("name"), many=True)
+
 
 @extend_schema_view(
     post=extend_schema(parameters=[auth_profile_param]),
@@ -350,7 +351,7 @@ class VerifyEmailView(generics.CreateAPIView):
     queryset = VerifyEmailToken.objects.all()
 
     def create(self, request, *args, **kwargs):
-        user = self.request.user
+        user = load_user(self.request.user)
         user_token = getattr(user, "verify_email_token", None)
         request_token = request.data.get("token")
 
@@ -409,7 +410,7 @@ class RequestNewVerifyEmailTokenView(generics.CreateAPIView):
     queryset = VerifyEmailToken.objects.all()
 
     def post(self, request, *args, **kwargs):
-        user = self.request.user
+        user = load_user(self.request.user)
         logger.info(f"Verification token requested for user {user.email}")
 
         if user.is_email_verified:
@@ -551,9 +552,8 @@ class ResetPasswordView(generics.CreateAPIView):
                     raise e
 
                 with transaction.atomic():
-                    # Update password
-                    user.set_password(new_password)
-                    user.save()
+                    # Update password, revoking the tokens issued before
+                    user.change_password(new_password)
 
                     # Delete the used token
                     reset_token.delete()
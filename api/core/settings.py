@@ -154,14 +154,25 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "core_app.User"
 
+# each environment's settings extend REST_FRAMEWORK rather than replace it
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.core_app.authentication.ClaimsJWTAuthentication",
     ),
     "EXCEPTION_HANDLER": "apps.core_app.exceptions.exceptions.custom_exception_handler",
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # JSONRenderer and JSONParser backed by orjson, see core_app.renderers
+    "DEFAULT_RENDERER_CLASSES": (
+        "apps.core_app.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "apps.core_app.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 access_token_lifetime = int(os.environ.get("ACCESS_TOKEN_LIFETIME"))
@@ -170,6 +181,13 @@ refresh_token_lifetime = int(os.environ.get("REFRESH_TOKEN_LIFETIME"))
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=access_token_lifetime),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=refresh_token_lifetime),
+    # tokens carry the user's flags and profile ids, see core_app.authentication
+    "TOKEN_OBTAIN_SERIALIZER": (
+        "apps.core_app.authentication.ClaimsTokenObtainPairSerializer"
+    ),
+    "TOKEN_REFRESH_SERIALIZER": (
+        "apps.core_app.authentication.ClaimsTokenRefreshSerializer"
+    ),
 }
 
 MEDIA_URL = "/media/"
@@ -210,6 +228,131 @@ SPECTACULAR_SETTINGS = {
 }
 
 
+# Cache
+# With REDIS_URL set the cache is shared by every process through Redis, otherwise
+# each process keeps its own in memory.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# Profile ownership
+# The ids of each user's profiles are cached for this many seconds to check the
+# auth-profile-id header without a query. Creating or deleting a profile clears
+# its user's entry.
+PROFILE_OWNERSHIP_CACHE_SECONDS = int(
+    os.environ.get("PROFILE_OWNERSHIP_CACHE_SECONDS", 60)
+)
+
+# Home feeds
+# Profiles with more followers than this have their posts pulled into feeds when
+# the feed is read instead of being written to each follower's feed.
+FEED_FAN_OUT_MAX_FOLLOWERS = int(os.environ.get("FEED_FAN_OUT_MAX_FOLLOWERS", 5000))
+
+
+# Sharded like counters
+# Posts liked more than LIKE_COUNTER_SHARD_THRESHOLD times in a minute have their
+# like count spread across LIKE_COUNTER_SHARDS rows. The sum of the shards is
+# cached for LIKE_COUNTER_CACHE_SECONDS.
+LIKE_COUNTER_SHARDS = int(os.environ.get("LIKE_COUNTER_SHARDS", 16))
+LIKE_COUNTER_SHARD_THRESHOLD = int(os.environ.get("LIKE_COUNTER_SHARD_THRESHOLD", 120))
+LIKE_COUNTER_CACHE_SECONDS = int(os.environ.get("LIKE_COUNTER_CACHE_SECONDS", 5))
+
+
+# Image processing
+# Uploads are cropped and resized by the process_images command ("worker"), or in
+# the request process after the upload is committed ("immediate").
+IMAGE_PROCESSING_BACKEND = os.environ.get("IMAGE_PROCESSING_BACKEND", "worker")
+IMAGE_PROCESSING_WORKERS = int(os.environ.get("IMAGE_PROCESSING_WORKERS", 2))
+IMAGE_PROCESSING_MEMORY_LIMIT_MB = int(
+    os.environ.get("IMAGE_PROCESSING_MEMORY_LIMIT_MB", 1024)
+)
+# seconds before an image claimed by a worker that didn't finish is retried
+IMAGE_PROCESSING_TIMEOUT = int(os.environ.get("IMAGE_PROCESSING_TIMEOUT", 300))
+IMAGE_PROCESSING_MAX_ATTEMPTS = 3
+# threads saving the images of a new post to storage at the same time
+IMAGE_UPLOAD_THREADS = int(os.environ.get("IMAGE_UPLOAD_THREADS", 4))
+# WebP encoder preset, one of the WEBP_PRESETS in apps.core_app.utils
+IMAGE_WEBP_PRESET = os.environ.get("IMAGE_WEBP_PRESET", "balanced")
+# staged post images older than this that were never posted are deleted by the
+# sweep process_images runs every STAGED_IMAGE_SWEEP_INTERVAL seconds
+STAGED_IMAGE_MAX_AGE_HOURS = int(os.environ.get("STAGED_IMAGE_MAX_AGE_HOURS", 24))
+STAGED_IMAGE_SWEEP_INTERVAL = int(os.environ.get("STAGED_IMAGE_SWEEP_INTERVAL", 3600))
+# times a batch of deleted image files is tried before the files are recorded as
+# StorageDeletions to retry later
+STORAGE_DELETE_ATTEMPTS = int(os.environ.get("STORAGE_DELETE_ATTEMPTS", 3))
+
+
+# Signed image URLs
+# In staging and prod, S3 image URLs are signed for AWS_QUERYSTRING_EXPIRE seconds
+# and reused until SIGNED_URL_CACHE_MARGIN seconds before they expire. With
+# SIGNED_URL_BUCKET_SECONDS set they are reused until the end of the current time
+# bucket instead, see apps.core_app.storage.
+SIGNED_URL_CACHE_MARGIN = int(os.environ.get("SIGNED_URL_CACHE_MARGIN", 60))
+SIGNED_URL_BUCKET_SECONDS = int(os.environ.get("SIGNED_URL_BUCKET_SECONDS", 0))
+
+# Username index
+# Profile search is answered from an in-process index of usernames and name words
+# in each API process, see apps.core_app.search_index. A background thread reads
+# the profiles changed since its last poll every USERNAME_INDEX_POLL_SECONDS.
+USERNAME_INDEX_ENABLED = os.environ.get("USERNAME_INDEX_ENABLED", "True") == "True"
+USERNAME_INDEX_BACKGROUND_LOAD = True
+USERNAME_INDEX_POLL_SECONDS = float(os.environ.get("USERNAME_INDEX_POLL_SECONDS", 2))
+# most profile ids a search returns, the count of a search never goes higher
+USERNAME_INDEX_MAX_RESULTS = 200
+# changed profiles kept in the overlay before the index is rebuilt
+USERNAME_INDEX_MAX_OVERLAY = 1000
+# ProfileChanges older than this are pruned by prune_profile_changes, every
+# USERNAME_INDEX_PRUNE_INTERVAL seconds
+USERNAME_INDEX_CHANGE_RETENTION_HOURS = 24
+USERNAME_INDEX_PRUNE_INTERVAL = 3600
+
+# Post card cache
+# The parts of serialized Posts that are the same for every viewer are cached, see
+# apps.core_app.post_cards. Cards hold signed image URLs and must not outlive them,
+# so keep POST_CARD_CACHE_SECONDS at most SIGNED_URL_CACHE_MARGIN, or at most
+# AWS_QUERYSTRING_EXPIRE when SIGNED_URL_BUCKET_SECONDS is set.
+POST_CARD_CACHE_SECONDS = int(os.environ.get("POST_CARD_CACHE_SECONDS", 60))
+# endpoints serving posts from the cache, leave one out to turn the cache off for it
+POST_CARD_CACHE_ENDPOINTS = os.environ.get(
+    "POST_CARD_CACHE_ENDPOINTS",
+    "feed,explore,profile_posts,saved_posts,similar_posts,post_detail",
+).split(",")
+
+# Tiered cache
+# Reference data is cached in the shared cache and in a small LRU in each process,
+# see apps.core_app.caching. Invalidations are published on TIERED_CACHE_CHANNEL
+# with Redis, other processes see them within TIERED_CACHE_LOCAL_SECONDS without.
+TIERED_CACHE_ENABLED = os.environ.get("TIERED_CACHE_ENABLED", "True") == "True"
+TIERED_CACHE_LOCAL_MAX_ENTRIES = 1000
+TIERED_CACHE_LOCAL_SECONDS = int(os.environ.get("TIERED_CACHE_LOCAL_SECONDS", 5))
+# seconds a value is fresh, then stale for TIERED_CACHE_STALE_SECONDS more while
+# it is recomputed
+TIERED_CACHE_SECONDS = int(os.environ.get("TIERED_CACHE_SECONDS", 300))
+TIERED_CACHE_STALE_SECONDS = 60
+# seconds a process may take to recompute a value before another one tries
+TIERED_CACHE_LOCK_SECONDS = 10
+TIERED_CACHE_CHANNEL = "tiered-cache-invalidations"
+
+# Conditional requests
+# Profile and post details and the reference data lists answer a matching
+# If-None-Match with 304 Not Modified, see apps.core_app.conditional. Pet types and
+# report reasons can be cached by clients and proxies for this many seconds.
+REFERENCE_DATA_MAX_AGE = int(os.environ.get("REFERENCE_DATA_MAX_AGE", 300))
+
+# Comments
+# replies listed inline under each comment of a post's comments, the rest are
+# listed by the comment replies endpoint
+COMMENT_THREAD_REPLIES = 3
+
 # Test Fixtures
 FIXTURE_DIRS = [BASE_DIR / "fixtures"]
 
@@ -222,6 +365,19 @@ EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL")
 
+# Email outbox
+# Emails are written to the EmailOutbox table in the request's transaction and
+# sent by the send_email_outbox command ("worker"), or by the request process
+# after the transaction commits ("immediate").
+EMAIL_OUTBOX_BACKEND = os.environ.get("EMAIL_OUTBOX_BACKEND", "worker")
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 50))
+# a failed email is retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubling with
+# each attempt, until it has been tried EMAIL_OUTBOX_MAX_ATTEMPTS times
+EMAIL_OUTBOX_RETRY_DELAY = int(os.environ.get("EMAIL_OUTBOX_RETRY_DELAY", 30))
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+# seconds before an email claimed by a sender that didn't finish is retried
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 300
+
 # Get the current environment
 environment: Literal["test", "dev", "staging", "prod"] = os.environ.get("DJANGO_ENV")
 
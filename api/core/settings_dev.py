@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from core.settings import REST_FRAMEWORK as _BASE_REST_FRAMEWORK
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -16,14 +17,14 @@ DATABASES = {
 }
 
 REST_FRAMEWORK = {
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    **_BASE_REST_FRAMEWORK,
     "PAGE_SIZE": 3,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.core_app.authentication.ClaimsJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
-    "EXCEPTION_HANDLER": "apps.core_app.exceptions.exceptions.custom_exception_handler",
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+# print emails from the API process without running send_email_outbox
+EMAIL_OUTBOX_BACKEND = "immediate"
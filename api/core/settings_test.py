@@ -1,10 +1,25 @@
+from core.settings import REST_FRAMEWORK as _BASE_REST_FRAMEWORK
+
 REST_FRAMEWORK = {
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    **_BASE_REST_FRAMEWORK,
     "PAGE_SIZE": 3,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.core_app.authentication.ClaimsJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
-    "EXCEPTION_HANDLER": "apps.core_app.exceptions.exceptions.custom_exception_handler",
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
+
+# the index would outlive the rolled back data of each test, the tests covering it
+# enable it and reset it
+USERNAME_INDEX_ENABLED = False
+
+# post ids are reused once the data of a test is rolled back, the tests covering
+# the post card cache enable it and clear the cache
+POST_CARD_CACHE_ENDPOINTS = []
+
+# tests use a cache of their own whatever REDIS_URL is set to
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# cached reference data would outlive the rolled back data of each test, the tests
+# covering the tiered cache enable it and clear the cache
+TIERED_CACHE_ENABLED = False